@@ -0,0 +1,545 @@
+#!/usr/bin/env python3
+"""
+Benchmarks for PromptCtl hook processing.
+
+Usage:
+    python3 bin/bench.py dispatch [--runs N] [--mode cold|daemon|all]
+    python3 bin/bench.py render [--runs N]
+    python3 bin/bench.py config [--runs N] [--handlers N]
+    python3 bin/bench.py scheduler [--timers N] [--runs N]
+    python3 bin/bench.py logflow [--entries N] [--fsync none|batch|interval]
+    python3 bin/bench.py segments [--entries N] [--codec gzip|zstd]
+
+The dispatch benchmark runs bin/dispatch.py end-to-end with a sample
+PreToolUse event and reports latency percentiles. The daemon mode also
+reports the raw socket round trip, which excludes interpreter startup of
+the dispatch client. Start the daemon first with `just daemon` (shared
+event loop) or `just daemon-fork` (fork server); for the fork server the
+child-reported fork-to-response latency is shown as well.
+
+The render benchmark times EventContext.render for a Write event whose
+tool_input.content grows from 1 KB to 8 MB. Render cost should stay flat,
+because only the placeholders in the template are looked up.
+
+The config benchmark writes a promptctl.yaml with N handlers to a temporary
+directory and times loading it with a fresh ConfigManager, as a cold start
+does: once with the compiled config cache removed before each load (YAML
+parse plus validation), and once with the cache in place.
+
+The scheduler benchmark fills EventScheduler with N pending timers, then
+times schedule, reschedule and cancel against that backlog and reports
+how late short timers fire. It then persists the backlog to a temporary
+SQLite timer store and times recovering it in a fresh scheduler.
+
+The logflow benchmark logs N entries shaped like handler log lines into a
+LogFlow writing JSONL to a temporary directory, and reports the entries per
+second log() accepts and how long the writer thread takes to drain them.
+
+The segments benchmark writes N log entries, handler lifecycle lines and
+every fifth one a Write hook payload cut from the plugin's own sources,
+indexes it, and compares finding one session's handler errors through the
+sidecar index with a full scan. It then compresses the segment as the
+compressor does and reports the compression ratio and speed, the cost of
+streaming the compressed segment back, and of seeking into its middle.
+"""
+
+import argparse
+import itertools
+import json
+import os
+import socket
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from pathlib import Path
+
+BIN_DIR = Path(__file__).resolve().parent
+DISPATCH_SCRIPT = BIN_DIR / "dispatch.py"
+MCP_DIR = BIN_DIR.parent / "mcp"
+
+RENDER_TEMPLATE = "pytest {tool_input.file_path} -k {state.test_filter} # {session_id} {unknown}"
+RENDER_CONTENT_SIZES = [1024, 64 * 1024, 1024 * 1024, 8 * 1024 * 1024]
+
+CONFIG_HANDLER_COUNTS = [10, 100, 500]
+
+# One hook payload entry per this many entries in the segments benchmark,
+# and one handler error per this many
+SEGMENT_PAYLOAD_EVERY = 5
+SEGMENT_ERROR_EVERY = 97
+
+SAMPLE_EVENT = {
+    "session_id": "bench-session",
+    "transcript_path": "/tmp/bench-transcript.jsonl",
+    "cwd": str(Path.cwd()),
+    "permission_mode": "default",
+    "hook_event_name": "PreToolUse",
+    "tool_name": "Edit",
+    "tool_input": {"file_path": "src/example.py", "old_string": "a", "new_string": "b"},
+}
+
+
+def get_socket_path():
+    """Get the daemon socket path (keep in sync with mcp/daemon.py)."""
+    override = os.environ.get("PROMPTCTL_SOCKET")
+    if override:
+        return Path(override).expanduser()
+    return Path.home() / ".promptctl" / "promptctl.sock"
+
+
+def percentile(samples, pct):
+    """Nearest-rank percentile of a list of samples."""
+    ordered = sorted(samples)
+    index = max(0, min(len(ordered) - 1, round(pct / 100 * len(ordered)) - 1))
+    return ordered[index]
+
+
+def report(label, samples, unit="ms"):
+    """Print a one-line latency summary."""
+    print(
+        f"{label:<24} n={len(samples):<5} "
+        f"p50={percentile(samples, 50):8.2f}{unit} "
+        f"p90={percentile(samples, 90):8.2f}{unit} "
+        f"p99={percentile(samples, 99):8.2f}{unit} "
+        f"mean={statistics.mean(samples):8.2f}{unit}"
+    )
+
+
+def time_dispatch(runs, env):
+    """Run dispatch.py end-to-end and collect wall-clock latencies."""
+    payload = json.dumps(SAMPLE_EVENT).encode("utf-8")
+    samples = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        subprocess.run(
+            [sys.executable, str(DISPATCH_SCRIPT)],
+            input=payload,
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.DEVNULL,
+            check=True,
+        )
+        samples.append((time.perf_counter() - start) * 1000)
+    return samples
+
+
+def time_socket(runs, socket_path):
+    """Measure the daemon round trip without process startup.
+
+    Returns:
+        Tuple of (round-trip samples, server timing dicts)
+    """
+    payload = json.dumps(SAMPLE_EVENT).encode("utf-8")
+    samples = []
+    timings = []
+    for _ in range(runs):
+        start = time.perf_counter()
+        client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        try:
+            client.connect(str(socket_path))
+            client.sendall(payload)
+            client.shutdown(socket.SHUT_WR)
+            chunks = []
+            while True:
+                chunk = client.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        finally:
+            client.close()
+        samples.append((time.perf_counter() - start) * 1000)
+        timings.append(json.loads(b"".join(chunks)).get("timing", {}))
+    return samples, timings
+
+
+def bench_dispatch(args):
+    """Compare cold-start dispatch with the hook daemon."""
+    if args.mode in ("cold", "all"):
+        env = dict(os.environ, PROMPTCTL_NO_DAEMON="1")
+        report("cold start", time_dispatch(args.runs, env))
+
+    if args.mode in ("daemon", "all"):
+        socket_path = get_socket_path()
+        if not socket_path.exists():
+            print(f"daemon: no socket at {socket_path} (run `just daemon`)")
+            return
+        env = dict(os.environ)
+        env.pop("PROMPTCTL_NO_DAEMON", None)
+        samples, timings = time_socket(args.runs, socket_path)
+        mode = timings[0].get("mode", "shared") if timings else "shared"
+        report(f"{mode} (end-to-end)", time_dispatch(args.runs, env))
+        report(f"{mode} (socket only)", samples)
+
+        fork_samples = [
+            t["fork_to_response_ms"] for t in timings if "fork_to_response_ms" in t
+        ]
+        if fork_samples:
+            report("fork-to-response", fork_samples)
+
+
+def bench_render(args):
+    """Show that template rendering cost does not depend on payload size."""
+    sys.path.insert(0, str(MCP_DIR))
+    from server import EventContext
+
+    for size in RENDER_CONTENT_SIZES:
+        payload = dict(SAMPLE_EVENT, hook_event_name="PostToolUse", tool_name="Write")
+        payload["tool_input"] = {"file_path": "src/example.py", "content": "x" * size}
+        context = EventContext(payload)
+        context.set_state("test_filter", "example")
+        context.render(RENDER_TEMPLATE)
+
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            context.render(RENDER_TEMPLATE)
+            samples.append((time.perf_counter() - start) * 1_000_000)
+        report(f"content {size // 1024} KB", samples, unit="us")
+
+
+def make_config(handler_count):
+    """Build a config with handler_count varied handlers."""
+    hooks = ["PreToolUse", "PostToolUse", "Stop", "UserPromptSubmit"]
+    handlers = {}
+    for index in range(handler_count):
+        hook = hooks[index % len(hooks)]
+        handler = {
+            "hook": hook,
+            "priority": index % 10,
+            "actions": [
+                {
+                    "action": "command",
+                    "script": f"pytest {{tool_input.file_path}} -k case_{index}",
+                    "options": {"timeout": 30, "inputs": ["{tool_input.file_path}"]},
+                },
+                {"action": "prompt", "template": f"Handler {index} ran for {{session_id}}"},
+            ],
+        }
+        if hook in ("PreToolUse", "PostToolUse"):
+            handler["match"] = {
+                "tool": ["Edit", "Write"],
+                "file_pattern": f"src/module_{index}/**/*.py",
+            }
+        handlers[f"handler-{index}"] = handler
+
+    return {"version": "1.0", "logging": {"level": "INFO"}, "handlers": handlers}
+
+
+def bench_config(args):
+    """Compare config load cost with and without the compiled config cache."""
+    sys.path.insert(0, str(MCP_DIR))
+    import yaml
+    from configcache import CompiledConfigCache
+    from server import CONFIG_SCHEMA_VERSION, ConfigManager
+
+    counts = [args.handlers] if args.handlers else CONFIG_HANDLER_COUNTS
+    with tempfile.TemporaryDirectory() as tmp:
+        config_path = Path(tmp) / "promptctl.yaml"
+        cache_path = CompiledConfigCache(config_path, CONFIG_SCHEMA_VERSION).path
+
+        for count in counts:
+            config_path.write_text(yaml.safe_dump(make_config(count)))
+
+            uncached = []
+            for _ in range(args.runs):
+                cache_path.unlink(missing_ok=True)
+                start = time.perf_counter()
+                ConfigManager(config_path).load_config()
+                uncached.append((time.perf_counter() - start) * 1000)
+
+            cached = []
+            for _ in range(args.runs):
+                start = time.perf_counter()
+                ConfigManager(config_path).load_config()
+                cached.append((time.perf_counter() - start) * 1000)
+
+            report(f"{count} handlers, no cache", uncached)
+            report(f"{count} handlers, cached", cached)
+
+
+def bench_scheduler(args):
+    """Time scheduler operations with a large backlog and measure timer lateness."""
+    import asyncio
+    import random
+
+    sys.path.insert(0, str(MCP_DIR))
+    from server import EventScheduler
+    from timerstore import SchedulerConfig
+
+    fired = {}
+
+    async def record(event):
+        fired[event.event_id] = time.perf_counter()
+
+    async def run():
+        scheduler = EventScheduler()
+        scheduler._execute_scheduled_event = record
+        await scheduler.start()
+
+        start = time.perf_counter()
+        for index in range(args.timers):
+            scheduler.schedule_event(f"bulk-{index}", random.uniform(3600, 7200), "bench", {})
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"scheduled {args.timers} timers in {elapsed:.1f}ms")
+
+        ids = [f"bulk-{random.randrange(args.timers)}" for _ in range(args.runs)]
+        for label, operation in [
+            ("schedule", lambda i: scheduler.schedule_event(f"extra-{i}", 5000, "bench", {})),
+            ("reschedule", lambda i: scheduler.reschedule_event(ids[i], random.uniform(1, 3600))),
+            ("cancel", lambda i: scheduler.cancel_event(ids[i])),
+        ]:
+            samples = []
+            for index in range(args.runs):
+                start = time.perf_counter()
+                operation(index)
+                samples.append((time.perf_counter() - start) * 1_000_000)
+            report(label, samples, unit="us")
+
+        delays = [random.uniform(0.005, 0.2) for _ in range(args.runs)]
+        due = {}
+        for index, delay in enumerate(delays):
+            due[f"short-{index}"] = time.perf_counter() + delay
+            scheduler.schedule_event(f"short-{index}", delay, "bench", {})
+        await asyncio.sleep(max(delays) + 0.1)
+        await asyncio.sleep(0)
+
+        lateness = [(fired[key] - due[key]) * 1000 for key in due if key in fired]
+        report("timer lateness", lateness)
+        await scheduler.stop()
+
+        with tempfile.TemporaryDirectory() as tmp:
+            config = SchedulerConfig(persist=True, path=str(Path(tmp) / "scheduler.db"))
+            scheduler = EventScheduler()
+            await scheduler.start(config)
+            for index in range(args.timers):
+                scheduler.schedule_event(f"bulk-{index}", random.uniform(3600, 7200), "bench", {})
+            start = time.perf_counter()
+            await scheduler.stop()
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"persisted {args.timers} timers in {elapsed:.1f}ms")
+
+            scheduler = EventScheduler()
+            start = time.perf_counter()
+            await scheduler.start(config)
+            elapsed = (time.perf_counter() - start) * 1000
+            print(f"recovered {len(scheduler)} timers in {elapsed:.1f}ms")
+            await scheduler.stop()
+
+    asyncio.run(run())
+
+
+def bench_logflow(args):
+    """Measure LogFlow capture and JSONL write throughput."""
+    sys.path.insert(0, str(MCP_DIR))
+    from logflow import ConsoleOutputConfig, JsonlOutputConfig, LogFlow, LoggingConfig, LogLevel
+
+    with tempfile.TemporaryDirectory() as tmp:
+        config = LoggingConfig(
+            rate_limit=0,
+            buffer_size=max(args.entries, 1),
+            console=ConsoleOutputConfig(enabled=False),
+            jsonl=JsonlOutputConfig(path=str(Path(tmp) / "{date}.jsonl"), fsync=args.fsync),
+        )
+        logger = LogFlow(config)
+        logger.open()
+
+        start = time.perf_counter()
+        for index in range(args.entries):
+            logger.log(
+                LogLevel.HANDLER_COMPLETE,
+                "Handler completed",
+                session_id=SAMPLE_EVENT["session_id"],
+                handler_name="auto-test",
+                duration_ms=12.5,
+                data={"index": index, "actions": 2},
+            )
+        log_seconds = time.perf_counter() - start
+
+        # Wait for the writer thread to drain what's left
+        logger.close()
+        total = time.perf_counter() - start
+        print(f"log():   {args.entries / log_seconds:10.0f} entries/s")
+        print(f"drain:   {(total - log_seconds) * 1000:10.1f} ms after the last log()")
+        print(f"overall: {args.entries / total:10.0f} entries/s (fsync: {args.fsync})")
+
+
+def bench_segments(args):
+    """Measure log segment compression ratio and read cost."""
+    sys.path.insert(0, str(MCP_DIR))
+    from logflow import LogLevel, LogRecord
+    import logstore
+
+    sources = "".join(path.read_text(encoding="utf-8") for path in sorted(MCP_DIR.glob("*.py")))
+
+    with tempfile.TemporaryDirectory() as tmp:
+        segment = Path(tmp) / "2025-01-01.001.jsonl"
+        with open(segment, "w", encoding="utf-8") as f:
+            for index in range(args.entries):
+                session_id = f"session-{index % 16}"
+                if index % SEGMENT_PAYLOAD_EVERY:
+                    # Handler lifecycle entries between hook payloads
+                    failed = index % SEGMENT_ERROR_EVERY == 1
+                    record = LogRecord(
+                        level=LogLevel.HANDLER_ERROR if failed else LogLevel.HANDLER_COMPLETE,
+                        message="Handler failed" if failed else "Handler completed",
+                        session_id=session_id,
+                        hook_name="PostToolUse",
+                        handler_name=f"handler-{index % 12}",
+                        duration_ms=(index % 997) / 10,
+                        data={"actions": index % 4, "priority": index % 50},
+                    )
+                else:
+                    start = (index * 7919) % max(len(sources) - 4096, 1)
+                    content = sources[start : start + 256 + index % 3840]
+                    record = LogRecord(
+                        level=LogLevel.HOOK_RECEIVED,
+                        message="Hook received",
+                        session_id=session_id,
+                        hook_name="PostToolUse",
+                        data={
+                            "hook_input": dict(
+                                SAMPLE_EVENT,
+                                hook_event_name="PostToolUse",
+                                tool_name="Write",
+                                tool_input={
+                                    "file_path": f"src/module_{index % 200}.py",
+                                    "content": content,
+                                },
+                            )
+                        },
+                    )
+                f.write(record.to_jsonl() + "\n")
+
+        size = segment.stat().st_size
+        print(f"segment:  {size / 1e6:8.1f} MB, {args.entries} entries")
+        start = time.perf_counter()
+        logstore.rebuild_index(segment)
+        index_seconds = time.perf_counter() - start
+        index_size = logstore.index_path(segment).stat().st_size
+        print(
+            f"index:    {index_size / 1e6:8.1f} MB, rebuilt in {index_seconds:.2f}s"
+        )
+
+        # One session's errors: seek through the index vs scanning every line
+        query = {"levels": {"HANDLER_ERROR"}, "session_id": "session-3"}
+        start = time.perf_counter()
+        found = sum(1 for _ in logstore.query_segment(segment, **query))
+        query_seconds = time.perf_counter() - start
+        start = time.perf_counter()
+        scanned = 0
+        with logstore.open_segment(segment) as f:
+            for line in f:
+                entry = json.loads(line)
+                if entry["level"] == "HANDLER_ERROR" and entry.get("session_id") == "session-3":
+                    scanned += 1
+        scan_seconds = time.perf_counter() - start
+        print(
+            f"query:    {found} entries in {query_seconds * 1000:.1f}ms with the index, "
+            f"{scanned} in {scan_seconds * 1000:.0f}ms scanning"
+        )
+
+        # Last 20 errors: read backwards from the end, without the index
+        start = time.perf_counter()
+        latest = []
+        for _, line in logstore.reverse_lines(segment):
+            if json.loads(line)["level"] == "HANDLER_ERROR":
+                latest.append(line)
+                if len(latest) == 20:
+                    break
+        tail_seconds = time.perf_counter() - start
+        print(f"tail:     last {len(latest)} errors in {tail_seconds * 1000:.1f}ms reading backwards")
+
+        # Same through the index, newest first, stopping at 20
+        start = time.perf_counter()
+        candidates = logstore.query_segment(segment, levels={"HANDLER_ERROR"}, reverse=True)
+        latest = list(itertools.islice(candidates, 20))
+        tail_seconds = time.perf_counter() - start
+        print(f"tail:     last {len(latest)} errors in {tail_seconds * 1000:.1f}ms with the index")
+
+        start = time.perf_counter()
+        compressed = logstore.compress_segment(segment, args.codec)
+        compress_seconds = time.perf_counter() - start
+        compressed_size = compressed.stat().st_size
+
+        print(
+            f"{args.codec}:     {compressed_size / 1e6:8.1f} MB "
+            f"({size / compressed_size:.1f}x smaller) in {compress_seconds:.2f}s "
+            f"({size / 1e6 / compress_seconds:.0f} MB/s)"
+        )
+
+        start = time.perf_counter()
+        with logstore.open_segment(compressed) as f:
+            lines = sum(1 for _ in f)
+        stream_seconds = time.perf_counter() - start
+        print(f"stream:   {lines} lines in {stream_seconds * 1000:.0f}ms")
+
+        samples = []
+        for _ in range(args.runs):
+            start = time.perf_counter()
+            with logstore.open_segment(compressed, size // 2) as f:
+                f.readline()
+                f.readline()
+            samples.append((time.perf_counter() - start) * 1000)
+        report("seek to middle", samples, "ms")
+
+
+def main():
+    """Parse arguments and run the selected benchmark."""
+    parser = argparse.ArgumentParser(description="PromptCtl benchmarks")
+    subparsers = parser.add_subparsers(dest="benchmark", required=True)
+
+    dispatch_parser = subparsers.add_parser(
+        "dispatch", help="Hook dispatch latency: cold start vs daemon/fork server"
+    )
+    dispatch_parser.add_argument("--runs", type=int, default=50)
+    dispatch_parser.add_argument(
+        "--mode", choices=["cold", "daemon", "all"], default="all"
+    )
+    dispatch_parser.set_defaults(func=bench_dispatch)
+
+    render_parser = subparsers.add_parser(
+        "render", help="Template render cost across payload sizes"
+    )
+    render_parser.add_argument("--runs", type=int, default=10000)
+    render_parser.set_defaults(func=bench_render)
+
+    config_parser = subparsers.add_parser(
+        "config", help="Config load cost with and without the compiled config cache"
+    )
+    config_parser.add_argument("--runs", type=int, default=20)
+    config_parser.add_argument(
+        "--handlers", type=int, default=None, help="Handler count (default: 10, 100, 500)"
+    )
+    config_parser.set_defaults(func=bench_config)
+
+    scheduler_parser = subparsers.add_parser(
+        "scheduler", help="Scheduler operation cost and timer precision with many timers"
+    )
+    scheduler_parser.add_argument("--timers", type=int, default=100_000)
+    scheduler_parser.add_argument("--runs", type=int, default=1000)
+    scheduler_parser.set_defaults(func=bench_scheduler)
+
+    logflow_parser = subparsers.add_parser(
+        "logflow", help="LogFlow capture and JSONL write throughput"
+    )
+    logflow_parser.add_argument("--entries", type=int, default=100_000)
+    logflow_parser.add_argument(
+        "--fsync", choices=["none", "batch", "interval"], default="none"
+    )
+    logflow_parser.set_defaults(func=bench_logflow)
+
+    segments_parser = subparsers.add_parser(
+        "segments", help="Log segment compression ratio and read cost"
+    )
+    segments_parser.add_argument("--entries", type=int, default=200_000)
+    segments_parser.add_argument("--codec", choices=["gzip", "zstd"], default="gzip")
+    segments_parser.add_argument("--runs", type=int, default=20)
+    segments_parser.set_defaults(func=bench_segments)
+
+    args = parser.parse_args()
+    args.func(args)
+
+
+if __name__ == "__main__":
+    main()
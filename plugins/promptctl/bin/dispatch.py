@@ -2,101 +2,246 @@
 """
 Dispatch script for promptctl hooks.
 
-This standalone script receives hook events from Claude Code and processes
-them independently. It does NOT import from the server module.
+This script receives hook events from Claude Code. It is a thin client for
+the promptctl hook daemon (mcp/daemon.py) and only imports the hook
+pipeline when it has to process an event itself; that path leaves out
+fastmcp and console logging.
 
 The dispatch script:
 1. Reads JSON event data from stdin
-2. Processes the hook event locally
-3. Outputs the response (exit code 0 for success)
-4. Logs everything to ~/.promptctl/logs/dispatch.log
+2. Forwards the event to the daemon over its Unix socket
+3. Falls back to running the hook pipeline in-process if the daemon is down
+4. Outputs the response (exit code 0 for success)
+5. Logs everything to ~/.promptctl/logs/dispatch.log
+
+Log records are collected in memory during the invocation and appended to
+dispatch.log as JSONL in a single write on exit. The file is rotated to
+dispatch.log.1 ... dispatch.log.N once it grows past DISPATCH_LOG_MAX_BYTES.
+Records identify the event (hook, session, cwd, tool and payload size);
+tool inputs and file contents are only logged on request.
+
+Environment:
+    PROMPTCTL_SOCKET      Override the daemon socket path
+    PROMPTCTL_NO_DAEMON   Set to 1 to always process in-process
+    PROMPTCTL_LOG_EVENTS  Set to 1 to log full event payloads
 """
 
 import json
+import os
+import socket
 import sys
 from datetime import datetime
 from pathlib import Path
 
+# Seconds to wait for the daemon to answer once connected
+DAEMON_RESPONSE_TIMEOUT = 60.0
+
+# Size-based rotation for dispatch.log
+DISPATCH_LOG_MAX_BYTES = 10 * 1024 * 1024
+DISPATCH_LOG_BACKUPS = 3
+
+
+class DispatchLog:
+    """Buffers dispatch log records and appends them in one write."""
+
+    def __init__(self, path, max_bytes=DISPATCH_LOG_MAX_BYTES, backups=DISPATCH_LOG_BACKUPS):
+        self.path = path
+        self.max_bytes = max_bytes
+        self.backups = backups
+        self.records = []
+
+    def add(self, message, **fields):
+        """Record a message with optional structured fields."""
+        record = {"timestamp": datetime.now().isoformat(), "pid": os.getpid(), "message": message}
+        record.update(fields)
+        self.records.append(record)
+
+    def flush(self):
+        """Append all buffered records as JSONL with one open and one write."""
+        if not self.records:
+            return
+
+        data = "".join(
+            json.dumps(record, ensure_ascii=False, default=str) + "\n"
+            for record in self.records
+        ).encode("utf-8")
+        self.records = []
+
+        self._rotate_if_needed(len(data))
 
-def get_log_file():
-    """Get the log file path."""
-    log_dir = Path.home() / ".promptctl" / "logs"
-    log_dir.mkdir(parents=True, exist_ok=True)
-    return log_dir / "dispatch.log"
+        flags = os.O_WRONLY | os.O_APPEND | os.O_CREAT
+        try:
+            fd = os.open(self.path, flags, 0o644)
+        except FileNotFoundError:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd = os.open(self.path, flags, 0o644)
+        try:
+            # O_APPEND keeps concurrent dispatch processes from interleaving
+            os.write(fd, data)
+        finally:
+            os.close(fd)
 
+    def _rotate_if_needed(self, incoming):
+        """Shift dispatch.log -> .1 -> .2 ... when the size limit is hit."""
+        if self.max_bytes <= 0:
+            return
 
-def log(message):
-    """Write a log message to the log file."""
-    timestamp = datetime.now().isoformat()
-    log_file = get_log_file()
-    with open(log_file, "a") as f:
-        f.write(f"[{timestamp}] {message}\n")
+        try:
+            size = os.stat(self.path).st_size
+        except FileNotFoundError:
+            return
+
+        if size + incoming <= self.max_bytes:
+            return
+
+        try:
+            for index in range(self.backups - 1, 0, -1):
+                source = self.path.with_name(f"{self.path.name}.{index}")
+                if source.exists():
+                    os.replace(source, self.path.with_name(f"{self.path.name}.{index + 1}"))
+            if self.backups > 0:
+                os.replace(self.path, self.path.with_name(f"{self.path.name}.1"))
+            else:
+                os.unlink(self.path)
+        except FileNotFoundError:
+            # Another dispatch process rotated it first
+            pass
+
+
+_dispatch_log = DispatchLog(Path.home() / ".promptctl" / "logs" / "dispatch.log")
+
+
+def log(message, **fields):
+    """Buffer a log message; written out when the script exits."""
+    _dispatch_log.add(message, **fields)
+
+
+def get_socket_path():
+    """Get the daemon socket path (keep in sync with mcp/daemon.py)."""
+    override = os.environ.get("PROMPTCTL_SOCKET")
+    if override:
+        return Path(override).expanduser()
+    return Path.home() / ".promptctl" / "promptctl.sock"
 
 
 def read_event_data():
-    """Read and parse JSON event data from stdin."""
+    """Read and parse JSON event data from stdin.
+
+    Returns:
+        Tuple of (raw bytes, parsed event data)
+    """
+    raw = sys.stdin.buffer.read()
     try:
-        data = json.load(sys.stdin)
-        log(f"Received event data: {json.dumps(data, indent=2)}")
-        return data
+        data = json.loads(raw)
+        if os.environ.get("PROMPTCTL_LOG_EVENTS") == "1":
+            log("Received event data", bytes=len(raw), event=data)
+        else:
+            log("Received event data", bytes=len(raw))
+        return raw, data
     except json.JSONDecodeError as e:
         log(f"ERROR: Invalid JSON from stdin: {e}")
         sys.exit(1)
 
 
-def process_hook_event(event_data):
+def forward_to_daemon(raw_event):
     """
-    Process hook event and return response.
+    Send the raw event to the hook daemon and return its response.
+
+    Returns None if the daemon is not reachable, so the caller can fall back
+    to in-process handling. Errors after the event was delivered are raised:
+    retrying in-process could run the handlers twice.
+    """
+    if os.environ.get("PROMPTCTL_NO_DAEMON") == "1":
+        return None
+
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        try:
+            client.connect(str(get_socket_path()))
+        except OSError as e:
+            log(f"Daemon unavailable ({e.__class__.__name__}) - processing in-process")
+            return None
+
+        client.settimeout(DAEMON_RESPONSE_TIMEOUT)
+        client.sendall(raw_event)
+        client.shutdown(socket.SHUT_WR)
+
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+    finally:
+        client.close()
+
+    return json.loads(b"".join(chunks))
+
 
-    This is a minimal implementation that:
-    - Accepts all hook events (returns success)
-    - Can be extended to read promptctl.yaml and execute handlers
+def process_in_process(event_data):
+    """Run the full hook pipeline from mcp/server.py in this process."""
+    import asyncio
 
-    For now, this just logs the event and returns success.
+    mcp_dir = Path(__file__).resolve().parent.parent / "mcp"
+    sys.path.insert(0, str(mcp_dir))
+    from daemon import run_once
+
+    return asyncio.run(run_once(event_data))
+
+
+def process_hook_event(raw_event, event_data):
+    """
+    Process hook event and return response.
+
+    The event is handled by the daemon when it is running, otherwise by the
+    same pipeline loaded into this process.
     """
-    # Extract basic event info
-    hook_event_name = event_data.get("hook_event_name", "unknown")
-    session_id = event_data.get("session_id", "unknown")
-    cwd = event_data.get("cwd", "unknown")
+    log(
+        "Hook triggered",
+        hook_event_name=event_data.get("hook_event_name", "unknown"),
+        session_id=event_data.get("session_id", "unknown"),
+        cwd=event_data.get("cwd", "unknown"),
+        tool_name=event_data.get("tool_name"),
+    )
 
-    log(f"Hook triggered: {hook_event_name}")
-    log(f"Session ID: {session_id}")
-    log(f"Working directory: {cwd}")
+    reply = forward_to_daemon(raw_event)
+    if reply is None:
+        reply = process_in_process(event_data)
+    else:
+        log("Handled by daemon", timing=reply.get("timing", {}))
 
-    # Log tool-specific info if available
-    if "tool_name" in event_data:
-        log(f"Tool: {event_data['tool_name']}")
-    if "tool_input" in event_data:
-        log(f"Tool input: {json.dumps(event_data['tool_input'], indent=2)}")
+    if "error" in reply:
+        raise RuntimeError(reply["error"])
 
-    # Return minimal successful response
-    # Most hooks just need exit code 0 with no output
-    return {
-        "continue": True
-    }
+    return reply["output"]
 
 
 def main():
     """Main entry point for the dispatch script."""
-    log("=" * 80)
+    try:
+        run()
+    finally:
+        _dispatch_log.flush()
+
+
+def run():
+    """Read, process and answer one hook event."""
     log("Dispatch script started")
 
     # Read event data from stdin
-    event_data = read_event_data()
+    raw_event, event_data = read_event_data()
 
     try:
         # Process the hook event
-        response = process_hook_event(event_data)
-
-        log(f"Processing complete - response: {json.dumps(response)}")
+        response = process_hook_event(raw_event, event_data)
 
         # Only output JSON if there's meaningful content
         # Empty response with exit 0 is valid and means "allow/continue"
         if response and any(v is not True for v in response.values()):
-            log(f"Writing JSON response to stdout: {json.dumps(response)}")
+            log("Writing JSON response to stdout", response=response)
             print(json.dumps(response))
         else:
-            log("No JSON response needed - returning exit code 0")
+            log("No JSON response needed", response=response)
 
         # Exit with success
         log("Exiting with code 0 (success)")
@@ -104,9 +249,12 @@ def main():
 
     except Exception as e:
         # Log error and exit with error code
-        log(f"ERROR: Exception during processing: {e}")
         import traceback
-        log(f"Traceback:\n{traceback.format_exc()}")
+        log(
+            "ERROR: Exception during processing",
+            error=str(e),
+            traceback=traceback.format_exc(),
+        )
         log("Exiting with code 1 (error)")
         sys.exit(1)
 
@@ -3,67 +3,113 @@
 Write hooks configuration for PromptCtl.
 
 This script generates the hooks.json file that configures Claude Code
-to call the dispatch.py script for all hook events.
+to call the dispatch.py script for hook events.
+
+Only the hook events that have enabled handlers are registered, and tool
+events only match the tools those handlers care about. Unmatched events
+then never spawn a dispatch process. With `project_configs: true` in
+promptctl.yaml every event is registered with matcher '*', since the
+promptctl.yaml of any project may handle it.
+
+Usage:
+    python3 bin/write_hooks_config.py [--config PATH] [--output PATH] [--all] [--watch]
 """
 
-import json
+import argparse
+import select
+import sys
+import time
 from pathlib import Path
 
+sys.path.insert(0, str(Path(__file__).resolve().parent.parent / "mcp"))
+
+from server import ConfigManager, HooksConfigWriter  # noqa: E402
+from watcher import POLL_INTERVAL, ConfigWatcher  # noqa: E402
+
+
+def write(config_manager, hooks_config_file, dispatch_command, all_events):
+    """Generate hooks.json from the current config and report the result."""
+    config = None if all_events else config_manager.load_config()
+    changed = HooksConfigWriter.write_hooks_config(
+        hooks_config_file, dispatch_command, config=config
+    )
+
+    hooks = HooksConfigWriter.generate_hooks_config(dispatch_command, config=config)
+    status = "Wrote" if changed else "Unchanged"
+    print(f"{status} hooks config: {hooks_config_file}")
+
+    if not hooks["hooks"]:
+        print("\nNo enabled handlers - no hook events are configured.")
+        return
+
+    print("\nThe following hook events are configured:")
+    for event_name, entries in hooks["hooks"].items():
+        print(f"- {event_name} (matcher: {entries[0]['matcher']})")
 
-def generate_hooks_config(dispatch_script: str):
-    """Generate hooks.json configuration."""
-    events = [
-        "PreToolUse",
-        "PostToolUse",
-        "Notification",
-        "UserPromptSubmit",
-        "SessionStart",
-        "SessionEnd",
-        "Stop",
-        "SubagentStop",
-        "PreCompact"
-    ]
-
-    hooks = {}
-    for event_name in events:
-        hooks[event_name] = [
-            {
-                "matcher": "*",
-                "hooks": [{"type": "command", "command": dispatch_script}],
-            }
-        ]
-
-    return {"hooks": hooks}
+
+def wait_for_activity(watcher):
+    """Block until the config directory shows activity or the poll interval passes."""
+    config_fd = watcher.fileno()
+    if config_fd is None:
+        time.sleep(POLL_INTERVAL)
+    else:
+        select.select([config_fd], [], [])
 
 
 def main():
     """Generate and write hooks.json configuration."""
+    parser = argparse.ArgumentParser(description="Generate hooks/hooks.json")
+    parser.add_argument("--config", type=Path, default=None, help="Path to promptctl.yaml")
+    parser.add_argument(
+        "--output",
+        type=Path,
+        default=None,
+        help="Path to write (default: the plugin's hooks/hooks.json)",
+    )
+    parser.add_argument(
+        "--all",
+        action="store_true",
+        help="Register every hook event with matcher '*' regardless of config",
+    )
+    parser.add_argument(
+        "--watch",
+        action="store_true",
+        help="Regenerate whenever the config file changes",
+    )
+    args = parser.parse_args()
+
     script_dir = Path(__file__).parent
-    hooks_config_file = script_dir.parent / "hooks" / "hooks.json"
+    hooks_config_file = args.output or script_dir.parent / "hooks" / "hooks.json"
 
     # Generate dispatch command - uses python3 to run dispatch.sh
     dispatch_command = "\"${CLAUDE_PLUGIN_ROOT}\"/bin/dispatch.sh"
 
-    # Write hooks configuration
-    config = generate_hooks_config(dispatch_command)
+    config_manager = ConfigManager(args.config)
+    print(f"Config: {config_manager.config_path}")
 
-    hooks_config_file.parent.mkdir(parents=True, exist_ok=True)
-    with open(hooks_config_file, "w") as f:
-        json.dump(config, f, indent=2)
+    write(config_manager, hooks_config_file, dispatch_command, args.all)
 
-    print(f"Wrote hooks config to: {hooks_config_file}")
-    print("\nThe following hook events are configured:")
-    print("- PreToolUse")
-    print("- PostToolUse")
-    print("- Notification")
-    print("- UserPromptSubmit")
-    print("- Stop")
-    print("- SubagentStop")
-    print("- PreCompact")
-    print("- SessionStart")
-    print("- SessionEnd")
+    if not args.watch:
+        return
+
+    watcher = ConfigWatcher(config_manager.config_path)
+    print(
+        f"\nWatching {config_manager.config_path} for changes "
+        f"({watcher.backend}, Ctrl-C to stop)"
+    )
+    try:
+        while True:
+            wait_for_activity(watcher)
+            if watcher.changed():
+                try:
+                    write(config_manager, hooks_config_file, dispatch_command, args.all)
+                except Exception as e:
+                    print(f"Error: failed to regenerate hooks config: {e}", file=sys.stderr)
+    except KeyboardInterrupt:
+        pass
+    finally:
+        watcher.close()
 
 
 if __name__ == "__main__":
     main()
-
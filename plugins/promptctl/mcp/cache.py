@@ -0,0 +1,304 @@
+#!/usr/bin/env python3
+"""
+Result cache for command and validate actions.
+
+A cached run is keyed by the rendered command, its working directory and
+the content hashes of the action's declared input files. On a hit the
+stored exit code and output are returned without running anything.
+
+The cache lives in a SQLite database (~/.promptctl/cache.db by default), so
+it is shared by the hook daemon, forked children, in-process dispatch and
+the MCP server's status tool. File hashes are memoized by path, mtime and
+size, so unchanged inputs are not re-read. Entries are evicted least
+recently used first once the entry count or total output size exceeds its
+limit. Once more than max_file_digests hashes are stored, those of deleted
+files are dropped, then the ones hashed longest ago.
+
+Every method blocks on SQLite and file I/O; async callers run them in a
+worker thread. A lookup is a read: hit/miss counters and last-used times
+are kept in memory and written with the next put, or in one transaction
+once STATS_FLUSH_BATCH of them or STATS_FLUSH_INTERVAL seconds have
+accumulated. Short-lived processes call flush() before they exit.
+"""
+
+import hashlib
+import json
+import os
+import sqlite3
+import threading
+import time
+from contextlib import contextmanager
+from pathlib import Path
+from typing import Any, Dict, Iterator, List, Optional, Tuple
+
+from pydantic import BaseModel, Field
+
+# Bytes hashed per read
+HASH_CHUNK_SIZE = 1024 * 1024
+
+# Buffered lookups (counters plus last-used times) written in one transaction
+STATS_FLUSH_BATCH = 100
+
+# Seconds buffered lookups wait at most for a write
+STATS_FLUSH_INTERVAL = 5.0
+
+# Fraction of max_file_digests kept after pruning, so pruning isn't repeated
+# on every put
+FILE_DIGESTS_PRUNE_TO = 0.75
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS results (
+    key TEXT PRIMARY KEY,
+    result TEXT NOT NULL,
+    size INTEGER NOT NULL,
+    last_used REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS results_last_used ON results (last_used);
+CREATE TABLE IF NOT EXISTS file_digests (
+    path TEXT PRIMARY KEY,
+    mtime_ns INTEGER NOT NULL,
+    size INTEGER NOT NULL,
+    digest TEXT NOT NULL
+);
+CREATE TABLE IF NOT EXISTS stats (
+    name TEXT PRIMARY KEY,
+    value INTEGER NOT NULL
+);
+"""
+
+
+class CacheConfig(BaseModel):
+    """Result cache configuration."""
+
+    enabled: bool = Field(default=True)
+    path: str = Field(default="~/.promptctl/cache.db")
+    max_entries: int = Field(default=1000, ge=1)
+    max_size_mb: int = Field(default=50, ge=1)
+    max_file_digests: int = Field(default=10000, ge=1)
+
+
+class ResultCache:
+    """SQLite-backed LRU cache of command results."""
+
+    def __init__(self, config: CacheConfig):
+        self.config = config
+        self.path = Path(config.path).expanduser()
+        self.max_bytes = config.max_size_mb * 1024 * 1024
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._lock = threading.Lock()
+
+        # Lookups not written yet
+        self._counts: Dict[str, int] = {}
+        self._last_used: Dict[str, float] = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    @contextmanager
+    def _connection(self) -> Iterator[sqlite3.Connection]:
+        """Hold the database for one operation from any thread.
+
+        The connection is opened once per process: neither it nor the lock
+        survive fork, and lookups buffered by the parent are its own.
+        """
+        if self._pid != os.getpid():
+            self._lock = threading.Lock()
+            self._conn = None
+            self._counts = {}
+            self._last_used = {}
+            self._pending = 0
+
+        with self._lock:
+            if self._conn is None or self._pid != os.getpid():
+                self.path.parent.mkdir(parents=True, exist_ok=True)
+                conn = sqlite3.connect(str(self.path), timeout=5.0, check_same_thread=False)
+                conn.execute("PRAGMA journal_mode=WAL")
+                conn.execute("PRAGMA synchronous=NORMAL")
+                conn.executescript(SCHEMA)
+                self._conn = conn
+                self._pid = os.getpid()
+            yield self._conn
+
+    def make_key(self, command: str, cwd: Optional[str], inputs: List[str]) -> str:
+        """Build the cache key for a command and its input files."""
+        digest = hashlib.sha256()
+        digest.update(json.dumps([command, cwd or ""]).encode("utf-8"))
+        for input_path in inputs:
+            path = os.path.join(cwd or "", input_path)
+            entry = [input_path, self.file_digest(path)]
+            digest.update(json.dumps(entry).encode("utf-8"))
+        return digest.hexdigest()
+
+    def lookup(
+        self, command: str, cwd: Optional[str], inputs: List[str]
+    ) -> Tuple[str, Optional[Dict[str, Any]]]:
+        """Build the key for a command and look it up in one call.
+
+        Returns:
+            Tuple of (cache key, stored result or None)
+        """
+        key = self.make_key(command, cwd, inputs)
+        return key, self.get(key)
+
+    def file_digest(self, path: str) -> Optional[str]:
+        """SHA-256 of a file's content, or None if it doesn't exist.
+
+        Reuses the stored digest while the file's mtime and size are unchanged.
+        """
+        path = os.path.abspath(path)
+        try:
+            stat = os.stat(path)
+        except OSError:
+            return None
+
+        with self._connection() as conn:
+            row = conn.execute(
+                "SELECT mtime_ns, size, digest FROM file_digests WHERE path = ?", (path,)
+            ).fetchone()
+        if row and row[0] == stat.st_mtime_ns and row[1] == stat.st_size:
+            return row[2]
+
+        digest = hashlib.sha256()
+        try:
+            with open(path, "rb") as f:
+                for chunk in iter(lambda: f.read(HASH_CHUNK_SIZE), b""):
+                    digest.update(chunk)
+        except OSError:
+            return None
+
+        with self._connection() as conn, conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO file_digests VALUES (?, ?, ?, ?)",
+                (path, stat.st_mtime_ns, stat.st_size, digest.hexdigest()),
+            )
+        return digest.hexdigest()
+
+    def get(self, key: str) -> Optional[Dict[str, Any]]:
+        """Look up a stored result and count the hit or miss."""
+        with self._connection() as conn:
+            row = conn.execute("SELECT result FROM results WHERE key = ?", (key,)).fetchone()
+
+            if row is None:
+                self._counts["misses"] = self._counts.get("misses", 0) + 1
+            else:
+                self._counts["hits"] = self._counts.get("hits", 0) + 1
+                self._last_used[key] = time.time()
+            self._pending += 1
+
+            if (
+                self._pending >= STATS_FLUSH_BATCH
+                or time.monotonic() - self._last_flush >= STATS_FLUSH_INTERVAL
+            ):
+                with conn:
+                    self._write_lookups(conn)
+
+        return None if row is None else json.loads(row[0])
+
+    def put(self, key: str, result: Dict[str, Any]):
+        """Store a result and evict least recently used entries over the limits.
+
+        Buffered lookups are written in the same transaction, so eviction
+        sees the latest last-used times. Stored file hashes are pruned too.
+        """
+        data = json.dumps(result, ensure_ascii=False)
+
+        with self._connection() as conn, conn:
+            self._write_lookups(conn)
+            conn.execute(
+                "INSERT OR REPLACE INTO results VALUES (?, ?, ?, ?)",
+                (key, data, len(data), time.time()),
+            )
+            self._evict(conn)
+            self._prune_digests(conn)
+
+    def flush(self):
+        """Write buffered lookups now."""
+        if not self._pending or self._pid != os.getpid():
+            return
+        with self._connection() as conn, conn:
+            self._write_lookups(conn)
+
+    def _write_lookups(self, conn: sqlite3.Connection):
+        """Write buffered counters and last-used times (caller holds the lock)."""
+        if self._last_used:
+            conn.executemany(
+                "UPDATE results SET last_used = MAX(last_used, ?) WHERE key = ?",
+                [(used, key) for key, used in self._last_used.items()],
+            )
+        for name, amount in self._counts.items():
+            self._count(conn, name, amount)
+
+        self._counts = {}
+        self._last_used = {}
+        self._pending = 0
+        self._last_flush = time.monotonic()
+
+    def _evict(self, conn: sqlite3.Connection):
+        """Drop the oldest entries until both limits hold."""
+        count, total = conn.execute(
+            "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+        ).fetchone()
+        if count <= self.config.max_entries and total <= self.max_bytes:
+            return
+
+        evicted = 0
+        for key, size in conn.execute(
+            "SELECT key, size FROM results ORDER BY last_used"
+        ).fetchall():
+            if count <= self.config.max_entries and total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM results WHERE key = ?", (key,))
+            count -= 1
+            total -= size
+            evicted += 1
+
+        self._count(conn, "evictions", evicted)
+
+    def _prune_digests(self, conn: sqlite3.Connection):
+        """Drop stored file hashes once there are more than max_file_digests.
+
+        Hashes of files that no longer exist go first, then the ones hashed
+        longest ago (a replaced row gets a new rowid).
+        """
+        limit = self.config.max_file_digests
+        (count,) = conn.execute("SELECT COUNT(*) FROM file_digests").fetchone()
+        if count <= limit:
+            return
+
+        rows = conn.execute("SELECT rowid, path FROM file_digests ORDER BY rowid").fetchall()
+        removed = [rowid for rowid, path in rows if not os.path.exists(path)]
+        excess = count - len(removed) - int(limit * FILE_DIGESTS_PRUNE_TO)
+        if excess > 0:
+            gone = set(removed)
+            removed += [rowid for rowid, _ in rows if rowid not in gone][:excess]
+        conn.executemany("DELETE FROM file_digests WHERE rowid = ?", [(r,) for r in removed])
+
+    @staticmethod
+    def _count(conn: sqlite3.Connection, name: str, amount: int = 1):
+        """Increment a stats counter."""
+        conn.execute(
+            "INSERT INTO stats VALUES (?, ?) "
+            "ON CONFLICT(name) DO UPDATE SET value = value + excluded.value",
+            (name, amount),
+        )
+
+    def stats(self) -> Dict[str, Any]:
+        """Get hit/miss counters and the current cache size."""
+        self.flush()
+        with self._connection() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM stats").fetchall())
+            entries, total = conn.execute(
+                "SELECT COUNT(*), COALESCE(SUM(size), 0) FROM results"
+            ).fetchone()
+
+        hits = counters.get("hits", 0)
+        misses = counters.get("misses", 0)
+        lookups = hits + misses
+        return {
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": hits / lookups if lookups else 0.0,
+            "entries": entries,
+            "size_bytes": total,
+        }
@@ -0,0 +1,112 @@
+#!/usr/bin/env python3
+"""
+Compiled config cache for PromptCtl.
+
+Parsing promptctl.yaml with PyYAML dominates cold-start cost for large
+handler sets. After a config file is parsed, its data is stored with
+marshal under ~/.promptctl/config-cache/, in a file named after a hash of
+the config's path, so nothing is written into project directories. The
+next start reads it back and skips YAML parsing entirely; validation then
+runs on the merged data of the user and project configs.
+
+An entry is keyed by a hash of the YAML bytes, the config schema version
+and the Python/pydantic versions, so any edit to the file, a model change
+that bumps the schema version, or an interpreter upgrade makes it a miss.
+A missing, stale, corrupt or unwritable cache is never an error; the
+caller just falls back to a full parse.
+"""
+
+import hashlib
+import marshal
+import os
+import sys
+import tempfile
+from pathlib import Path
+from typing import Any, Optional
+
+import pydantic
+
+# Bumped when the cache file layout changes
+CACHE_FORMAT_VERSION = 1
+
+
+def cache_directory() -> Path:
+    """Get the directory compiled configs are stored in."""
+    return Path.home() / ".promptctl" / "config-cache"
+
+
+class CompiledConfigCache:
+    """Marshal cache of a parsed config file."""
+
+    def __init__(
+        self, config_path: Path, schema_version: str, directory: Optional[Path] = None
+    ):
+        name = hashlib.sha256(os.fsencode(os.path.abspath(config_path))).hexdigest()[:32]
+        self.path = (directory or cache_directory()) / f"{name}.cache"
+        self._salt = "|".join(
+            [
+                str(CACHE_FORMAT_VERSION),
+                schema_version,
+                pydantic.VERSION,
+                "%d.%d" % sys.version_info[:2],
+                str(marshal.version),
+            ]
+        ).encode("utf-8")
+
+    def key(self, source: bytes) -> bytes:
+        """Cache key for the given config file content."""
+        digest = hashlib.sha256(self._salt)
+        digest.update(source)
+        return digest.hexdigest().encode("ascii")
+
+    def load(self, source: bytes) -> Optional[Any]:
+        """Get the stored structure for source, or None on a miss."""
+        try:
+            with open(self.path, "rb") as f:
+                blob = f.read()
+        except OSError:
+            return None
+
+        key, _, body = blob.partition(b"\n")
+        if key != self.key(source):
+            return None
+
+        try:
+            return marshal.loads(body)
+        except (EOFError, ValueError, TypeError):
+            return None
+
+    def store(self, source: bytes, data: Any) -> bool:
+        """Store the structure compiled from source.
+
+        The file is replaced atomically, so concurrent readers see either
+        the old or the new entry.
+
+        Returns:
+            True if the cache was written
+        """
+        try:
+            body = marshal.dumps(data)
+        except ValueError:
+            return False
+
+        try:
+            self.path.parent.mkdir(parents=True, exist_ok=True)
+            fd, tmp_path = tempfile.mkstemp(
+                prefix=self.path.name, suffix=".tmp", dir=str(self.path.parent)
+            )
+        except OSError:
+            return False
+
+        try:
+            with os.fdopen(fd, "wb") as f:
+                f.write(self.key(source) + b"\n" + body)
+            os.replace(tmp_path, self.path)
+        except OSError:
+            try:
+                os.unlink(tmp_path)
+            except OSError:
+                pass
+            return False
+
+        return True
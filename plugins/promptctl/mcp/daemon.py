@@ -0,0 +1,643 @@
+#!/usr/bin/env python3
+"""
+PromptCtl Hook Daemon
+
+A long-lived process that keeps the hook pipeline warm:
+1. Listens on a Unix domain socket (~/.promptctl/promptctl.sock)
+2. Receives raw hook event JSON forwarded by bin/dispatch.py
+3. Runs handle_hook_event from server.py
+4. Replies with the serialized HookOutput
+
+Two modes are available:
+- shared: every event runs in the daemon's own event loop
+- fork: a pre-warmed zygote forks one child per event, so handlers get
+  copy-on-write process isolation without paying import or config cost
+
+Wire protocol: the client writes the event JSON and shuts down its write
+side; the daemon replies with a single JSON object and closes the
+connection. The reply is either {"output": {...}} or {"error": "..."}.
+"""
+
+import argparse
+import asyncio
+import functools
+import gc
+import json
+import os
+import select
+import signal
+import socket
+import sys
+import time
+from pathlib import Path
+from typing import Any, Dict, Optional, Tuple
+
+from logflow import (
+    LogLevel,
+    disable_console_output,
+    get_logger,
+    log_error,
+    log_info,
+    run_segment_compressor,
+    start_segment_compressor,
+)
+from server import (
+    config_manager,
+    config_registry,
+    generated_hooks_path,
+    handle_hook_event,
+    regenerate_hooks_config,
+)
+from watcher import POLL_INTERVAL, ConfigWatcher
+
+
+# Seconds a fork server child waits for its client to send the event
+EVENT_READ_TIMEOUT = 5.0
+
+
+# ============================================================================
+# Socket Location
+# ============================================================================
+
+
+def get_socket_path() -> Path:
+    """Get the daemon socket path (keep in sync with bin/dispatch.py)."""
+    override = os.environ.get("PROMPTCTL_SOCKET")
+    if override:
+        return Path(override).expanduser()
+    return Path.home() / ".promptctl" / "promptctl.sock"
+
+
+# ============================================================================
+# Event Processing
+# ============================================================================
+
+
+async def process_event(
+    event_data: Dict[str, Any], debounce: bool = False
+) -> Dict[str, Any]:
+    """Run the hook pipeline and build the wire response.
+
+    Args:
+        event_data: Hook event payload
+        debounce: Let debounced handlers run after the response (shared
+            daemon only)
+    """
+    start_time = time.perf_counter()
+    try:
+        hook_output = await handle_hook_event(event_data, debounce=debounce)
+    except Exception as e:
+        log_error(
+            "Hook processing failed",
+            session_id=event_data.get("session_id"),
+            hook_name=event_data.get("hook_event_name"),
+            error=str(e),
+        )
+        return {"error": str(e)}
+
+    return {
+        "output": hook_output.model_dump(by_alias=True, exclude_none=True),
+        "timing": {"handle_ms": (time.perf_counter() - start_time) * 1000},
+    }
+
+
+async def run_once(event_data: Dict[str, Any]) -> Dict[str, Any]:
+    """Process a single event in-process, flushing logs before returning.
+
+    Used by dispatch.py when the daemon is not running. Nothing is logged
+    to the console, since stderr belongs to the hook.
+    """
+    disable_console_output()
+    await get_logger().start()
+    try:
+        return await process_event(event_data)
+    finally:
+        config_registry.flush_caches()
+        # handle_hook_event may have replaced the global logger
+        await get_logger().stop()
+
+
+# ============================================================================
+# Shared Daemon
+# ============================================================================
+
+
+class HookDaemon:
+    """Unix socket server running every hook event in one warm process."""
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = socket_path
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        """Bind the socket and start accepting connections."""
+        prepare_socket_path(self.socket_path)
+
+        self._server = await asyncio.start_unix_server(
+            self._handle_connection, path=str(self.socket_path)
+        )
+        os.chmod(self.socket_path, 0o600)
+
+        log_info(
+            "PromptCtl hook daemon listening",
+            data={"socket": str(self.socket_path), "pid": os.getpid()},
+        )
+
+    async def stop(self):
+        """Stop accepting connections and remove the socket file."""
+        if self._server:
+            self._server.close()
+            await self._server.wait_closed()
+            self._server = None
+
+        try:
+            self.socket_path.unlink()
+        except FileNotFoundError:
+            pass
+
+    async def _handle_connection(
+        self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter
+    ):
+        """Read one event, process it, write one response."""
+        try:
+            raw = await reader.read()
+            try:
+                event_data = json.loads(raw)
+            except json.JSONDecodeError as e:
+                response = {"error": f"Invalid JSON: {e}"}
+            else:
+                response = await process_event(event_data, debounce=True)
+
+            writer.write(json.dumps(response).encode("utf-8"))
+            await writer.drain()
+        except ConnectionError:
+            pass
+        finally:
+            writer.close()
+
+
+def prepare_socket_path(socket_path: Path):
+    """Create the socket directory and clear a stale socket file.
+
+    Raises:
+        RuntimeError: If another daemon is already serving the socket
+    """
+    socket_path.parent.mkdir(parents=True, exist_ok=True)
+
+    if not socket_path.exists():
+        return
+
+    probe = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    try:
+        probe.connect(str(socket_path))
+    except OSError:
+        # Nobody is listening - leftover from a crashed daemon
+        socket_path.unlink()
+    else:
+        raise RuntimeError(f"Daemon already running on {socket_path}")
+    finally:
+        probe.close()
+
+
+async def watch_config():
+    """Swap in a new config whenever the config file changes.
+
+    Parsing and validation run in a worker thread; events keep using the
+    current engine until the new one is ready.
+    """
+    watcher = ConfigWatcher(config_manager.config_path)
+    config_fd = watcher.fileno()
+    activity = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    if config_fd is not None:
+        loop.add_reader(config_fd, activity.set)
+
+    log_info(
+        "Watching config for changes",
+        data={"path": str(config_manager.config_path), "backend": watcher.backend},
+    )
+
+    try:
+        while True:
+            if config_fd is not None:
+                await activity.wait()
+                activity.clear()
+                watcher.drain()
+            else:
+                await asyncio.sleep(POLL_INTERVAL)
+            await config_manager.reload_if_changed_async()
+    finally:
+        if config_fd is not None:
+            loop.remove_reader(config_fd)
+        watcher.close()
+
+
+async def serve_shared(socket_path: Path):
+    """Run the shared daemon until SIGINT/SIGTERM."""
+    await get_logger().start()
+    start_segment_compressor()
+
+    # Compile the config up front, so the first event doesn't pay for it
+    # and the watcher has a loaded config to compare against
+    config_manager.get_engine()
+
+    daemon = HookDaemon(socket_path)
+    await daemon.start()
+    watch_task = asyncio.create_task(watch_config())
+
+    stop_event = asyncio.Event()
+    loop = asyncio.get_running_loop()
+    for sig in (signal.SIGINT, signal.SIGTERM):
+        loop.add_signal_handler(sig, stop_event.set)
+
+    try:
+        await stop_event.wait()
+    finally:
+        watch_task.cancel()
+        await daemon.stop()
+        # Run pending trailing-edge bursts instead of dropping them
+        for engine in config_registry.engines():
+            await engine.debouncer.flush()
+        config_registry.flush_caches()
+        log_info("PromptCtl hook daemon stopped")
+        await get_logger().stop()
+
+
+# ============================================================================
+# Fork Server (Zygote)
+# ============================================================================
+
+
+class ForkServer:
+    """Pre-warmed zygote that forks a child process per hook event.
+
+    The parent imports the pipeline and loads the config once, then only
+    accepts connections and forks; it never waits on a client. Each child
+    reads its event, handles it with the state it inherited copy-on-write
+    and exits. A child whose project config wasn't compiled in the parent
+    compiles it itself and reports the project over a pipe; the parent
+    compiles it when no connection is waiting, keeping it in
+    config_registry like the shared daemon does, so later children inherit
+    the engine.
+
+    The parent never starts a thread, since a child forked while another
+    thread holds a lock (the allocator's, logging's) could deadlock. Log
+    segments are compressed by a helper process forked next to the
+    children instead.
+    """
+
+    def __init__(self, socket_path: Path):
+        self.socket_path = socket_path
+        self._listener: Optional[socket.socket] = None
+        self._compressor_pid: Optional[int] = None
+        # Pipe on which children name the projects the parent should warm
+        self._warm_pipe: Optional[Tuple[int, int]] = None
+        self._pending_projects: Dict[str, None] = {}
+
+    def warm_up(self):
+        """Load everything a child needs before the first fork."""
+        config = config_manager.get_config()
+        log_info(
+            "PromptCtl fork server warmed up",
+            data={
+                "socket": str(self.socket_path),
+                "pid": os.getpid(),
+                "handlers": len(config.handlers),
+            },
+        )
+        self._settle()
+        self._start_compressor()
+
+    def _start_compressor(self):
+        """Fork the segment compressor process, replacing a running one.
+
+        It's restarted after each config reload to pick up the new logging
+        settings, and exits by itself if the parent dies.
+        """
+        self._stop_compressor()
+        parent_pid = os.getpid()
+        pid = os.fork()
+        if pid == 0:
+            exit_code = 0
+            try:
+                if self._listener is not None:
+                    self._listener.close()
+                if self._warm_pipe is not None:
+                    for fd in self._warm_pipe:
+                        os.close(fd)
+                signal.signal(signal.SIGINT, signal.SIG_IGN)
+                signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+                run_segment_compressor(lambda: os.getppid() == parent_pid)
+            except SystemExit:
+                pass
+            except BaseException:
+                exit_code = 1
+            finally:
+                get_logger().close()
+                os._exit(exit_code)
+        self._compressor_pid = pid
+
+    def _stop_compressor(self):
+        """Stop the segment compressor process, if any."""
+        if self._compressor_pid is None:
+            return
+        try:
+            os.kill(self._compressor_pid, signal.SIGTERM)
+        except ProcessLookupError:
+            pass
+        self._compressor_pid = None
+
+    def _settle(self):
+        """Get the parent's state ready to be shared with children."""
+        # Write out pending log entries and stop the writer thread, so
+        # children don't inherit either
+        get_logger().close()
+
+        # Keep warm objects out of the collector so children don't dirty
+        # shared pages by touching their GC headers
+        gc.freeze()
+
+    def serve_forever(self):
+        """Accept connections and fork a child for each one.
+
+        Between connections the parent reloads the config when its file
+        changed, so children always start from a compiled, validated engine,
+        and compiles the project configs children asked for.
+        """
+        prepare_socket_path(self.socket_path)
+
+        self._listener = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+        self._listener.bind(str(self.socket_path))
+        os.chmod(self.socket_path, 0o600)
+        self._listener.listen(64)
+
+        warm_reader, warm_writer = self._warm_pipe = os.pipe()
+        os.set_blocking(warm_reader, False)
+        # A child never blocks on a full pipe; its request is just dropped
+        os.set_blocking(warm_writer, False)
+
+        # Children are never waited on; let the kernel reap them
+        signal.signal(signal.SIGCHLD, signal.SIG_IGN)
+
+        watcher = ConfigWatcher(config_manager.config_path)
+        config_fd = watcher.fileno()
+        watched = [self._listener, warm_reader]
+        if config_fd is not None:
+            watched.append(config_fd)
+        next_poll = time.monotonic() + POLL_INTERVAL
+
+        try:
+            while True:
+                if self._pending_projects:
+                    timeout = 0
+                else:
+                    timeout = None if config_fd is not None else POLL_INTERVAL
+                readable, _, _ = select.select(watched, [], [], timeout)
+
+                if self._listener in readable:
+                    conn, _ = self._listener.accept()
+                    fork_time = time.perf_counter()
+                    pid = os.fork()
+                    if pid == 0:
+                        self._listener.close()
+                        os.close(warm_reader)
+                        watcher.close()
+                        self._run_child(conn, fork_time)
+                    conn.close()
+
+                if warm_reader in readable:
+                    self._read_warm_requests()
+
+                if config_fd in readable or (
+                    config_fd is None and time.monotonic() >= next_poll
+                ):
+                    watcher.drain()
+                    next_poll = time.monotonic() + POLL_INTERVAL
+                    if config_manager.config_changed():
+                        # Settle even if the new config is invalid: the
+                        # error was logged
+                        reloaded = config_manager.reload_if_changed()
+                        self._settle()
+                        if reloaded:
+                            self._start_compressor()
+
+                # Only when no connection is waiting, one project at a time
+                if self._pending_projects and self._listener not in readable:
+                    cwd = next(iter(self._pending_projects))
+                    del self._pending_projects[cwd]
+                    self._warm_project(cwd)
+        finally:
+            self._stop_compressor()
+            watcher.close()
+            self._listener.close()
+            for fd in self._warm_pipe:
+                os.close(fd)
+            self._warm_pipe = None
+            try:
+                self.socket_path.unlink()
+            except FileNotFoundError:
+                pass
+
+    def _receive(
+        self, conn: socket.socket
+    ) -> Tuple[Optional[Dict[str, Any]], Optional[str]]:
+        """Read one event from the client, in the child.
+
+        Returns:
+            Tuple of (event data, error message if it couldn't be read)
+        """
+        conn.settimeout(EVENT_READ_TIMEOUT)
+        chunks = []
+        try:
+            while True:
+                chunk = conn.recv(65536)
+                if not chunk:
+                    break
+                chunks.append(chunk)
+        except OSError as e:
+            return None, f"Failed to read event: {e}"
+        finally:
+            conn.settimeout(None)
+
+        try:
+            event_data = json.loads(b"".join(chunks))
+        except json.JSONDecodeError as e:
+            return None, f"Invalid JSON: {e}"
+        if not isinstance(event_data, dict):
+            return None, "Invalid event: expected a JSON object"
+        return event_data, None
+
+    @staticmethod
+    def _project_is_warm(cwd: Optional[str]) -> bool:
+        """Whether events from cwd use an engine that is compiled and current.
+
+        The default config is reloaded by the watcher in serve_forever.
+        """
+        manager = config_registry.manager_for(cwd)
+        return manager is config_manager or (
+            manager.loaded and not manager.config_changed()
+        )
+
+    def _request_warm_up(self, cwd: Optional[str]):
+        """Ask the parent to compile the project config of cwd (in a child).
+
+        The request is dropped if the pipe is full or the path too long to
+        be written atomically; a later event asks again.
+        """
+        if not cwd or self._project_is_warm(cwd):
+            return
+        request = os.fsencode(cwd) + b"\n"
+        if len(request) > select.PIPE_BUF:
+            return
+        try:
+            os.write(self._warm_pipe[1], request)
+        except OSError:
+            pass
+
+    def _read_warm_requests(self):
+        """Queue the projects children asked the parent to compile."""
+        data = b""
+        while True:
+            try:
+                chunk = os.read(self._warm_pipe[0], 65536)
+            except BlockingIOError:
+                break
+            if not chunk:
+                break
+            data += chunk
+        for line in data.splitlines():
+            self._pending_projects[os.fsdecode(line)] = None
+
+    def _warm_project(self, cwd: str):
+        """Compile the engine for events from cwd in the parent.
+
+        A project config is compiled once in the parent, after its first
+        event and after each edit, instead of in every child.
+        """
+        if self._project_is_warm(cwd):
+            return
+        manager = config_registry.manager_for(cwd)
+        try:
+            if manager.loaded:
+                manager.reload_if_changed()
+            else:
+                manager.get_engine()
+        except Exception as e:
+            # Children keep loading it themselves and report the error
+            log_error(
+                "Failed to load project config",
+                data={"path": str(manager.config_path)},
+                error=str(e),
+            )
+        self._settle()
+
+    def _run_child(self, conn: socket.socket, fork_time: float):
+        """Read and handle one event in the forked child and exit."""
+        exit_code = 0
+        try:
+            signal.signal(signal.SIGCHLD, signal.SIG_DFL)
+            signal.signal(signal.SIGINT, signal.SIG_DFL)
+            signal.signal(signal.SIGTERM, signal.SIG_DFL)
+
+            event_data, error = self._receive(conn)
+            if event_data is None:
+                response = {"error": error}
+            else:
+                self._request_warm_up(event_data.get("cwd"))
+                response = asyncio.run(self._process(event_data, fork_time))
+
+            conn.sendall(json.dumps(response).encode("utf-8"))
+            conn.close()
+            # The hook has its answer; result cache stats can wait
+            config_registry.flush_caches()
+        except Exception:
+            exit_code = 1
+        finally:
+            conn.close()
+            # Skip interpreter teardown and atexit handlers inherited
+            # from the parent
+            os._exit(exit_code)
+
+    async def _process(
+        self, event_data: Dict[str, Any], fork_time: float
+    ) -> Dict[str, Any]:
+        """Run the pipeline and record fork-to-response latency."""
+        await get_logger().start()
+        try:
+            response = await process_event(event_data)
+            fork_to_response_ms = (time.perf_counter() - fork_time) * 1000
+            response.setdefault("timing", {})
+            response["timing"]["mode"] = "fork"
+            response["timing"]["fork_to_response_ms"] = fork_to_response_ms
+
+            get_logger().log(
+                LogLevel.PERFORMANCE,
+                "Fork-to-response latency",
+                session_id=event_data.get("session_id"),
+                hook_name=event_data.get("hook_event_name"),
+                duration_ms=fork_to_response_ms,
+                data={"pid": os.getpid()},
+            )
+            return response
+        finally:
+            await get_logger().stop()
+
+
+def serve_fork(socket_path: Path):
+    """Run the fork server until SIGINT/SIGTERM."""
+    signal.signal(signal.SIGTERM, lambda signum, frame: sys.exit(0))
+
+    server = ForkServer(socket_path)
+    server.warm_up()
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+
+
+def main():
+    """Main entry point for the hook daemon."""
+    parser = argparse.ArgumentParser(description="PromptCtl hook daemon")
+    parser.add_argument(
+        "--socket",
+        type=Path,
+        default=None,
+        help="Socket path (default: $PROMPTCTL_SOCKET or ~/.promptctl/promptctl.sock)",
+    )
+    parser.add_argument(
+        "--mode",
+        choices=["shared", "fork"],
+        default="shared",
+        help="shared: one warm event loop; fork: one forked child per event",
+    )
+    parser.add_argument(
+        "--hooks-config",
+        type=Path,
+        default=None,
+        help="Where to write the generated hooks.json (default: ~/.promptctl/hooks.json)",
+    )
+    args = parser.parse_args()
+
+    socket_path = args.socket or get_socket_path()
+
+    # The daemon regenerates hooks.json whenever it loads a changed config,
+    # outside the plugin checkout unless told otherwise. In-process dispatch
+    # never does.
+    config_manager.add_listener(
+        functools.partial(
+            regenerate_hooks_config, output_path=args.hooks_config or generated_hooks_path()
+        )
+    )
+
+    try:
+        if args.mode == "fork":
+            serve_fork(socket_path)
+        else:
+            asyncio.run(serve_shared(socket_path))
+    except RuntimeError as e:
+        print(f"Error: {e}", file=sys.stderr)
+        sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
@@ -4,23 +4,38 @@ LogFlow - Premium logging system for PromptCtl
 
 A flagship logging implementation with:
 - Semantic log levels
-- Async non-blocking architecture
+- Non-blocking capture with a dedicated writer thread
 - JSONL storage with rotation
 - Beautiful console output
 - Powerful query capabilities
 """
 
-import asyncio
+import atexit
+import bisect
+import heapq
+import itertools
 import json
+import os
 import sys
+import threading
+import time
 from datetime import datetime
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, TextIO
+from typing import Any, BinaryIO, Callable, Dict, List, Optional, Tuple, Union
 from collections import deque
 
 from pydantic import BaseModel, Field
 
+from logstore import (
+    IndexKeys,
+    SegmentCompressor,
+    index_path,
+    index_record,
+    resolve_codec,
+    seal_segment,
+)
+
 
 # ============================================================================
 # Semantic Log Levels
@@ -51,6 +66,7 @@ class LogLevel(str, Enum):
     ACTION_START = "ACTION_START"
     ACTION_RESULT = "ACTION_RESULT"
     ACTION_ERROR = "ACTION_ERROR"
+    ACTION_OUTPUT = "ACTION_OUTPUT"
 
     # Context and state
     CONTEXT_RENDER = "CONTEXT_RENDER"
@@ -78,12 +94,37 @@ LEVEL_PRIORITY = {
     LogLevel.ACTION_START: 20,
     LogLevel.ACTION_RESULT: 20,
     LogLevel.ACTION_ERROR: 40,
+    LogLevel.ACTION_OUTPUT: 20,
     LogLevel.CONTEXT_RENDER: 10,
     LogLevel.STATE_CHANGE: 15,
     LogLevel.PERFORMANCE: 20,
     LogLevel.SLOW_OPERATION: 30,
 }
 
+# ERROR-class levels: exempt from the overflow policy and rate limiter, and
+# buffered in their own lane of reserved_size entries
+RESERVED_PRIORITY = LEVEL_PRIORITY[LogLevel.ERROR]
+
+
+def _level_class(priority: int) -> str:
+    """Rate limit class of a level priority: debug, info, warn, or error."""
+    if priority >= RESERVED_PRIORITY:
+        return "error"
+    if priority >= LEVEL_PRIORITY[LogLevel.WARN]:
+        return "warn"
+    if priority >= LEVEL_PRIORITY[LogLevel.INFO]:
+        return "info"
+    return "debug"
+
+
+LEVEL_CLASS = {level: _level_class(priority) for level, priority in LEVEL_PRIORITY.items()}
+
+# Token buckets kept for per-session rate limiting before idle ones are pruned
+MAX_RATE_BUCKETS = 1024
+
+# Seconds between writer thread flushes (sooner once the buffer is half full)
+FLUSH_INTERVAL = 0.1
+
 
 # ============================================================================
 # Log Entry Models
@@ -130,6 +171,113 @@ class LogEntry(BaseModel):
         return cls(**data)
 
 
+# Shared encoder: json.dumps() with options builds a new encoder per call
+_JSON_ENCODER = json.JSONEncoder(ensure_ascii=False, default=str)
+
+
+class LogRecord:
+    """Compact log entry captured on the hot path.
+
+    LogFlow.log() stores these instead of LogEntry models: capturing one is
+    a plain attribute assignment, with no validation or default factories.
+    Records serialize to the same JSONL as LogEntry.to_jsonl() and convert
+    to a LogEntry only where a model is needed. The data dict is stored as
+    passed, not copied; a level given by name is converted to its LogLevel.
+    """
+
+    __slots__ = (
+        "wall_time",
+        "monotonic_ns",
+        "level",
+        "message",
+        "session_id",
+        "hook_name",
+        "handler_name",
+        "action_type",
+        "data",
+        "duration_ms",
+        "error",
+        "traceback",
+    )
+
+    def __init__(
+        self,
+        level: LogLevel,
+        message: str,
+        session_id: Optional[str] = None,
+        hook_name: Optional[str] = None,
+        handler_name: Optional[str] = None,
+        action_type: Optional[str] = None,
+        data: Optional[Dict[str, Any]] = None,
+        duration_ms: Optional[float] = None,
+        error: Optional[str] = None,
+        traceback: Optional[str] = None,
+    ):
+        # Wall clock for display and storage, monotonic clock for ordering
+        # and intervals that must not jump with the system time
+        self.wall_time = time.time()
+        self.monotonic_ns = time.monotonic_ns()
+        self.level = level if isinstance(level, LogLevel) else LogLevel(level)
+        self.message = message
+        self.session_id = session_id
+        self.hook_name = hook_name
+        self.handler_name = handler_name
+        self.action_type = action_type
+        self.data = data if data is not None else {}
+        self.duration_ms = duration_ms
+        self.error = error
+        self.traceback = traceback
+
+    @property
+    def timestamp(self) -> datetime:
+        """Wall-clock time of the record as a local datetime."""
+        return datetime.fromtimestamp(self.wall_time)
+
+    def to_dict(self) -> Dict[str, Any]:
+        """Build the JSON object of the record (LogEntry field order, no None values)."""
+        record = {
+            "timestamp": self.timestamp.isoformat(),
+            "level": self.level,
+            "message": self.message,
+        }
+        if self.session_id is not None:
+            record["session_id"] = self.session_id
+        if self.hook_name is not None:
+            record["hook_name"] = self.hook_name
+        if self.handler_name is not None:
+            record["handler_name"] = self.handler_name
+        if self.action_type is not None:
+            record["action_type"] = self.action_type
+        record["data"] = self.data
+        if self.duration_ms is not None:
+            record["duration_ms"] = self.duration_ms
+        if self.error is not None:
+            record["error"] = self.error
+        if self.traceback is not None:
+            record["traceback"] = self.traceback
+        return record
+
+    def to_jsonl(self) -> str:
+        """Convert to JSONL format (single line JSON)."""
+        return _JSON_ENCODER.encode(self.to_dict())
+
+    def to_entry(self) -> LogEntry:
+        """Convert to a LogEntry model."""
+        return LogEntry(
+            timestamp=self.timestamp,
+            level=self.level,
+            message=self.message,
+            session_id=self.session_id,
+            hook_name=self.hook_name,
+            handler_name=self.handler_name,
+            action_type=self.action_type,
+            data=self.data,
+            duration_ms=self.duration_ms,
+            error=self.error,
+            traceback=self.traceback,
+        )
+
+
 # ============================================================================
 # Logging Configuration
 # ============================================================================
@@ -154,6 +302,19 @@ class JsonlOutputConfig(BaseModel):
     )
     rotation: str = Field(default="daily", description="Rotation: daily, size")
     max_size_mb: int = Field(default=100, description="Max size for size rotation")
+    compress: str = Field(
+        default="auto",
+        description="Rotated segment compression: auto, zstd, gzip, none",
+    )
+    index: bool = Field(
+        default=True, description="Maintain a sidecar index per segment"
+    )
+    fsync: str = Field(
+        default="none", description="Durability: none, batch, interval"
+    )
+    fsync_interval_ms: int = Field(
+        default=1000, description="Time between fsyncs for fsync: interval"
+    )
 
 
 class LoggingConfig(BaseModel):
@@ -162,8 +323,36 @@ class LoggingConfig(BaseModel):
     enabled: bool = True
     level: LogLevel = LogLevel.INFO
     buffer_size: int = Field(default=10000, description="Async buffer size")
+    reserved_size: int = Field(
+        default=1000,
+        description="Buffered ERROR-class entries; more are dropped as reserved_full",
+    )
     rate_limit: int = Field(
-        default=1000, description="Max entries per second (0 = unlimited)"
+        default=1000,
+        description="Max entries per second per level class (0 = unlimited)",
+    )
+    rate_limits: Dict[str, int] = Field(
+        default_factory=dict,
+        description="Per-class overrides of rate_limit: debug, info, warn",
+    )
+    rate_burst: float = Field(
+        default=1.0, description="Bucket capacity, in seconds of rate budget"
+    )
+    rate_limit_per_session: bool = Field(
+        default=False, description="Separate rate budgets for each session_id"
+    )
+    overflow: str = Field(
+        default="drop_oldest",
+        description="Full buffer policy: drop_oldest, drop_newest, block, sample",
+    )
+    block_timeout_ms: int = Field(
+        default=100, description="Max wait for buffer space with overflow: block"
+    )
+    sample_rate: int = Field(
+        default=10, description="Keep 1 in N entries with overflow: sample"
+    )
+    drop_report_interval: float = Field(
+        default=10.0, description="Seconds between dropped-entry reports"
     )
 
     console: ConsoleOutputConfig = Field(default_factory=ConsoleOutputConfig)
@@ -194,6 +383,7 @@ class ConsoleFormatter:
         LogLevel.ACTION_START: "\033[36m",  # Cyan
         LogLevel.ACTION_RESULT: "\033[32m",  # Green
         LogLevel.ACTION_ERROR: "\033[31m",  # Red
+        LogLevel.ACTION_OUTPUT: "\033[90m",  # Gray
         LogLevel.CONTEXT_RENDER: "\033[90m",  # Gray
         LogLevel.STATE_CHANGE: "\033[35m",  # Magenta
         LogLevel.PERFORMANCE: "\033[33m",  # Yellow
@@ -216,6 +406,7 @@ class ConsoleFormatter:
         LogLevel.ACTION_START: "▶️ ",
         LogLevel.ACTION_RESULT: "✓",
         LogLevel.ACTION_ERROR: "✗",
+        LogLevel.ACTION_OUTPUT: "│",
         LogLevel.CONTEXT_RENDER: "🔄",
         LogLevel.STATE_CHANGE: "📝",
         LogLevel.PERFORMANCE: "⚡",
@@ -232,8 +423,8 @@ class ConsoleFormatter:
         self.show_input = show_input
         self.show_output = show_output
 
-    def format(self, entry: LogEntry, format_type: str = "rich") -> str:
-        """Format log entry for console output."""
+    def format(self, entry: Union[LogEntry, "LogRecord"], format_type: str = "rich") -> str:
+        """Format a log entry or record for console output."""
         if format_type == "json":
             return entry.to_jsonl()
         elif format_type == "simple":
@@ -330,27 +521,51 @@ class ConsoleFormatter:
 # ============================================================================
 
 
+def log_path(config: JsonlOutputConfig) -> Path:
+    """Current log file path for config, with date substitution."""
+    date_str = datetime.now().strftime("%Y-%m-%d")
+
+    # Expand home directory
+    path_str = config.path.replace("~", str(Path.home()))
+
+    # Replace {date} placeholder
+    path_str = path_str.replace("{date}", date_str)
+
+    return Path(path_str)
+
+
 class JsonlStorage:
-    """JSONL file storage with rotation."""
+    """JSONL file storage with rotation.
+
+    Entries are written in batches: one write and one flush per batch, plus
+    an fsync depending on the durability policy. The current file's size is
+    tracked in memory, so size rotation needs no stat() per write; a full
+    file is sealed under a numbered name (see logstore) and a fresh one is
+    started. One stat() per batch notices when another process sealed or
+    removed the file, so writes follow the current segment.
+
+    After each batch a line describing it is appended to the segment's
+    sidecar index (see logstore). The index isn't synced: whatever a crash
+    loses is scanned, or rebuilt, from the JSONL.
+    """
 
     def __init__(self, config: JsonlOutputConfig):
         self.config = config
         self.current_file: Optional[Path] = None
-        self.current_handle: Optional[TextIO] = None
+        self.current_handle: Optional[BinaryIO] = None
         self.current_date: Optional[str] = None
+        self.current_inode: Optional[int] = None
+        self.index_handle: Optional[BinaryIO] = None
+        self.bytes_written = 0
+        self._max_bytes = config.max_size_mb * 1024 * 1024
+        self._fsync_interval = config.fsync_interval_ms / 1000
+        self._last_fsync = time.monotonic()
+        # Whether data was written since the last fsync
+        self._unsynced = False
 
     def _get_log_path(self) -> Path:
         """Get current log file path with date substitution."""
-        path_template = self.config.path
-        date_str = datetime.now().strftime("%Y-%m-%d")
-
-        # Expand home directory
-        path_str = path_template.replace("~", str(Path.home()))
-
-        # Replace {date} placeholder
-        path_str = path_str.replace("{date}", date_str)
-
-        return Path(path_str)
+        return log_path(self.config)
 
     def _should_rotate(self) -> bool:
         """Check if log file should be rotated."""
@@ -360,106 +575,364 @@ class JsonlStorage:
                 return True
 
         elif self.config.rotation == "size":
-            if self.current_file and self.current_file.exists():
-                size_mb = self.current_file.stat().st_size / (1024 * 1024)
-                if size_mb >= self.config.max_size_mb:
-                    return True
+            if self.current_file and self.bytes_written >= self._max_bytes:
+                return True
 
         return False
 
+    def _replaced(self) -> bool:
+        """Check whether the current file was sealed or removed by someone else."""
+        try:
+            return os.stat(self.current_file).st_ino != self.current_inode
+        except OSError:
+            return True
+
     def _rotate(self):
-        """Rotate log file."""
+        """Rotate log file, sealing it if it's full."""
+        full = (
+            self.config.rotation == "size"
+            and self.current_file is not None
+            and self.bytes_written >= self._max_bytes
+            and not self._replaced()
+        )
+
         if self.current_handle:
+            if self.config.fsync != "none":
+                self._fsync()
             self.current_handle.close()
             self.current_handle = None
+        if self.index_handle:
+            self.index_handle.close()
+            self.index_handle = None
+
+        if full:
+            seal_segment(self.current_file)
+            if _compressor is not None:
+                _compressor.wake()
 
         self.current_file = None
         self.current_date = None
-
-    def write(self, entry: LogEntry):
+        self.current_inode = None
+        self.bytes_written = 0
+
+    def _open(self):
+        """Open the current log file for appending."""
+        self.current_file = self._get_log_path()
+        self.current_date = datetime.now().strftime("%Y-%m-%d")
+
+        # Create directory if needed
+        self.current_file.parent.mkdir(parents=True, exist_ok=True)
+
+        # Open file in append mode; the size is read once, then tracked
+        self.current_handle = open(self.current_file, "ab")
+        self.bytes_written = self.current_handle.tell()
+        self.current_inode = os.fstat(self.current_handle.fileno()).st_ino
+        if self.config.index:
+            self.index_handle = open(index_path(self.current_file), "ab")
+
+    def _fsync(self):
+        """Force written data to disk."""
+        os.fsync(self.current_handle.fileno())
+        self._last_fsync = time.monotonic()
+        self._unsynced = False
+
+    def sync_if_due(self):
+        """Fsync unsynced data once fsync_interval_ms passed (fsync: interval).
+
+        Called after every batch and on the writer thread's idle wakeups,
+        so the last entries before a quiet period are synced too.
+        """
+        if (
+            self.config.fsync == "interval"
+            and self._unsynced
+            and self.current_handle is not None
+            and time.monotonic() - self._last_fsync >= self._fsync_interval
+        ):
+            self._fsync()
+
+    def write(self, entry: Union[LogEntry, LogRecord]):
         """Write log entry to JSONL file."""
-        if not self.config.enabled:
+        self.write_batch([entry])
+
+    def write_batch(self, entries: List[Union[LogEntry, LogRecord]]):
+        """Write log entries to the JSONL file with one write and flush.
+
+        With size rotation, a batch that fills the file is split at the line
+        boundary and the rest goes to a fresh segment.
+        """
+        if not self.config.enabled or not entries:
             return
 
-        # Check for rotation
-        if self._should_rotate():
-            self._rotate()
+        lines = [(entry.to_jsonl() + "\n").encode("utf-8") for entry in entries]
+        # Byte offset of the end of each line within the batch
+        ends = list(itertools.accumulate(map(len, lines)))
+        start = 0
+        while start < len(lines):
+            # Check for rotation
+            if self._should_rotate() or (self.current_file is not None and self._replaced()):
+                self._rotate()
+
+            # Open new file if needed
+            if self.current_file is None:
+                self._open()
+
+            # With size rotation, stop after the line that fills the file
+            end = len(lines)
+            base = ends[start - 1] if start else 0
+            room = self._max_bytes - self.bytes_written
+            if self.config.rotation == "size" and ends[-1] - base > room:
+                end = bisect.bisect_left(ends, base + room, lo=start) + 1
+
+            payload = b"".join(lines[start:end])
+            self.current_handle.write(payload)
+            self.current_handle.flush()
+            self.bytes_written += len(payload)
+
+            if self.index_handle is not None:
+                offsets = [ends[index] - len(lines[index]) - base for index in range(start, end)]
+                self._index(entries[start:end], offsets, len(payload))
+            start = end
+
+        self._unsynced = True
+        if self.config.fsync == "batch":
+            self._fsync()
+        else:
+            self.sync_if_due()
+
+    def _index(self, entries: List[Union[LogEntry, LogRecord]], offsets: List[int], size: int):
+        """Append the index line of a batch just written."""
+        # In append mode the position after the write is the end of our
+        # own data, even with other processes appending to the file
+        end = self.current_handle.tell()
+        keys = [_index_keys(entry) for entry in entries]
+        try:
+            self.index_handle.write(index_record(end - size, end, keys, offsets))
+            self.index_handle.flush()
+        except OSError:
+            # Readers scan what the index misses
+            self.index_handle.close()
+            self.index_handle = None
 
-        # Open new file if needed
-        if self.current_file is None:
-            self.current_file = self._get_log_path()
-            self.current_date = datetime.now().strftime("%Y-%m-%d")
+    def close(self):
+        """Close current file handle (the next write reopens the file)."""
+        self._rotate()
+
+
+def _index_keys(entry: Union[LogEntry, LogRecord]) -> IndexKeys:
+    """Index keys of an entry (see logstore.IndexKeys)."""
+    if isinstance(entry, LogRecord):
+        wall_time = entry.wall_time
+    else:
+        wall_time = entry.timestamp.timestamp()
+    return (
+        wall_time,
+        entry.level.value,
+        entry.session_id,
+        entry.handler_name,
+        entry.error is not None,
+        entry.duration_ms,
+    )
 
-            # Create directory if needed
-            self.current_file.parent.mkdir(parents=True, exist_ok=True)
 
-            # Open file in append mode
-            self.current_handle = open(self.current_file, "a", encoding="utf-8")
+# ============================================================================
+# Rate Limiter
+# ============================================================================
 
-        # Write JSONL entry
-        if self.current_handle:
-            self.current_handle.write(entry.to_jsonl() + "\n")
-            self.current_handle.flush()
 
-    def close(self):
-        """Close current file handle."""
-        if self.current_handle:
-            self.current_handle.close()
-            self.current_handle = None
+class TokenBucket:
+    """Token bucket refilled at rate tokens/second on the monotonic clock."""
+
+    __slots__ = ("rate", "capacity", "tokens", "updated_ns")
+
+    def __init__(self, rate: int, burst: float):
+        self.rate = rate
+        self.capacity = max(rate * burst, 1.0)
+        self.tokens = self.capacity
+        self.updated_ns = time.monotonic_ns()
+
+    def refill(self, now_ns: int) -> float:
+        """Add the tokens earned since the last update."""
+        tokens = self.tokens + (now_ns - self.updated_ns) * self.rate / 1e9
+        self.tokens = min(tokens, self.capacity)
+        self.updated_ns = now_ns
+        return self.tokens
+
+    def take(self, now_ns: int) -> bool:
+        """Spend one token if there is one."""
+        if self.refill(now_ns) < 1.0:
+            return False
+        self.tokens -= 1.0
+        return True
+
+
+class RateLimiter:
+    """
+    Token buckets per level class, and optionally per session.
+
+    ERROR-class levels are never limited. With per_session, each session_id
+    gets its own buckets, so one chatty session can't use up the budget of
+    the others; idle buckets are pruned once there are MAX_RATE_BUCKETS.
+    """
+
+    def __init__(self, config: "LoggingConfig"):
+        self.rates = {
+            level_class: config.rate_limits.get(level_class, config.rate_limit)
+            for level_class in ("debug", "info", "warn")
+        }
+        self.burst = config.rate_burst
+        self.per_session = config.rate_limit_per_session
+        self._buckets: Dict[Tuple[str, Optional[str]], TokenBucket] = {}
+
+    def allow(self, level_class: str, session_id: Optional[str] = None) -> bool:
+        """Check whether an entry of level_class may be logged now."""
+        rate = self.rates.get(level_class, 0)
+        if rate <= 0:
+            return True
+
+        key = (level_class, session_id if self.per_session else None)
+        now_ns = time.monotonic_ns()
+        bucket = self._buckets.get(key)
+        if bucket is None:
+            if len(self._buckets) >= MAX_RATE_BUCKETS:
+                self._prune(now_ns)
+            bucket = self._buckets[key] = TokenBucket(rate, self.burst)
+        return bucket.take(now_ns)
+
+    def _prune(self, now_ns: int):
+        """Drop full (idle) buckets, or the least recently used one."""
+        idle = [
+            key
+            for key, bucket in self._buckets.items()
+            if bucket.refill(now_ns) >= bucket.capacity
+        ]
+        if not idle:
+            idle = [min(self._buckets, key=lambda key: self._buckets[key].updated_ns)]
+        for key in idle:
+            del self._buckets[key]
 
 
 # ============================================================================
-# Async LogFlow Engine
+# LogFlow Engine
 # ============================================================================
 
 
 class LogFlow:
     """
-    Async logging engine with three-layer pipeline:
+    Logging engine with three-layer pipeline:
     Capture → Process → Store
+
+    log() only appends a record to the buffer. A dedicated writer thread,
+    started on first use, drains it every FLUSH_INTERVAL (or as soon as it
+    is half full) and does all console and file I/O, so a slow disk or a
+    stalled stderr pipe never blocks the caller or its event loop. This
+    works the same from sync code, async code and short-lived processes:
+    close() (or stop()) drains the buffer and joins the thread, and the
+    global logger is closed at interpreter exit.
+
+    The buffer holds at most buffer_size entries. When it is full the
+    overflow policy decides what is lost:
+    - drop_oldest: evict the oldest buffered entry
+    - drop_newest: discard the incoming entry
+    - block: wait up to block_timeout_ms for the flush to make room (on
+      the writer thread itself, the buffer is written out inline), then
+      discard the incoming entry
+    - sample: keep 1 in sample_rate incoming entries, evicting the oldest
+    ERROR-class entries bypass the overflow policy and the rate limiter in
+    a lane of their own, bounded by reserved_size: once it is full, further
+    ones are dropped (reason "reserved_full") until the next flush. Drops
+    are counted per level (and per session for rate limiting) and reported
+    as a WARN entry every drop_report_interval seconds.
     """
 
     def __init__(self, config: LoggingConfig):
         self.config = config
-        self.buffer: deque = deque(maxlen=config.buffer_size)
+        self.buffer: deque = deque()
+        # ERROR-class entries; merged back in time order
+        self._reserved: deque = deque()
         self.console_formatter = ConsoleFormatter(
             colors=config.console.colors, show_data=config.console.show_data
         )
+        self.console_enabled = config.console.enabled and _console_allowed
         self.jsonl_storage = JsonlStorage(config.jsonl)
 
-        # Async processing
+        # Overflow handling
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._sample_count = 0
+        # Totals per reason ("overflow", "rate_limit") and level
+        self.dropped: Dict[str, Dict[str, int]] = {"overflow": {}, "rate_limit": {}}
+        self._unreported: Dict[str, Dict[str, int]] = {}
+        self._unreported_sessions: Dict[str, int] = {}
+        self._last_drop_report = time.monotonic()
+        self.rate_limiter = RateLimiter(config)
+
+        # Writer thread
+        self._high_water = max(config.buffer_size // 2, 1)
+        self._reserved_high_water = max(config.reserved_size // 2, 1)
+        self._wake = threading.Event()
         self._running = False
-        self._task: Optional[asyncio.Task] = None
-        self._last_log_time = datetime.now()
-        self._log_count_this_second = 0
+        self._writer: Optional[threading.Thread] = None
+        self._writer_pid: Optional[int] = None
+        # Writer loop iterations that raised; the loop keeps running
+        self.writer_errors = 0
+
+    def open(self):
+        """Start the writer thread (log() does this on first use)."""
+        with self._lock:
+            if self._writer is not None and self._writer_pid == os.getpid():
+                return
+            self._running = True
+            self._writer = threading.Thread(
+                target=self._writer_loop, name="logflow-writer", daemon=True
+            )
+            self._writer_pid = os.getpid()
+            self._writer.start()
 
-    async def start(self):
-        """Start async log processing."""
-        if self._running:
-            return
+    def close(self):
+        """Stop the writer thread and write out everything still buffered."""
+        writer = self._writer
+        if writer is not None and self._writer_pid == os.getpid():
+            self._running = False
+            self._wake.set()
+            if writer is not threading.current_thread():
+                writer.join()
+        self._writer = None
+
+        # Flush remaining entries, including a final drop report
+        self._report_drops(force=True)
+        self._flush()
 
-        self._running = True
-        self._task = asyncio.create_task(self._process_loop())
+        # Close storage
+        self.jsonl_storage.close()
+
+    async def start(self):
+        """Start log processing."""
+        self.open()
 
     async def stop(self):
-        """Stop async log processing and flush."""
+        """Stop log processing and flush."""
+        self.close()
+
+    def after_fork(self):
+        """Reset state inherited by a forked child.
+
+        The parent's writer thread doesn't exist in the child, its locks may
+        have been held at fork time, and its buffered entries are the
+        parent's to write.
+        """
+        self._lock = threading.Lock()
+        self._not_full = threading.Condition(self._lock)
+        self._wake = threading.Event()
         self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
-
-        # Flush remaining entries
-        await self._flush()
-
-        # Close storage
-        self.jsonl_storage.close()
+        self._writer = None
+        self._writer_pid = None
+        self.buffer.clear()
+        self._reserved.clear()
+        self.jsonl_storage = JsonlStorage(self.config.jsonl)
 
     def log(
         self,
-        level: LogLevel,
+        level: Union[LogLevel, str],
         message: str,
         session_id: Optional[str] = None,
         hook_name: Optional[str] = None,
@@ -470,28 +943,29 @@ class LogFlow:
         error: Optional[str] = None,
         traceback: Optional[str] = None,
     ):
-        """Log an entry (non-blocking)."""
+        """Log an entry (non-blocking unless the overflow policy is block).
+
+        Raises:
+            ValueError: If level isn't a LogLevel or the name of one
+        """
         if not self.config.enabled:
             return
+        if not isinstance(level, LogLevel):
+            level = LogLevel(level)
 
         # Check level priority
-        if LEVEL_PRIORITY.get(level, 0) < LEVEL_PRIORITY.get(self.config.level, 0):
+        priority = LEVEL_PRIORITY.get(level, 0)
+        if priority < LEVEL_PRIORITY.get(self.config.level, 0):
             return
+        reserved = priority >= RESERVED_PRIORITY
 
         # Rate limiting
-        if self.config.rate_limit > 0:
-            now = datetime.now()
-            if (now - self._last_log_time).total_seconds() >= 1.0:
-                self._last_log_time = now
-                self._log_count_this_second = 0
-
-            if self._log_count_this_second >= self.config.rate_limit:
-                return
-
-            self._log_count_this_second += 1
+        if not reserved and not self.rate_limiter.allow(LEVEL_CLASS[level], session_id):
+            self._count_drop("rate_limit", level, session_id)
+            return
 
-        # Create log entry
-        entry = LogEntry(
+        # Capture a compact record; models are only built for queries
+        entry = LogRecord(
             level=level,
             message=message,
             session_id=session_id,
@@ -504,29 +978,188 @@ class LogFlow:
             traceback=traceback,
         )
 
-        # Add to buffer
-        self.buffer.append(entry)
+        if self._writer is None:
+            self.open()
+
+        buffer = self.buffer
+        if reserved:
+            if len(self._reserved) < self.config.reserved_size:
+                self._reserved.append(entry)
+                if len(self._reserved) >= self._reserved_high_water:
+                    self._wake.set()
+            else:
+                self._count_drop("reserved_full", level)
+        elif len(buffer) < self.config.buffer_size:
+            buffer.append(entry)
+            if len(buffer) >= self._high_water:
+                self._wake.set()
+        else:
+            self._overflow(entry)
+
+    def _overflow(self, entry: LogRecord):
+        """Apply the overflow policy to an entry arriving at a full buffer."""
+        policy = self.config.overflow
+        buffer = self.buffer
+
+        if policy == "drop_newest":
+            self._count_drop("overflow", entry.level)
+            return
 
-    async def _process_loop(self):
-        """Async processing loop."""
-        while self._running:
-            await asyncio.sleep(0.1)  # Process every 100ms
-            await self._flush()
-
-    async def _flush(self):
-        """Flush buffer to outputs."""
-        while self.buffer:
-            entry = self.buffer.popleft()
-
-            # Console output
-            if self.config.console.enabled:
-                formatted = self.console_formatter.format(
-                    entry, format_type=self.config.console.format
+        if policy == "sample":
+            self._sample_count += 1
+            if self._sample_count % max(self.config.sample_rate, 1):
+                self._count_drop("overflow", entry.level)
+                return
+
+        elif policy == "block":
+            if self._writer is None or self._writer is threading.current_thread():
+                # Nobody else will make room: write the buffer out here
+                self._flush()
+                buffer.append(entry)
+                return
+
+            self._wake.set()
+            with self._not_full:
+                has_room = self._not_full.wait_for(
+                    lambda: len(buffer) < self.config.buffer_size,
+                    self.config.block_timeout_ms / 1000,
                 )
-                print(formatted, file=sys.stderr, flush=True)
+            if has_room:
+                buffer.append(entry)
+            else:
+                self._count_drop("overflow", entry.level)
+            return
+
+        # drop_oldest, or an entry admitted by sampling
+        try:
+            oldest = buffer.popleft()
+        except IndexError:
+            pass
+        else:
+            self._count_drop("overflow", oldest.level)
+        buffer.append(entry)
+
+    def _count_drop(self, reason: str, level: LogLevel, session_id: Optional[str] = None):
+        """Count a dropped entry for the totals and the next report."""
+        with self._lock:
+            for counters in (self.dropped, self._unreported):
+                by_level = counters.setdefault(reason, {})
+                by_level[level.value] = by_level.get(level.value, 0) + 1
+            if session_id is not None and self.rate_limiter.per_session:
+                sessions = self._unreported_sessions
+                sessions[session_id] = sessions.get(session_id, 0) + 1
+
+    def _report_drops(self, force: bool = False):
+        """Log a WARN entry with the drops since the last report."""
+        now = time.monotonic()
+        if not force and now - self._last_drop_report < self.config.drop_report_interval:
+            return
+        self._last_drop_report = now
+
+        with self._lock:
+            unreported, self._unreported = self._unreported, {}
+            sessions, self._unreported_sessions = self._unreported_sessions, {}
+        if not unreported:
+            return
+
+        data: Dict[str, Any] = {
+            "dropped": unreported,
+            "overflow_policy": self.config.overflow,
+            "interval_s": self.config.drop_report_interval,
+        }
+        if sessions:
+            data["rate_limited_sessions"] = sessions
+
+        # In the reserved lane, past its limit: the report itself is never dropped
+        self._reserved.append(
+            LogRecord(level=LogLevel.WARN, message="Dropped log entries", data=data)
+        )
 
-            # JSONL storage
-            self.jsonl_storage.write(entry)
+    def drop_stats(self) -> Dict[str, Any]:
+        """Get dropped-entry totals and buffer usage."""
+        with self._lock:
+            dropped = {reason: dict(by_level) for reason, by_level in self.dropped.items()}
+        return {
+            "dropped": dropped,
+            "buffered": len(self.buffer),
+            "buffer_size": self.config.buffer_size,
+            "reserved": len(self._reserved),
+            "reserved_size": self.config.reserved_size,
+            "overflow_policy": self.config.overflow,
+            "writer_errors": self.writer_errors,
+        }
+
+    def _writer_loop(self):
+        """Drain the buffer to the outputs until close().
+
+        Any failure is counted in writer_errors; the thread never dies
+        while the logger is open.
+        """
+        while self._running:
+            try:
+                self._wake.wait(FLUSH_INTERVAL)
+                self._wake.clear()
+                self._report_drops()
+                self._flush()
+                self.jsonl_storage.sync_if_due()
+            except Exception:
+                self.writer_errors += 1
+
+    @staticmethod
+    def _drain(entries: deque) -> List[LogRecord]:
+        """Pop the entries in a deque until it is empty.
+
+        Callers may pop concurrently (the overflow policy evicts from the
+        front), so the deque can empty sooner than its length said.
+        """
+        batch = []
+        for _ in range(len(entries)):
+            try:
+                batch.append(entries.popleft())
+            except IndexError:
+                break
+        return batch
+
+    def _take_batch(self) -> List[LogRecord]:
+        """Remove all buffered entries, in time order, and wake blocked callers."""
+        batch = self._drain(self.buffer)
+
+        if self._reserved:
+            errors = self._drain(self._reserved)
+            batch = list(heapq.merge(batch, errors, key=lambda entry: entry.monotonic_ns))
+
+        if self.config.overflow == "block":
+            with self._not_full:
+                self._not_full.notify_all()
+        return batch
+
+    def _write(self, batch: List[LogRecord]):
+        """Write a batch to the outputs, one write per output."""
+        if not batch:
+            return
+
+        # Console output
+        if self.console_enabled:
+            format_type = self.config.console.format
+            formatted = [
+                self.console_formatter.format(entry, format_type=format_type)
+                for entry in batch
+            ]
+            sys.stderr.write("\n".join(formatted) + "\n")
+            sys.stderr.flush()
+
+        # JSONL storage
+        self.jsonl_storage.write_batch(batch)
+
+    def _flush(self):
+        """Flush buffer to outputs, one batch per output."""
+        batch = self._take_batch()
+        try:
+            self._write(batch)
+        except Exception:
+            # A failing sink loses this batch but must not stop the writer
+            for entry in batch:
+                self._count_drop("write_error", entry.level)
 
 
 # ============================================================================
@@ -536,6 +1169,9 @@ class LogFlow:
 # Default configuration
 _default_config = LoggingConfig()
 _logger: Optional[LogFlow] = None
+_compressor: Optional[SegmentCompressor] = None
+# Cleared by disable_console_output()
+_console_allowed = True
 
 
 def get_logger() -> LogFlow:
@@ -547,17 +1183,86 @@ def get_logger() -> LogFlow:
 
 
 def configure_logging(config: LoggingConfig):
-    """Configure global logger."""
+    """Configure global logger.
+
+    The old logger is closed (its buffer written out) and the new one
+    starts its writer thread on first use.
+    """
     global _logger, _default_config
     _default_config = config
 
     if _logger is not None:
-        # Stop old logger
-        asyncio.create_task(_logger.stop())
+        _logger.close()
 
-    # Create new logger
     _logger = LogFlow(config)
-    asyncio.create_task(_logger.start())
+
+
+def disable_console_output():
+    """Keep log entries off stderr in this process, whatever the config says.
+
+    For processes whose stderr isn't a terminal of their own, such as a
+    hook event handled by dispatch.py in-process: Claude Code reads the
+    hook's stderr.
+    """
+    global _console_allowed
+    _console_allowed = False
+    if _logger is not None:
+        _logger.console_enabled = False
+
+
+def _compression_target() -> Optional[Tuple[Path, Optional[str]]]:
+    """Active segment and codec for the segment compressor."""
+    jsonl = _default_config.jsonl
+    if not jsonl.enabled:
+        return None
+    return log_path(jsonl), resolve_codec(jsonl.compress)
+
+
+def _compression_failed(path: Optional[Path], error: Exception):
+    """Log a segment the compressor skips, or a failed sweep."""
+    log_error(
+        "Log segment compression failed",
+        data={"path": str(path) if path is not None else None},
+        error=f"{type(error).__name__}: {error}",
+    )
+
+
+def start_segment_compressor():
+    """Compress rotated log segments in a background thread.
+
+    Only long-lived processes (the shared hook daemon, the MCP server) run
+    it; short-lived ones would exit mid-segment. The fork server, which
+    must not start threads, uses run_segment_compressor in a helper process.
+    """
+    global _compressor
+    if _compressor is None:
+        _compressor = SegmentCompressor(_compression_target, on_error=_compression_failed)
+    _compressor.start()
+
+
+def run_segment_compressor(alive: Callable[[], bool]):
+    """Compress rotated log segments in the calling thread while alive() holds."""
+    SegmentCompressor(_compression_target, on_error=_compression_failed).run(alive)
+
+
+def _close_logger():
+    """Write out the global logger's buffer at interpreter exit."""
+    if _logger is not None:
+        _logger.close()
+
+
+def _reset_logger_after_fork():
+    """Drop the global logger's parent-process state in a forked child."""
+    global _compressor
+    if _logger is not None:
+        _logger.after_fork()
+    # The compressor thread doesn't survive the fork; children don't compress
+    _compressor = None
+
+
+atexit.register(_close_logger)
+if hasattr(os, "register_at_fork"):
+    os.register_at_fork(after_in_child=_reset_logger_after_fork)
 
 
 # ============================================================================
@@ -658,3 +1363,21 @@ def log_action_result(
         duration_ms=duration_ms,
         **kwargs,
     )
+
+
+def log_action_output(
+    line: str,
+    stream: str,
+    action_type: Optional[str] = None,
+    handler_name: Optional[str] = None,
+    session_id: Optional[str] = None,
+):
+    """Log one line of command output."""
+    get_logger().log(
+        LogLevel.ACTION_OUTPUT,
+        line,
+        action_type=action_type,
+        handler_name=handler_name,
+        session_id=session_id,
+        data={"stream": stream},
+    )
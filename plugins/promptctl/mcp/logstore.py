@@ -0,0 +1,954 @@
+#!/usr/bin/env python3
+"""
+Log segment storage for LogFlow.
+
+LogFlow writes JSONL segments named after their day (2025-11-03.jsonl).
+With size rotation a full segment is sealed under a numbered name
+(2025-11-03.001.jsonl) and a fresh one is started. Sealed segments, and
+those of past days, are compressed by a background thread in long-lived
+processes (the shared hook daemon and the MCP server; the fork server runs
+it in a helper process), with zstd when the zstandard package is installed
+and gzip otherwise.
+
+Compressed segments are written in independent blocks of about BLOCK_SIZE
+uncompressed bytes, each ending on a line boundary: gzip members or zstd
+frames, so standard tools read the file as a whole. A seek table next to
+it (2025-11-03.001.jsonl.gz.seek) maps uncompressed offsets to blocks, so a
+reader can start at any offset by decompressing a single block's worth of
+data instead of the whole segment.
+
+Each segment also gets a sidecar index (2025-11-03.jsonl.idx), appended to
+by the writer after every batch: one JSON line per batch with its byte
+range, its first and last timestamp, and the offsets of its entries per
+level, session, handler and flag (error, slow). Queries read the index and
+seek straight to candidate lines. Byte ranges no index line covers (a
+crash between the data and the index write, a torn index line, segments
+written before indexing) are scanned instead, and rebuild_index() writes a
+complete index from the JSONL; the compressor does so for sealed segments
+with gaps before compressing them.
+
+Queries can also run newest first: index records are parsed from the
+last one back as the walk reaches them, plain segments are memory-mapped
+and walked backwards from the end, compressed ones a block at a time from
+the last block, so the last few matches cost time proportional to what's
+read rather than to the segment size. A cursor (segment identity and
+offset) lets a caller continue further back where the previous page
+stopped. Segments are identified by their date and first line, which
+survive both sealing and compression.
+"""
+
+import argparse
+import bisect
+import fcntl
+import gzip
+import heapq
+import io
+import itertools
+import json
+import mmap
+import os
+import re
+import tempfile
+import threading
+import time
+import zlib
+from contextlib import contextmanager
+from datetime import datetime
+from pathlib import Path
+from typing import (
+    Any,
+    BinaryIO,
+    Callable,
+    Dict,
+    Iterable,
+    Iterator,
+    List,
+    Optional,
+    Sequence,
+    Set,
+    Tuple,
+)
+
+try:
+    import zstandard
+except ImportError:  # optional, gzip is used without it
+    zstandard = None
+
+SEGMENT_SUFFIX = ".jsonl"
+CODEC_SUFFIXES = {"gzip": ".gz", "zstd": ".zst"}
+SEEK_SUFFIX = ".seek"
+INDEX_SUFFIX = ".idx"
+
+# Entries at least this slow (duration_ms) get the "slow" index flag
+SLOW_MS = 1000
+
+# What the index records of an entry: (wall time, level, session_id,
+# handler_name, has error, duration_ms)
+IndexKeys = Tuple[float, str, Optional[str], Optional[str], bool, Optional[float]]
+
+# (start, end) byte range of a segment; end None means up to EOF
+ByteRange = Tuple[int, Optional[int]]
+
+# Start of an index line as index_record writes it: its byte range
+_RECORD_RANGE = re.compile(rb'\{"o":(\d+),"e":(\d+),')
+
+# Cursor: "<date>@<crc32 of the segment's first line>:<offset>"
+_CURSOR = re.compile(r"(\d{4}-\d{2}-\d{2}@[0-9a-f]{8}):(\d+)")
+
+# Uncompressed bytes per independently compressed block
+BLOCK_SIZE = 1024 * 1024
+
+GZIP_LEVEL = 6
+ZSTD_LEVEL = 3
+
+# Seconds a sealed segment must be untouched before it's compressed, so
+# writers in other processes have moved on to the new segment
+SEAL_GRACE = 60.0
+
+# Seconds between sweeps for segments to compress
+SWEEP_INTERVAL = 60.0
+
+# Age in seconds after which a leftover temporary file is removed
+STALE_TMP_AGE = 3600.0
+
+
+def resolve_codec(name: str) -> Optional[str]:
+    """Codec for a compress setting: none, gzip, zstd, or auto."""
+    if name == "auto":
+        return "zstd" if zstandard is not None else "gzip"
+    if name == "zstd" and zstandard is None:
+        return "gzip"
+    if name in CODEC_SUFFIXES:
+        return name
+    return None
+
+
+def segment_codec(path: Path) -> Optional[str]:
+    """Codec a segment was compressed with, None for plain JSONL."""
+    for codec, suffix in CODEC_SUFFIXES.items():
+        if path.name.endswith(SEGMENT_SUFFIX + suffix):
+            return codec
+    return None
+
+
+def segment_key(path: Path) -> Tuple[str, int]:
+    """Sort key of a segment: its date, then its number within the day.
+
+    The unnumbered segment of a day is the one written last.
+    """
+    parts = path.name.split(".")
+    if len(parts) > 2 and parts[1].isdigit():
+        return parts[0], int(parts[1])
+    return parts[0], 1 << 31
+
+
+def list_segments(directory: Path) -> List[Path]:
+    """All segments in directory, plain or compressed, oldest first.
+
+    A segment that exists both plain and compressed (mid-compression) is
+    listed once, as the complete plain file.
+    """
+    try:
+        names = set(os.listdir(directory))
+    except OSError:
+        return []
+
+    segments = []
+    for name in names:
+        path = directory / name
+        if name.endswith(SEGMENT_SUFFIX):
+            segments.append(path)
+        elif segment_codec(path) is not None and plain_name(path) not in names:
+            segments.append(path)
+
+    return sorted(segments, key=segment_key)
+
+
+def seal_segment(path: Path) -> Optional[Path]:
+    """Move a full segment to the next free numbered name for its day.
+
+    Uses link + unlink, so two processes sealing at once can't overwrite
+    each other's segments.
+    """
+    stem = path.name[: -len(SEGMENT_SUFFIX)]
+    number = 1 + max(
+        (
+            segment_key(existing)[1]
+            for existing in list_segments(path.parent)
+            if segment_key(existing)[0] == stem and segment_key(existing)[1] < 1 << 31
+        ),
+        default=0,
+    )
+
+    while True:
+        sealed = path.with_name(f"{stem}.{number:03d}{SEGMENT_SUFFIX}")
+        try:
+            os.link(path, sealed)
+        except FileExistsError:
+            number += 1
+            continue
+        except FileNotFoundError:
+            return None
+
+        # The index follows its segment; writers still appending to it
+        # keep writing to the same (now sealed) inode
+        try:
+            os.replace(index_path(path), index_path(sealed))
+        except FileNotFoundError:
+            pass
+        os.unlink(path)
+        return sealed
+
+
+def _compress_block(codec: str) -> Callable[[bytes], bytes]:
+    """Function compressing one block into a self-contained member/frame."""
+    if codec == "zstd":
+        return zstandard.ZstdCompressor(level=ZSTD_LEVEL).compress
+    return lambda block: gzip.compress(block, compresslevel=GZIP_LEVEL, mtime=0)
+
+
+def _write_atomic(path: Path, data: bytes):
+    """Replace path with data, so readers never see a partial file."""
+    fd, tmp_path = tempfile.mkstemp(prefix=f".{path.name}.", suffix=".tmp", dir=str(path.parent))
+    try:
+        with os.fdopen(fd, "wb") as f:
+            f.write(data)
+        os.replace(tmp_path, path)
+    except BaseException:
+        try:
+            os.unlink(tmp_path)
+        except OSError:
+            pass
+        raise
+
+
+def compress_segment(path: Path, codec: str, block_size: int = BLOCK_SIZE) -> Optional[Path]:
+    """Compress a sealed segment block by block and remove the original.
+
+    Returns:
+        The compressed segment, or None if another process is compressing
+        it or it was written to meanwhile
+    """
+    target = path.with_name(path.name + CODEC_SUFFIXES[codec])
+    compress = _compress_block(codec)
+
+    with open(path, "rb") as source:
+        try:
+            fcntl.flock(source.fileno(), fcntl.LOCK_EX | fcntl.LOCK_NB)
+        except OSError:
+            return None
+
+        blocks = []
+        chunks = []
+        compressed_size = 0
+        size = 0
+        while True:
+            block = source.read(block_size)
+            if not block:
+                break
+            # End every block on a line boundary
+            block += source.readline()
+            data = compress(block)
+            blocks.append((size, compressed_size))
+            chunks.append(data)
+            compressed_size += len(data)
+            size += len(block)
+
+        if os.fstat(source.fileno()).st_size != size:
+            return None
+
+        seek_table = {"codec": codec, "size": size, "blocks": blocks}
+        _write_atomic(
+            target.with_name(target.name + SEEK_SUFFIX),
+            json.dumps(seek_table, separators=(",", ":")).encode("utf-8"),
+        )
+        _write_atomic(target, b"".join(chunks))
+        os.unlink(path)
+
+    return target
+
+
+def load_seek_table(path: Path) -> Optional[List[Tuple[int, int]]]:
+    """(uncompressed offset, compressed offset) of each block, if known."""
+    try:
+        with open(path.with_name(path.name + SEEK_SUFFIX), "rb") as f:
+            return [tuple(block) for block in json.loads(f.read())["blocks"]]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+@contextmanager
+def open_segment(path: Path, offset: int = 0) -> Iterator[BinaryIO]:
+    """Open a segment for reading its uncompressed bytes from offset.
+
+    Compressed segments are decompressed as they're read. With a seek
+    table, reading starts at the block holding offset.
+    """
+    codec = segment_codec(path)
+    with open(path, "rb") as f:
+        if codec is None:
+            f.seek(offset)
+            yield f
+            return
+
+        if codec == "zstd" and zstandard is None:
+            raise OSError(f"zstandard is required to read {path}")
+
+        start = 0
+        blocks = load_seek_table(path) if offset else None
+        if blocks:
+            index = bisect.bisect_right(blocks, (offset, float("inf"))) - 1
+            start, compressed_start = blocks[max(index, 0)]
+            f.seek(compressed_start)
+
+        if codec == "zstd":
+            reader = zstandard.ZstdDecompressor().stream_reader(
+                f, read_across_frames=True, closefd=False
+            )
+            stream = io.BufferedReader(reader)
+        else:
+            stream = gzip.GzipFile(fileobj=f, mode="rb")
+
+        with stream:
+            skip = offset - start
+            while skip > 0:
+                skipped = stream.read(min(skip, BLOCK_SIZE))
+                if not skipped:
+                    break
+                skip -= len(skipped)
+            yield stream
+
+
+def plain_name(path: Path) -> str:
+    """Name of a segment without its compression suffix."""
+    name = path.name
+    return name[: name.rindex(SEGMENT_SUFFIX) + len(SEGMENT_SUFFIX)]
+
+
+def index_path(path: Path) -> Path:
+    """Sidecar index of a segment, shared by its plain and compressed forms."""
+    return path.with_name(plain_name(path) + INDEX_SUFFIX)
+
+
+def segment_size(path: Path) -> Optional[int]:
+    """Uncompressed size of a segment, None if unknown."""
+    if segment_codec(path) is None:
+        try:
+            return path.stat().st_size
+        except OSError:
+            return None
+    try:
+        with open(path.with_name(path.name + SEEK_SUFFIX), "rb") as f:
+            return json.loads(f.read())["size"]
+    except (OSError, ValueError, KeyError, TypeError):
+        return None
+
+
+def keys_from_dict(data: Dict[str, Any]) -> IndexKeys:
+    """Index keys of a parsed JSONL entry."""
+    try:
+        wall_time = datetime.fromisoformat(data["timestamp"]).timestamp()
+    except (KeyError, TypeError, ValueError):
+        wall_time = 0.0
+    return (
+        wall_time,
+        str(data.get("level")),
+        data.get("session_id"),
+        data.get("handler_name"),
+        data.get("error") is not None,
+        data.get("duration_ms"),
+    )
+
+
+def index_record(
+    start: int, end: int, entries: Sequence[IndexKeys], offsets: Sequence[int]
+) -> bytes:
+    """Index line for the byte range start-end holding entries.
+
+    offsets are those of the entries relative to start, which keeps the
+    lines short.
+    """
+    levels: Dict[str, List[int]] = {}
+    sessions: Dict[str, List[int]] = {}
+    handlers: Dict[str, List[int]] = {}
+    flags: Dict[str, List[int]] = {}
+
+    for (wall_time, level, session_id, handler_name, error, duration_ms), offset in zip(entries, offsets):
+        levels.setdefault(level, []).append(offset)
+        if session_id is not None:
+            sessions.setdefault(session_id, []).append(offset)
+        if handler_name is not None:
+            handlers.setdefault(handler_name, []).append(offset)
+        if error:
+            flags.setdefault("error", []).append(offset)
+        if duration_ms is not None and duration_ms >= SLOW_MS:
+            flags.setdefault("slow", []).append(offset)
+
+    times = [keys[0] for keys in entries] or [0.0]
+    record: Dict[str, Any] = {
+        "o": start,
+        "e": end,
+        "t": [min(times), max(times)],
+        "l": levels,
+    }
+    if sessions:
+        record["s"] = sessions
+    if handlers:
+        record["h"] = handlers
+    if flags:
+        record["f"] = flags
+    return (json.dumps(record, ensure_ascii=False, separators=(",", ":")) + "\n").encode("utf-8")
+
+
+def _parse_record(line: bytes) -> Optional[Dict[str, Any]]:
+    """Parse an index line, None if it is torn."""
+    try:
+        record = json.loads(line)
+        record["o"], record["e"]
+    except (ValueError, KeyError, TypeError):
+        return None
+    return record
+
+
+def load_index_spans(path: Path) -> List[Tuple[int, int, bytes]]:
+    """(start, end, line) of a segment's index records in offset order.
+
+    Only the byte range at the start of each line is read, so records can
+    be parsed later, and only if a query gets to them. Lines written some
+    other way are parsed now; torn ones are skipped.
+    """
+    try:
+        with open(index_path(path), "rb") as f:
+            lines = f.read().splitlines()
+    except OSError:
+        return []
+
+    spans = []
+    for line in lines:
+        match = _RECORD_RANGE.match(line)
+        if match is not None:
+            spans.append((int(match.group(1)), int(match.group(2)), line))
+            continue
+        record = _parse_record(line)
+        if record is not None:
+            spans.append((record["o"], record["e"], line))
+
+    spans.sort(key=lambda span: span[0])
+    return spans
+
+
+def load_index(path: Path) -> List[Dict[str, Any]]:
+    """Index records of a segment in offset order; torn lines are skipped."""
+    records = []
+    for _, _, line in load_index_spans(path):
+        record = _parse_record(line)
+        if record is not None:
+            records.append(record)
+    return records
+
+
+def index_gaps(records: Iterable[Any], size: Optional[int]) -> List[ByteRange]:
+    """Byte ranges of a segment that no index record covers.
+
+    Takes index records or (start, end, line) spans, in offset order.
+    """
+    gaps: List[ByteRange] = []
+    covered = 0
+    for record in records:
+        start, end = (record["o"], record["e"]) if isinstance(record, dict) else record[:2]
+        if start > covered:
+            gaps.append((covered, start))
+        covered = max(covered, end)
+
+    if size is None:
+        gaps.append((covered, None))
+    elif size > covered:
+        gaps.append((covered, size))
+    return gaps
+
+
+def _read_entries(stream: BinaryIO, start: int, end: Optional[int]) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines from start to end."""
+    offset = start
+    for line in stream:
+        if end is not None and offset >= end:
+            break
+        if line.endswith(b"\n"):
+            yield offset, line
+        offset += len(line)
+
+
+def rebuild_index(path: Path, block_entries: int = 10000) -> int:
+    """Write a complete index for a segment from its JSONL.
+
+    The new index replaces the old one atomically. Unparseable lines are
+    left out of the lists but stay covered, so they aren't rescanned.
+
+    Returns:
+        Number of indexed entries
+    """
+    chunks = []
+    count = 0
+    with open_segment(path) as stream:
+        entries = _read_entries(stream, 0, None)
+        while True:
+            batch = list(itertools.islice(entries, block_entries))
+            if not batch:
+                break
+            start = batch[0][0]
+            end = batch[-1][0] + len(batch[-1][1])
+            keys = []
+            offsets = []
+            for offset, line in batch:
+                try:
+                    keys.append(keys_from_dict(json.loads(line)))
+                except (ValueError, AttributeError):
+                    continue
+                offsets.append(offset - start)
+            chunks.append(index_record(start, end, keys, offsets))
+            count += len(keys)
+
+    _write_atomic(index_path(path), b"".join(chunks))
+    return count
+
+
+def index_complete(path: Path) -> bool:
+    """Whether the index covers all of a segment."""
+    return not index_gaps(load_index(path), segment_size(path))
+
+
+def select_offsets(
+    records: Iterable[Dict[str, Any]],
+    levels: Optional[Set[str]] = None,
+    flags: Optional[Set[str]] = None,
+    session_id: Optional[str] = None,
+    handler_name: Optional[str] = None,
+    since: Optional[float] = None,
+) -> List[int]:
+    """Offsets of the indexed entries that may match a query.
+
+    An entry matches when its level is in levels or it has one of flags
+    (either, if both are None), and it has the session_id and
+    handler_name, if given. Records entirely older than since are skipped.
+    """
+    offsets: List[int] = []
+    for record in records:
+        offsets.extend(_record_offsets(record, levels, flags, session_id, handler_name, since))
+
+    offsets.sort()
+    return offsets
+
+
+def _record_offsets(
+    record: Dict[str, Any],
+    levels: Optional[Set[str]],
+    flags: Optional[Set[str]],
+    session_id: Optional[str],
+    handler_name: Optional[str],
+    since: Optional[float],
+) -> List[int]:
+    """Offsets of one index record's candidates (see select_offsets), unsorted."""
+    if since is not None and record["t"][1] < since:
+        return []
+
+    if levels is None and flags is None:
+        candidates = set(itertools.chain.from_iterable(record["l"].values()))
+    else:
+        candidates = set()
+        for level in levels or ():
+            candidates.update(record["l"].get(level, ()))
+        for flag in flags or ():
+            candidates.update(record.get("f", {}).get(flag, ()))
+
+    if session_id is not None:
+        candidates.intersection_update(record.get("s", {}).get(session_id, ()))
+    if handler_name is not None:
+        candidates.intersection_update(record.get("h", {}).get(handler_name, ()))
+
+    base = record["o"]
+    return [base + relative for relative in candidates]
+
+
+def reverse_offsets(
+    spans: Sequence[Tuple[int, int, bytes]],
+    levels: Optional[Set[str]] = None,
+    flags: Optional[Set[str]] = None,
+    session_id: Optional[str] = None,
+    handler_name: Optional[str] = None,
+    since: Optional[float] = None,
+    before: Optional[int] = None,
+) -> Iterator[int]:
+    """Offsets of the indexed candidates (see select_offsets), newest first.
+
+    Walks the records from the last one back, parsing each only when the
+    walk reaches it, so a caller that stops after a few matches never
+    touches the older records. Records cover disjoint byte ranges, so
+    sorting each one's offsets keeps the whole sequence descending.
+    """
+    for start, _, line in reversed(spans):
+        if before is not None and start >= before:
+            continue
+        record = _parse_record(line)
+        if record is None:
+            continue
+        offsets = _record_offsets(record, levels, flags, session_id, handler_name, since)
+        offsets.sort(reverse=True)
+        for offset in offsets:
+            if before is None or offset < before:
+                yield offset
+
+
+def _decompress(codec: str, data: bytes) -> bytes:
+    """Decompress one or more whole blocks."""
+    if codec == "zstd":
+        if zstandard is None:
+            raise OSError("zstandard is required to read zstd segments")
+        decompressor = zstandard.ZstdDecompressor()
+        with decompressor.stream_reader(io.BytesIO(data), read_across_frames=True) as reader:
+            return reader.readall()
+    return gzip.decompress(data)
+
+
+class _BlockCache:
+    """Blocks of a compressed segment, decompressed on demand, one kept.
+
+    Without a seek table the whole segment is one block.
+    """
+
+    def __init__(self, path: Path):
+        self.path = path
+        self.codec = segment_codec(path)
+        blocks = load_seek_table(path) or [(0, 0)]
+        self.starts = [start for start, _ in blocks]
+        self._compressed = [compressed for _, compressed in blocks]
+        self._cached: Optional[Tuple[int, bytes]] = None
+
+    def __len__(self) -> int:
+        return len(self.starts)
+
+    def find(self, offset: int) -> int:
+        """Index of the block holding an uncompressed offset."""
+        return max(bisect.bisect_right(self.starts, offset) - 1, 0)
+
+    def block(self, index: int) -> Tuple[int, bytes]:
+        """Uncompressed start and data of a block."""
+        if self._cached is None or self._cached[0] != index:
+            with open(self.path, "rb") as f:
+                f.seek(self._compressed[index])
+                if index + 1 < len(self._compressed):
+                    data = f.read(self._compressed[index + 1] - self._compressed[index])
+                else:
+                    data = f.read()
+            self._cached = (index, _decompress(self.codec, data))
+        return self.starts[index], self._cached[1]
+
+
+def read_lines_at(path: Path, offsets: Iterable[int]) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) at each offset of a segment, in the given order.
+
+    Offsets are consumed lazily. Plain segments take a seek per line.
+    Compressed segments are read a block at a time, so a run of offsets in
+    one block decompresses it once.
+    """
+    if isinstance(offsets, Sequence) and not offsets:
+        return
+
+    if segment_codec(path) is None:
+        with open(path, "rb") as f:
+            for offset in offsets:
+                f.seek(offset)
+                yield offset, f.readline()
+        return
+
+    blocks = _BlockCache(path)
+    for offset in offsets:
+        start, data = blocks.block(blocks.find(offset))
+        relative = offset - start
+        end = data.find(b"\n", relative) + 1 or len(data)
+        yield offset, data[relative:end]
+
+
+def read_range(path: Path, start: int, end: Optional[int]) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines in a byte range of a segment."""
+    with open_segment(path, start) as stream:
+        yield from _read_entries(stream, start, end)
+
+
+def _reverse_buffer(buffer: Any, base: int, start: int, end: int) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines of buffer in start-end, last first.
+
+    buffer holds the segment bytes from offset base on.
+    """
+    lower = max(start - base, 0)
+    # Drop a partial line at the end
+    position = buffer.rfind(b"\n", 0, end - base) + 1
+    while position > lower:
+        line_start = buffer.rfind(b"\n", 0, position - 1) + 1
+        if line_start < lower:
+            break
+        yield base + line_start, buffer[line_start:position]
+        position = line_start
+
+
+def reverse_lines(
+    path: Path, end: Optional[int] = None, start: int = 0
+) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of the complete lines from start to end, newest first.
+
+    Plain segments are memory-mapped and walked backwards from end (EOF by
+    default); compressed segments block by block from the last one.
+    """
+    if segment_codec(path) is None:
+        with open(path, "rb") as f:
+            size = os.fstat(f.fileno()).st_size
+            if size == 0:
+                return
+            with mmap.mmap(f.fileno(), 0, access=mmap.ACCESS_READ) as buffer:
+                yield from _reverse_buffer(buffer, 0, start, size if end is None else min(end, size))
+        return
+
+    blocks = _BlockCache(path)
+    index = len(blocks) - 1 if end is None else blocks.find(max(end - 1, 0))
+    while index >= 0:
+        block_start, data = blocks.block(index)
+        block_end = block_start + len(data)
+        if block_end <= start:
+            break
+        yield from _reverse_buffer(
+            data, block_start, start, block_end if end is None else min(end, block_end)
+        )
+        index -= 1
+
+
+def query_segment(
+    path: Path,
+    levels: Optional[Set[str]] = None,
+    flags: Optional[Set[str]] = None,
+    session_id: Optional[str] = None,
+    handler_name: Optional[str] = None,
+    since: Optional[float] = None,
+    reverse: bool = False,
+    before: Optional[int] = None,
+) -> Iterator[Tuple[int, bytes]]:
+    """(offset, line) of entries that may match a query, in offset order.
+
+    Indexed entries are read by seeking to them; unindexed ranges are
+    scanned whole. Candidates are a superset of the matches: callers still
+    check each parsed entry. With reverse, entries come newest first and
+    everything is produced lazily, so stopping after a few entries reads
+    (and parses) only the newest part of the index and segment; with
+    before, only entries starting before that offset are read.
+    """
+    spans = load_index_spans(path)
+    gaps = index_gaps(spans, segment_size(path))
+
+    if before is not None:
+        gaps = [
+            (start, before if end is None else min(end, before))
+            for start, end in gaps
+            if start < before
+        ]
+
+    # Merge indexed candidates and gap scans in offset order
+    if reverse:
+        offsets = reverse_offsets(
+            spans, levels, flags, session_id, handler_name, since, before
+        )
+        sources = [read_lines_at(path, offsets)]
+        sources.extend(reverse_lines(path, end, start) for start, end in reversed(gaps))
+        yield from heapq.merge(*sources, key=lambda item: item[0], reverse=True)
+    else:
+        records = [_parse_record(line) for _, _, line in spans]
+        records = [record for record in records if record is not None]
+        offsets = select_offsets(records, levels, flags, session_id, handler_name, since)
+        if before is not None:
+            offsets = offsets[: bisect.bisect_left(offsets, before)]
+        sources = [read_lines_at(path, offsets)]
+        sources.extend(read_range(path, start, end) for start, end in gaps)
+        yield from heapq.merge(*sources, key=lambda item: item[0])
+
+
+def segment_id(path: Path) -> str:
+    """Creation identity of a segment: its date and a checksum of its first line.
+
+    Unlike the name, it doesn't change when the active segment is sealed
+    under a number or when a segment is compressed.
+
+    Raises:
+        OSError: If the segment can't be read
+    """
+    with open_segment(path) as stream:
+        first_line = stream.readline()
+    return f"{segment_key(path)[0]}@{zlib.crc32(first_line):08x}"
+
+
+def format_cursor(path: Path, offset: int) -> str:
+    """Cursor for the entries of a segment before offset."""
+    return f"{segment_id(path)}:{offset}"
+
+
+def parse_cursor(cursor: str) -> Optional[Tuple[str, int]]:
+    """(segment id, offset) of a cursor, None if malformed."""
+    match = _CURSOR.fullmatch(cursor)
+    if match is None:
+        return None
+    return match.group(1), int(match.group(2))
+
+
+def find_segment(segments: Iterable[Path], identity: str) -> Optional[Path]:
+    """The segment with a segment_id, among segments; None if it's gone."""
+    date = identity.partition("@")[0]
+    for path in segments:
+        if segment_key(path)[0] != date:
+            continue
+        try:
+            if segment_id(path) == identity:
+                return path
+        except OSError:
+            continue
+    return None
+
+
+def _sealed_segments(active: Path) -> List[Path]:
+    """Plain segments next to active that nobody writes to anymore."""
+    now = time.time()
+    sealed = []
+    for path in list_segments(active.parent):
+        if path.name == active.name or segment_codec(path) is not None:
+            continue
+        try:
+            if now - path.stat().st_mtime >= SEAL_GRACE:
+                sealed.append(path)
+        except OSError:
+            continue
+    return sealed
+
+
+def _remove_stale_tmp(directory: Path):
+    """Remove temporary files left by a compression that was cut short."""
+    now = time.time()
+    try:
+        names = os.listdir(directory)
+    except OSError:
+        return
+    for name in names:
+        if name.startswith(".") and name.endswith(".tmp") and SEGMENT_SUFFIX in name:
+            path = directory / name
+            try:
+                if now - path.stat().st_mtime >= STALE_TMP_AGE:
+                    path.unlink()
+            except OSError:
+                continue
+
+
+class SegmentCompressor:
+    """Background thread compressing sealed segments every SWEEP_INTERVAL.
+
+    target() returns the active segment path and the codec to use, or None
+    while compression is off; it's called on every sweep, so config changes
+    apply without a restart.
+
+    A segment that fails with anything but OSError (corrupt data, say) is
+    reported to on_error and skipped until it changes; a failing sweep is
+    reported too, and the thread keeps going.
+    """
+
+    def __init__(
+        self,
+        target: Callable[[], Optional[Tuple[Path, Optional[str]]]],
+        on_error: Optional[Callable[[Optional[Path], Exception], None]] = None,
+    ):
+        self._target = target
+        self._on_error = on_error
+        self._wake = threading.Event()
+        self._thread: Optional[threading.Thread] = None
+        # Signature (mtime_ns, size) of segments that failed, by path
+        self._failed: Dict[Path, Tuple[int, int]] = {}
+
+    def start(self):
+        """Start the compression thread."""
+        if self._thread is not None and self._thread.is_alive():
+            return
+        self._thread = threading.Thread(
+            target=self.run, name="logflow-compressor", daemon=True
+        )
+        self._thread.start()
+
+    def wake(self):
+        """Sweep now instead of at the next interval."""
+        self._wake.set()
+
+    def sweep(self) -> List[Path]:
+        """Compress every sealed segment; returns the compressed paths."""
+        target = self._target()
+        if target is None or target[1] is None:
+            return []
+        active, codec = target
+
+        _remove_stale_tmp(active.parent)
+        compressed = []
+        for path in _sealed_segments(active):
+            try:
+                stat = path.stat()
+                signature = (stat.st_mtime_ns, stat.st_size)
+                if self._failed.get(path) == signature:
+                    continue
+                if not index_complete(path):
+                    rebuild_index(path)
+                result = compress_segment(path, codec)
+            except OSError:
+                continue
+            except Exception as e:
+                self._failed[path] = signature
+                self._report(path, e)
+                continue
+            if result is not None:
+                compressed.append(result)
+        return compressed
+
+    def _report(self, path: Optional[Path], error: Exception):
+        """Hand a failure to on_error; a failing callback is ignored."""
+        if self._on_error is None:
+            return
+        try:
+            self._on_error(path, error)
+        except Exception:
+            pass
+
+    def run(self, alive: Callable[[], bool] = lambda: True):
+        """Sweep every SWEEP_INTERVAL, in the calling thread, while alive() holds."""
+        while alive():
+            try:
+                self.sweep()
+            except Exception as e:
+                self._report(None, e)
+            self._wake.wait(SWEEP_INTERVAL)
+            self._wake.clear()
+
+
+def main():
+    """Rebuild the sidecar indexes of a log directory."""
+    parser = argparse.ArgumentParser(description="Rebuild LogFlow segment indexes")
+    parser.add_argument(
+        "directory",
+        type=Path,
+        nargs="?",
+        default=Path.home() / ".promptctl" / "logs",
+        help="Log directory (default: ~/.promptctl/logs)",
+    )
+    parser.add_argument(
+        "--all", action="store_true", help="Rebuild complete indexes too"
+    )
+    args = parser.parse_args()
+
+    for path in list_segments(args.directory):
+        if not args.all and index_complete(path):
+            continue
+        start = time.perf_counter()
+        count = rebuild_index(path)
+        elapsed = (time.perf_counter() - start) * 1000
+        print(f"{path.name}: {count} entries indexed in {elapsed:.0f}ms")
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,316 @@
+#!/usr/bin/env python3
+"""
+File pattern matching for PromptCtl handlers.
+
+All `match.file_pattern` globs of a config are compiled into one
+FilePatternSet. A single call returns every handler whose pattern matches a
+file path, without building Path objects or re-parsing globs per event.
+
+Matching is exactly PurePosixPath(path).match(pattern):
+- Relative patterns match from the right ("*.py" matches "src/app.py")
+- Absolute patterns must match the whole path
+- Each pattern component is an fnmatch glob matched against one path
+  component, so "*", "?" and "[...]" never cross a "/"
+- "**" is not recursive; it matches a single component like "*"
+
+Paths are matched as their components joined and terminated by NUL, which
+cannot occur in a file name, so a component glob can't run into the next
+component. A path or pattern that contains NUL anyway is matched with
+PurePosixPath.match directly.
+"""
+
+import re
+from pathlib import PurePosixPath
+from typing import Dict, FrozenSet, List, Optional, Pattern, Set
+
+_WILDCARD_CHARS = frozenset("*?[")
+
+_EMPTY: FrozenSet[str] = frozenset()
+
+# Component separator of match subjects
+_SEP = "\0"
+
+
+def _translate_class(pat: str, i: int, j: int) -> str:
+    """Translate the bracket expression pat[i:j] the way fnmatch does."""
+    stuff = pat[i:j]
+    if "-" not in stuff:
+        stuff = stuff.replace("\\", r"\\")
+    else:
+        chunks = []
+        k = i + 2 if pat[i] == "!" else i + 1
+        while True:
+            k = pat.find("-", k, j)
+            if k < 0:
+                break
+            chunks.append(pat[i:k])
+            i = k + 1
+            k = k + 3
+        chunk = pat[i:j]
+        if chunk:
+            chunks.append(chunk)
+        else:
+            chunks[-1] += "-"
+        # Remove empty ranges, which are invalid in a regex
+        for k in range(len(chunks) - 1, 0, -1):
+            if chunks[k - 1][-1] > chunks[k][0]:
+                chunks[k - 1] = chunks[k - 1][:-1] + chunks[k][1:]
+                del chunks[k]
+        stuff = "-".join(s.replace("\\", r"\\").replace("-", r"\-") for s in chunks)
+
+    # Escape set operations (&&, ~~ and ||)
+    stuff = re.sub(r"([&~|])", r"\\\1", stuff)
+    if not stuff:
+        # Empty range: never matches
+        return "(?!)"
+    if stuff == "!":
+        # Negated empty range: any character
+        return "[^\0]"
+    if stuff[0] == "!":
+        return "[^" + stuff[1:] + "\0]"
+    if stuff[0] in ("^", "["):
+        stuff = "\\" + stuff
+    return f"[{stuff}]"
+
+
+def _translate_component(part: str) -> str:
+    """Translate one glob component like fnmatch.translate, kept within a component."""
+    i, n = 0, len(part)
+    out = []
+
+    while i < n:
+        c = part[i]
+        i += 1
+
+        if c == "*":
+            while i < n and part[i] == "*":
+                i += 1
+            out.append("[^\0]*")
+        elif c == "?":
+            out.append("[^\0]")
+        elif c == "[":
+            j = i
+            if j < n and part[j] == "!":
+                j += 1
+            if j < n and part[j] == "]":
+                j += 1
+            while j < n and part[j] != "]":
+                j += 1
+
+            if j >= n:
+                # Unterminated class is a literal "["
+                out.append("\\[")
+            else:
+                out.append(_translate_class(part, i, j))
+                i = j + 1
+        else:
+            out.append(re.escape(c))
+
+    return "".join(out)
+
+
+def translate_pattern(pattern: str) -> str:
+    """Translate a file pattern into a regex matched against a path subject.
+
+    See path_subject for the subject format. Every component of the regex
+    is written as "<component>\\0".
+
+    Raises:
+        ValueError: If the pattern has no components
+    """
+    pure = PurePosixPath(pattern)
+    parts = list(pure.parts)
+    if not parts:
+        raise ValueError("empty pattern")
+
+    if pure.root:
+        # The root must be the path's root and every component must match
+        tokens = [re.escape(pure.root) + _SEP]
+        parts = parts[1:]
+        prefix = ""
+    else:
+        # Match from the right; any leading components (root included)
+        prefix = f"(?:[^{_SEP}]*{_SEP})*"
+        tokens = []
+
+    tokens.extend(_translate_component(part) + _SEP for part in parts)
+    return prefix + "".join(tokens) + "\\Z"
+
+
+def path_parts(file_path: str) -> List[str]:
+    """Split a path into components the way PurePosixPath does.
+
+    An absolute path's first component is its root ("/", or "//" for
+    exactly two leading slashes).
+    """
+    root = ""
+    if file_path.startswith("/"):
+        rest = file_path.lstrip("/")
+        root = "//" if len(file_path) - len(rest) == 2 else "/"
+        file_path = rest
+
+    parts = file_path.split("/")
+    if "" in parts or "." in parts:
+        parts = [part for part in parts if part and part != "."]
+    if root:
+        parts.insert(0, root)
+    return parts
+
+
+def path_subject(parts: List[str]) -> str:
+    """Match subject of a split path: every component followed by NUL."""
+    return _SEP.join(parts) + _SEP
+
+
+class FilePatternSet:
+    """Matches a file path against many handler patterns in one pass.
+
+    Patterns are bucketed by their last path component:
+    - literal file names ("Makefile") -> dict lookup on the basename
+    - "*<literal>" suffixes ("*.py", "*_test.go") -> dict lookups on the
+      basename's tail, one per distinct suffix length
+    - "*" -> every file
+    - anything else -> the catch-all bucket
+    Each bucket compiles its patterns with leading directories ("src/*.py")
+    into one regex of optional lookaheads with a named group per pattern,
+    so a single match reports every hit in the bucket.
+    """
+
+    def __init__(self, patterns: Dict[str, str]):
+        """Compile patterns.
+
+        Args:
+            patterns: Mapping of handler name to file pattern
+        """
+        names_by_pattern: Dict[str, Set[str]] = {}
+        for name, pattern in patterns.items():
+            names_by_pattern.setdefault(pattern, set()).add(name)
+
+        basenames: Dict[str, List[str]] = {}
+        suffixes: Dict[str, List[str]] = {}
+        any_file: List[str] = []
+        other: List[str] = []
+        self._names = {p: frozenset(names) for p, names in names_by_pattern.items()}
+        self._verbatim: List[str] = []
+
+        for pattern in names_by_pattern:
+            if _SEP in pattern:
+                self._verbatim.append(pattern)
+                continue
+
+            last = PurePosixPath(pattern).name
+            if last and not _WILDCARD_CHARS.intersection(last):
+                basenames.setdefault(last, []).append(pattern)
+            elif last == "*":
+                any_file.append(pattern)
+            elif (
+                last.startswith("*")
+                and len(last) > 1
+                and not _WILDCARD_CHARS.intersection(last[1:])
+            ):
+                suffixes.setdefault(last[1:], []).append(pattern)
+            else:
+                other.append(pattern)
+
+        def bucket(bucket_patterns: List[str], force_regex: bool = False):
+            return _Bucket({p: self._names[p] for p in bucket_patterns}, force_regex)
+
+        self._basenames = {key: bucket(pats) for key, pats in basenames.items()}
+        self._suffixes = {key: bucket(pats) for key, pats in suffixes.items()}
+        self._suffix_lengths = sorted({len(suffix) for suffix in suffixes})
+        self._any_file = bucket(any_file) if any_file else None
+        self._other = bucket(other, force_regex=True) if other else None
+
+        self._empty = not names_by_pattern
+
+    def __bool__(self) -> bool:
+        return not self._empty
+
+    def match(self, file_path: str) -> FrozenSet[str]:
+        """Return the names of all handlers whose pattern matches file_path."""
+        if not file_path:
+            return _EMPTY
+
+        if _SEP in file_path:
+            return self._match_verbatim(file_path, self._names)
+
+        parts = path_parts(file_path)
+        if not parts:
+            return _EMPTY
+
+        basename = parts[-1]
+        subject = path_subject(parts)
+        matched: Set[str] = set()
+
+        found = self._basenames.get(basename)
+        if found:
+            found.collect(subject, matched)
+
+        for length in self._suffix_lengths:
+            if length > len(basename):
+                break
+            found = self._suffixes.get(basename[-length:])
+            if found:
+                found.collect(subject, matched)
+
+        if self._any_file:
+            self._any_file.collect(subject, matched)
+
+        if self._other:
+            self._other.collect(subject, matched)
+
+        if self._verbatim:
+            matched.update(self._match_verbatim(file_path, self._verbatim))
+
+        return frozenset(matched) if matched else _EMPTY
+
+    def _match_verbatim(self, file_path: str, patterns) -> FrozenSet[str]:
+        """Match with PurePosixPath.match, for paths and patterns holding NUL."""
+        path = PurePosixPath(file_path)
+        matched: Set[str] = set()
+        for pattern in patterns:
+            if path.match(pattern):
+                matched.update(self._names[pattern])
+        return frozenset(matched) if matched else _EMPTY
+
+
+class _Bucket:
+    """Patterns that share a last-component check."""
+
+    def __init__(self, patterns: Dict[str, FrozenSet[str]], force_regex: bool):
+        """Compile one bucket.
+
+        Args:
+            patterns: Mapping of file pattern to handler names
+            force_regex: Verify every pattern, not just multi-component ones
+        """
+        self.always: Set[str] = set()
+        self.group_names: Dict[str, FrozenSet[str]] = {}
+        self.regex: Optional[Pattern] = None
+
+        lookaheads = []
+        for pattern, names in patterns.items():
+            if not force_regex and PurePosixPath(pattern).name == pattern:
+                # The bucket key already matched the whole pattern
+                self.always.update(names)
+                continue
+
+            group = f"p{len(self.group_names)}"
+            self.group_names[group] = names
+            lookaheads.append(f"(?:(?={translate_pattern(pattern)})(?P<{group}>))?")
+
+        if lookaheads:
+            self.regex = re.compile("".join(lookaheads), re.DOTALL)
+
+    def __bool__(self) -> bool:
+        return bool(self.always or self.group_names)
+
+    def collect(self, subject: str, matched: Set[str]):
+        """Add the names of all patterns in this bucket matching subject."""
+        matched.update(self.always)
+        if self.regex is None:
+            return
+
+        for group, value in self.regex.match(subject).groupdict().items():
+            if value is not None:
+                matched.update(self.group_names[group])
@@ -0,0 +1,233 @@
+#!/usr/bin/env python3
+"""
+Asynchronous subprocess runner for PromptCtl actions.
+
+Shell commands from command and validate actions run as asyncio
+subprocesses, so a slow command never blocks the event loop:
+- Each run has a timeout; on expiry the command's process group gets
+  SIGTERM, then SIGKILL after a grace period. A cancelled run (hook
+  deadline) is killed with SIGKILL right away
+- stdout/stderr are kept in ring buffers holding only the last N bytes
+- Output lines are streamed into LogFlow as ACTION_OUTPUT entries
+- A semaphore caps the number of child processes running at once
+"""
+
+import asyncio
+import os
+import signal
+import time
+from typing import Dict, List, Optional, Tuple
+
+from pydantic import BaseModel
+
+from logflow import log_action_output
+
+# Bytes read from a pipe per call
+READ_CHUNK_SIZE = 64 * 1024
+
+# Longest output line sent to LogFlow; the rest of the line is dropped
+MAX_LOGGED_LINE = 4096
+
+# Seconds to keep reading pipes after the command exited; a daemonized
+# grandchild may hold them open forever
+PIPE_DRAIN_TIMEOUT = 1.0
+
+
+class ProcessResult(BaseModel):
+    """Outcome of one command run."""
+
+    exit_code: Optional[int]
+    stdout: str
+    stderr: str
+    timed_out: bool = False
+    duration_ms: float
+    # Bytes discarded from the front of each stream by the ring buffer
+    stdout_dropped: int = 0
+    stderr_dropped: int = 0
+    # Returned from the result cache instead of running the command
+    cached: bool = False
+
+
+class OutputBuffer:
+    """Ring buffer keeping the last max_bytes bytes of a stream."""
+
+    def __init__(self, max_bytes: int):
+        self.max_bytes = max_bytes
+        self.dropped = 0
+        self._data = bytearray()
+
+    def write(self, chunk: bytes):
+        """Append a chunk, discarding the oldest bytes past the limit."""
+        self._data += chunk
+        overflow = len(self._data) - self.max_bytes
+        if overflow > 0:
+            del self._data[:overflow]
+            self.dropped += overflow
+
+    def text(self) -> str:
+        """Decode the buffered bytes."""
+        return self._data.decode("utf-8", errors="replace")
+
+
+class ProcessRunner:
+    """Runs shell commands with timeouts, bounded capture and a process cap."""
+
+    def __init__(
+        self,
+        max_processes: int = 4,
+        max_output_bytes: int = 64 * 1024,
+        kill_grace_seconds: float = 2.0,
+    ):
+        self.max_processes = max_processes
+        self.max_output_bytes = max_output_bytes
+        self.kill_grace_seconds = kill_grace_seconds
+        # (event loop, semaphore) - asyncio primitives are bound to one loop
+        self._slots: Optional[Tuple[asyncio.AbstractEventLoop, asyncio.Semaphore]] = None
+
+    async def run(
+        self,
+        command: str,
+        timeout: Optional[float],
+        cwd: Optional[str] = None,
+        max_output_bytes: Optional[int] = None,
+        log_context: Optional[Dict[str, str]] = None,
+    ) -> ProcessResult:
+        """Run a shell command and capture the tail of its output.
+
+        Args:
+            command: Shell command line
+            timeout: Seconds before the command is killed (None: no limit)
+            cwd: Working directory (default: the server's)
+            max_output_bytes: Per-stream capture limit (default: runner's)
+            log_context: action_type/handler_name/session_id for streamed lines
+
+        Returns:
+            ProcessResult; exit_code is the negated signal number if killed
+
+        Raises:
+            asyncio.CancelledError: If cancelled; the command is killed first
+        """
+        async with self._semaphore():
+            return await self._run(
+                command,
+                timeout,
+                cwd,
+                max_output_bytes or self.max_output_bytes,
+                log_context or {},
+            )
+
+    def _semaphore(self) -> asyncio.Semaphore:
+        """Get the process cap for the running event loop."""
+        loop = asyncio.get_running_loop()
+        if self._slots is None or self._slots[0] is not loop:
+            self._slots = (loop, asyncio.Semaphore(self.max_processes))
+        return self._slots[1]
+
+    async def _run(
+        self,
+        command: str,
+        timeout: Optional[float],
+        cwd: Optional[str],
+        max_output_bytes: int,
+        log_context: Dict[str, str],
+    ) -> ProcessResult:
+        """Run one command inside a process slot."""
+        start_time = time.perf_counter()
+        process = await asyncio.create_subprocess_shell(
+            command,
+            stdin=asyncio.subprocess.DEVNULL,
+            stdout=asyncio.subprocess.PIPE,
+            stderr=asyncio.subprocess.PIPE,
+            cwd=cwd or None,
+            # Own process group, so the shell's children are killed with it
+            start_new_session=True,
+        )
+
+        stdout = OutputBuffer(max_output_bytes)
+        stderr = OutputBuffer(max_output_bytes)
+        pumps = [
+            asyncio.create_task(_pump(process.stdout, stdout, "stdout", log_context)),
+            asyncio.create_task(_pump(process.stderr, stderr, "stderr", log_context)),
+        ]
+
+        timed_out = False
+        try:
+            try:
+                await asyncio.wait_for(process.wait(), timeout)
+            except asyncio.TimeoutError:
+                timed_out = True
+                await self._terminate(process)
+            await _drain(pumps)
+        finally:
+            if process.returncode is None:
+                # Cancelled: the caller is out of time, skip the grace period
+                _signal_group(process, signal.SIGKILL)
+                await asyncio.shield(process.wait())
+            for pump in pumps:
+                pump.cancel()
+
+        return ProcessResult(
+            exit_code=process.returncode,
+            stdout=stdout.text(),
+            stderr=stderr.text(),
+            timed_out=timed_out,
+            duration_ms=(time.perf_counter() - start_time) * 1000,
+            stdout_dropped=stdout.dropped,
+            stderr_dropped=stderr.dropped,
+        )
+
+    async def _terminate(self, process: asyncio.subprocess.Process):
+        """SIGTERM the process group, escalating to SIGKILL after the grace period."""
+        _signal_group(process, signal.SIGTERM)
+        try:
+            await asyncio.wait_for(process.wait(), self.kill_grace_seconds)
+        except asyncio.TimeoutError:
+            _signal_group(process, signal.SIGKILL)
+            await process.wait()
+
+
+def _signal_group(process: asyncio.subprocess.Process, sig: int):
+    """Send a signal to the process group of a command."""
+    try:
+        os.killpg(process.pid, sig)
+    except ProcessLookupError:
+        pass
+
+
+async def _drain(pumps: List[asyncio.Task]):
+    """Wait for the pipe readers after the command exited."""
+    _, pending = await asyncio.wait(pumps, timeout=PIPE_DRAIN_TIMEOUT)
+    for pump in pending:
+        pump.cancel()
+
+
+async def _pump(
+    stream: asyncio.StreamReader,
+    buffer: OutputBuffer,
+    stream_name: str,
+    log_context: Dict[str, str],
+):
+    """Copy a pipe into its ring buffer and stream complete lines to LogFlow."""
+    partial = b""
+    while True:
+        chunk = await stream.read(READ_CHUNK_SIZE)
+        if not chunk:
+            break
+        buffer.write(chunk)
+
+        lines = (partial + chunk).split(b"\n")
+        partial = lines.pop()[:MAX_LOGGED_LINE]
+        for line in lines:
+            _log_line(line, stream_name, log_context)
+
+    if partial:
+        _log_line(partial, stream_name, log_context)
+
+
+def _log_line(line: bytes, stream_name: str, log_context: Dict[str, str]):
+    """Send one output line to LogFlow."""
+    log_action_output(
+        line[:MAX_LOGGED_LINE].decode("utf-8", errors="replace"),
+        stream=stream_name,
+        **log_context,
+    )
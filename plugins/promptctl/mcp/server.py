@@ -8,24 +8,35 @@ This server provides:
 3. Configuration management (promptctl.yaml)
 4. Timer-based event scheduling
 5. Hooks configuration generation
+
+fastmcp is only imported when the MCP server is created, so processes that
+only handle hook events (the daemon, dispatch.py's in-process fallback)
+don't pay for it.
 """
 
 import asyncio
+import heapq
+import itertools
 import json
+import os
+import re
+import sqlite3
 import sys
 import time
+from collections import OrderedDict
+from contextlib import asynccontextmanager
 from datetime import datetime, timedelta
 from enum import Enum
 from pathlib import Path
-from typing import Any, Dict, List, Optional, Union
+from typing import TYPE_CHECKING, Any, Awaitable, Callable, Dict, List, Optional, Set, Tuple, Union
 
 import yaml
-from fastmcp import FastMCP
 from pydantic import BaseModel, ConfigDict, Field
 
 # Import logging system
 from logflow import (
     LoggingConfig,
+    LogLevel,
     configure_logging,
     get_logger,
     log_hook_received,
@@ -36,7 +47,18 @@ from logflow import (
     log_action_result,
     log_info,
     log_error,
+    start_segment_compressor,
 )
+from cache import CacheConfig, ResultCache
+from configcache import CompiledConfigCache
+from patterns import FilePatternSet
+from runner import ProcessResult, ProcessRunner
+from template import MISSING, compile_template, lookup_path
+from timerstore import CatchUpPolicy, SchedulerConfig, TimerStore
+from watcher import FileSignature, file_signature
+
+if TYPE_CHECKING:
+    from fastmcp import FastMCP
 
 
 # ============================================================================
@@ -67,6 +89,10 @@ class HookEventName(str, Enum):
     SESSION_END = "SessionEnd"
 
 
+# Hook events whose matcher is applied to the tool name
+TOOL_HOOK_EVENTS = {HookEventName.PRE_TOOL_USE, HookEventName.POST_TOOL_USE}
+
+
 class BaseHookInput(BaseModel):
     """Base schema for all hook inputs."""
 
@@ -210,6 +236,27 @@ class HandlerMatch(BaseModel):
     extra: Dict[str, Any] = Field(default_factory=dict)
 
 
+class DebounceEdge(str, Enum):
+    """Which event of a burst runs the handler."""
+
+    LEADING = "leading"
+    TRAILING = "trailing"
+
+
+class DebounceConfig(BaseModel):
+    """Coalesce bursts of events into one handler execution."""
+
+    window_ms: int = Field(default=500, ge=1, description="Quiet period ending a burst")
+    key: str = Field(
+        default="tool_input.file_path",
+        description="Payload path; events with the same value form one burst",
+    )
+    edge: DebounceEdge = Field(
+        default=DebounceEdge.TRAILING,
+        description="trailing: run once for the latest event; leading: run for the first",
+    )
+
+
 class Handler(BaseModel):
     """Configuration for a hook handler."""
 
@@ -218,6 +265,44 @@ class Handler(BaseModel):
     priority: int = Field(default=0, description="Handler priority (higher = first)")
     match: Optional[HandlerMatch] = None
     actions: List[HandlerAction] = Field(default_factory=list)
+    exclusive: bool = Field(
+        default=False,
+        description="Run alone instead of concurrently with its priority tier",
+    )
+    debounce: Optional[DebounceConfig] = None
+
+
+class ExecutionConfig(BaseModel):
+    """Handler execution settings."""
+
+    max_concurrent_handlers: int = Field(
+        default=8,
+        ge=1,
+        description="Handlers running at once across all events and projects",
+    )
+    max_processes: int = Field(
+        default=4, ge=1, description="Command processes running at once"
+    )
+    command_timeout: Optional[float] = Field(
+        default=60.0, gt=0, description="Default seconds before a command is killed"
+    )
+    kill_grace_seconds: float = Field(
+        default=2.0, ge=0, description="Seconds between SIGTERM and SIGKILL"
+    )
+    max_output_kb: int = Field(
+        default=64, ge=1, description="Output kept per stream (last N KB)"
+    )
+    hook_deadlines_ms: Dict[HookEventName, int] = Field(
+        default_factory=dict,
+        description="Time budget per hook event; unfinished handlers are cancelled",
+    )
+
+
+# Part of the compiled config cache key; bump when the config format changes
+CONFIG_SCHEMA_VERSION = "2"
+
+# libyaml's loader is an order of magnitude faster when PyYAML was built with it
+YAML_LOADER = getattr(yaml, "CSafeLoader", yaml.SafeLoader)
 
 
 class PromptCtlConfig(BaseModel):
@@ -228,6 +313,25 @@ class PromptCtlConfig(BaseModel):
     version: str = Field(default="1.0")
     handlers: Dict[str, Handler] = Field(default_factory=dict)
     logging: Optional[LoggingConfig] = None
+    execution: ExecutionConfig = Field(default_factory=ExecutionConfig)
+    cache: CacheConfig = Field(default_factory=CacheConfig)
+    scheduler: SchedulerConfig = Field(default_factory=SchedulerConfig)
+    project_configs: bool = Field(
+        default=False,
+        description=(
+            "Handle each event with the promptctl.yaml of its project; "
+            "registers every hook event in hooks.json"
+        ),
+    )
+
+
+# Settings of the whole process, taken from the default config only
+PROCESS_SETTINGS = (
+    "logging",
+    "scheduler",
+    "project_configs",
+    "execution.max_concurrent_handlers",
+)
 
 
 # ============================================================================
@@ -256,127 +360,466 @@ class EventContext:
         return current
 
     def render(self, template: str) -> str:
-        """Render template with variables from payload and state."""
-        result = template
+        """Render template with variables from payload and state.
 
-        # Replace payload variables
-        result = self._replace_variables(result, self._payload, prefix="")
+        Placeholders are "{dotted.path}" into the payload, or "{state.key}"
+        for state values. Unresolved placeholders are left unchanged (see
+        template.py).
+        """
+        return compile_template(template).render(self._resolve)
 
-        # Replace state variables
-        result = self._replace_variables(result, self._state, prefix="state.")
+    def _resolve(self, path: Tuple[str, ...]) -> Any:
+        """Resolve a placeholder path, payload first, then state."""
+        value = lookup_path(self._payload, path)
+        if value is MISSING and path[0] == "state" and len(path) > 1:
+            value = lookup_path(self._state, path[1:])
+        return value
 
-        return result
+    def set_state(self, key: str, value: Any) -> None:
+        """Set state value."""
+        self._state[key] = value
+
+    def get_state(self, key: str, default: Any = None) -> Any:
+        """Get state value."""
+        return self._state.get(key, default)
 
-    def _replace_variables(
-        self, text: str, data: Dict[str, Any], prefix: str
-    ) -> str:
-        """Replace variables in text from data dict."""
-        result = text
 
-        # Flatten nested dict for replacement
-        flat = self._flatten_dict(data, parent_key=prefix.rstrip("."))
+def cache_inputs(cache_option: Any) -> List[str]:
+    """Get the input file templates of an action's "cache" option.
 
-        for key, value in flat.items():
-            placeholder = f"{{{key}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, str(value))
+    "cache: true" uses the event's file; "cache: {inputs: [...]}" lists them.
+    """
+    if isinstance(cache_option, dict):
+        return list(cache_option.get("inputs", []))
+    return ["{tool_input.file_path}"]
 
-        return result
 
-    def _flatten_dict(
-        self, data: Dict[str, Any], parent_key: str = ""
-    ) -> Dict[str, Any]:
-        """Flatten nested dictionary with dot notation keys."""
-        items = []
+# Compiled handler entry: (handler name, handler)
+NamedHandler = Tuple[str, Handler]
+
 
-        for key, value in data.items():
-            new_key = f"{parent_key}.{key}" if parent_key else key
+class DeadlineExceeded(Exception):
+    """Raised when a hook event's handlers overrun its deadline."""
 
-            if isinstance(value, dict):
-                items.extend(self._flatten_dict(value, new_key).items())
+    def __init__(self, deadline_ms: int, handler_names: List[str]):
+        self.deadline_ms = deadline_ms
+        self.handler_names = handler_names
+        super().__init__(
+            f"Handlers exceeded the {deadline_ms} ms deadline: {', '.join(handler_names)}"
+        )
+
+# Runs a handler: (handler, handler name, context, session id, coalesced events)
+HandlerExecutor = Callable[[Handler, str, EventContext, str, int], Awaitable[Any]]
+
+
+class _Burst:
+    """Events of one (handler, key) burst that haven't been executed yet."""
+
+    __slots__ = ("handler", "context", "session_id", "count", "timer")
+
+    def __init__(self, handler: Handler, context: EventContext, session_id: str):
+        self.handler = handler
+        self.context = context
+        self.session_id = session_id
+        self.count = 1
+        self.timer: Optional[asyncio.TimerHandle] = None
+
+
+class HandlerDebouncer:
+    """Collapses bursts of events per handler and debounce key.
+
+    A burst ends once no event with the same key arrived for window_ms.
+    Trailing edge: the handler runs once, after the burst, against the
+    latest event's context. Leading edge: the handler runs for the first
+    event and the rest of the burst is skipped.
+
+    Bursts only exist in a long-lived process (the shared hook daemon),
+    since deferred executions need a running event loop.
+    """
+
+    def __init__(self, execute: HandlerExecutor):
+        self._execute = execute
+        self._bursts: Dict[Tuple[str, str], _Burst] = {}
+        self._running: Set[asyncio.Task] = set()
+
+    def submit(
+        self, handler_name: str, handler: Handler, context: EventContext, session_id: str
+    ) -> bool:
+        """Register an event for a debounced handler.
+
+        An event without a value at the debounce key isn't debounced, so
+        unrelated events (other tools without a file_path) never share a
+        burst.
+
+        Returns:
+            True if the handler should run now for this event
+        """
+        debounce = handler.debounce
+        value = context.get(debounce.key)
+        if value is None:
+            return True
+
+        key = (handler_name, str(value))
+        burst = self._bursts.get(key)
+
+        if burst is None:
+            burst = _Burst(handler, context, session_id)
+            self._bursts[key] = burst
+            run_now = debounce.edge == DebounceEdge.LEADING
+        else:
+            burst.count += 1
+            burst.timer.cancel()
+            run_now = False
+            if debounce.edge == DebounceEdge.TRAILING:
+                burst.context = context
+                burst.session_id = session_id
             else:
-                items.append((new_key, value))
+                get_logger().log(
+                    LogLevel.HOOK_SKIPPED,
+                    "Debounced (leading edge already ran)",
+                    handler_name=handler_name,
+                    session_id=session_id,
+                    data={"key": key[1], "coalesced": burst.count},
+                )
 
-        return dict(items)
+        burst.timer = asyncio.get_running_loop().call_later(
+            debounce.window_ms / 1000, self._end_burst, key
+        )
+        return run_now
+
+    def _end_burst(self, key: Tuple[str, str]):
+        """Close a burst; on the trailing edge, run its handler."""
+        burst = self._bursts.pop(key)
+        if burst.handler.debounce.edge == DebounceEdge.TRAILING:
+            self._spawn(key[0], burst)
+
+    def _spawn(self, handler_name: str, burst: _Burst):
+        """Run a burst's handler in the background."""
+        task = asyncio.create_task(
+            self._execute(
+                burst.handler, handler_name, burst.context, burst.session_id, burst.count
+            )
+        )
+        self._running.add(task)
+        task.add_done_callback(self._finished)
+
+    def _finished(self, task: asyncio.Task):
+        """Forget a finished background execution and report its failure."""
+        self._running.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log_error("Debounced handler failed", error=str(task.exception()))
+
+    @property
+    def idle(self) -> bool:
+        """True if no burst is pending and no execution is running."""
+        return not self._bursts and not self._running
+
+    def _end_all_bursts(self):
+        """Close every pending burst now, running the trailing ones."""
+        for key, burst in list(self._bursts.items()):
+            burst.timer.cancel()
+            del self._bursts[key]
+            if burst.handler.debounce.edge == DebounceEdge.TRAILING:
+                self._spawn(key[0], burst)
+
+    def hand_over(self, successor: "HandlerDebouncer"):
+        """Close all bursts and let successor track the executions.
+
+        Used when this debouncer's engine is replaced or evicted: pending
+        trailing bursts run now with the handlers they were collected for,
+        and successor.flush() waits for them. Must be called on the event
+        loop the bursts were submitted on.
+        """
+        self._end_all_bursts()
+        for task in self._running:
+            task.remove_done_callback(self._finished)
+            successor._running.add(task)
+            task.add_done_callback(successor._finished)
+        self._running.clear()
+
+    async def flush(self):
+        """Run all pending trailing bursts now and wait for every execution."""
+        self._end_all_bursts()
+        if self._running:
+            await asyncio.gather(*self._running, return_exceptions=True)
 
-    def set_state(self, key: str, value: Any) -> None:
-        """Set state value."""
-        self._state[key] = value
 
-    def get_state(self, key: str, default: Any = None) -> Any:
-        """Get state value."""
-        return self._state.get(key, default)
+class HandlerSlots:
+    """Process-wide limit on the handlers executing at once.
+
+    The engines of all loaded configs take their slots here, so several open
+    projects share one limit instead of multiplying it. The limit follows
+    the default config. asyncio primitives are bound to one loop, so the
+    semaphore is recreated for a new loop or limit; executions holding a
+    slot of the old one finish on it.
+    """
+
+    def __init__(self, limit: int):
+        self.limit = limit
+        # (event loop, limit, semaphore)
+        self._current: Optional[Tuple[asyncio.AbstractEventLoop, int, asyncio.Semaphore]] = None
+
+    def semaphore(self) -> asyncio.Semaphore:
+        """Get the semaphore for the running event loop."""
+        loop = asyncio.get_running_loop()
+        current = self._current
+        if current is None or current[0] is not loop or current[1] != self.limit:
+            current = self._current = (loop, self.limit, asyncio.Semaphore(self.limit))
+        return current[2]
+
+
+handler_slots = HandlerSlots(ExecutionConfig().max_concurrent_handlers)
 
 
 class HandlerEngine:
-    """Matches handlers and executes action chains."""
+    """Matches handlers and executes action chains.
+
+    Enabled handlers are compiled once per config into an index keyed by
+    (hook event, tool name). Each bucket holds pre-sorted (name, handler)
+    tuples; the (hook event, None) bucket holds the handlers that accept
+    any tool and is merged into every tool bucket of that event.
+
+    All file patterns are compiled into one FilePatternSet, which is
+    evaluated at most once per event.
+    """
 
     def __init__(self, config: PromptCtlConfig):
         self.config = config
+        self._index = self._compile_index(config)
+        self.runner = ProcessRunner(
+            max_processes=config.execution.max_processes,
+            max_output_bytes=config.execution.max_output_kb * 1024,
+            kill_grace_seconds=config.execution.kill_grace_seconds,
+        )
+        self.cache = ResultCache(config.cache) if config.cache.enabled else None
+        self.debouncer = HandlerDebouncer(self._execute_limited)
+
+        file_patterns = {
+            name: handler.match.file_pattern
+            for name, handler in config.handlers.items()
+            if handler.enabled
+            and handler.match
+            and handler.match.file_pattern is not None
+        }
+        self._file_patterns = FilePatternSet(file_patterns)
+        self._file_filtered = frozenset(file_patterns)
+
+    @staticmethod
+    def _compile_index(
+        config: PromptCtlConfig,
+    ) -> Dict[Tuple[str, Optional[str]], Tuple[NamedHandler, ...]]:
+        """Build the (hook event, tool name) -> handlers index."""
+        # Highest priority first; ties keep config file order
+        ordered = sorted(
+            (
+                (name, handler)
+                for name, handler in config.handlers.items()
+                if handler.enabled
+            ),
+            key=lambda item: item[1].priority,
+            reverse=True,
+        )
+
+        wildcard: Dict[str, List[NamedHandler]] = {}
+        by_tool: Dict[Tuple[str, str], List[NamedHandler]] = {}
+
+        for name, handler in ordered:
+            hook_name = handler.hook.value
+            wildcard.setdefault(hook_name, [])
+
+            tool = handler.match.tool if handler.match else None
+            if tool is None:
+                wildcard[hook_name].append((name, handler))
+                continue
+
+            for tool_name in [tool] if isinstance(tool, str) else tool:
+                by_tool.setdefault((hook_name, tool_name), []).append((name, handler))
+
+        index: Dict[Tuple[str, Optional[str]], Tuple[NamedHandler, ...]] = {}
+        position = {name: i for i, (name, _) in enumerate(ordered)}
+
+        for hook_name, handlers in wildcard.items():
+            index[(hook_name, None)] = tuple(handlers)
+
+        for (hook_name, tool_name), handlers in by_tool.items():
+            merged = handlers + wildcard[hook_name]
+            merged.sort(key=lambda item: position[item[0]])
+            index[(hook_name, tool_name)] = tuple(merged)
+
+        return index
 
     def match_handlers(
         self, hook_name: str, payload: Dict[str, Any]
-    ) -> List[Handler]:
-        """Find handlers that match this hook event."""
-        matched = []
+    ) -> List[NamedHandler]:
+        """Find handlers that match this hook event, highest priority first."""
+        candidates = self._index.get((hook_name, payload.get("tool_name")))
+        if candidates is None:
+            candidates = self._index.get((hook_name, None), ())
+
+        if not self._file_filtered.intersection(name for name, _ in candidates):
+            # Hook and tool are already guaranteed by the index
+            return list(candidates)
+
+        file_path = payload.get("tool_input", {}).get("file_path", "")
+        file_matched = self._file_patterns.match(file_path)
+
+        return [
+            (name, handler)
+            for name, handler in candidates
+            if name not in self._file_filtered or name in file_matched
+        ]
+
+    async def run_handlers(
+        self,
+        handlers: List[NamedHandler],
+        context: EventContext,
+        session_id: str,
+        debounce: bool = False,
+        deadline_ms: Optional[int] = None,
+    ) -> List[Dict[str, Any]]:
+        """Execute matched handlers tier by tier.
+
+        Handlers with the same priority run concurrently; lower priority
+        tiers start only after the higher ones finished. An exclusive
+        handler runs alone, after the handlers listed before it in its tier
+        and before the ones listed after it. All handlers share the event's
+        context.
+
+        Args:
+            debounce: Hand handlers with a debounce setting to the debouncer
+                (long-lived processes only); otherwise they run every time
+            deadline_ms: Time budget for all handlers. Command timeouts are
+                clipped to it and handlers still running when it passes are
+                cancelled.
+
+        Returns:
+            Results of the handlers that ran, in the order of handlers
+
+        Raises:
+            DeadlineExceeded: If the deadline passed; names the handlers that
+                were still running
+        """
+        if debounce:
+            handlers = [
+                (name, handler)
+                for name, handler in handlers
+                if handler.debounce is None
+                or self.debouncer.submit(name, handler, context, session_id)
+            ]
 
-        for handler_name, handler in self.config.handlers.items():
-            # Skip disabled handlers
-            if not handler.enabled:
-                continue
+        if deadline_ms is None:
+            return await self._run_tiers(handlers, context, session_id, None, set())
 
-            # Check hook type
-            if handler.hook.value != hook_name:
-                continue
+        unfinished: Set[str] = set()
+        deadline = asyncio.get_running_loop().time() + deadline_ms / 1000
+        try:
+            return await asyncio.wait_for(
+                self._run_tiers(handlers, context, session_id, deadline, unfinished),
+                deadline_ms / 1000,
+            )
+        except asyncio.TimeoutError:
+            raise DeadlineExceeded(
+                deadline_ms, [name for name, _ in handlers if name in unfinished]
+            ) from None
 
-            # Check match conditions
-            if handler.match and not self._matches_conditions(payload, handler.match):
+    async def _run_tiers(
+        self,
+        handlers: List[NamedHandler],
+        context: EventContext,
+        session_id: str,
+        deadline: Optional[float],
+        unfinished: Set[str],
+    ) -> List[Dict[str, Any]]:
+        """Run the execution groups in order, tracking unfinished handlers."""
+        results: List[Dict[str, Any]] = []
+
+        async def run(name: str, handler: Handler) -> Dict[str, Any]:
+            unfinished.add(name)
+            result = await self._execute_limited(
+                handler, name, context, session_id, deadline=deadline
+            )
+            unfinished.discard(name)
+            return result
+
+        for group in self._execution_groups(handlers):
+            if len(group) == 1:
+                results.append(await run(*group[0]))
                 continue
 
-            matched.append(handler)
+            outcomes = await asyncio.gather(
+                *(run(name, handler) for name, handler in group),
+                return_exceptions=True,
+            )
+            for outcome in outcomes:
+                if isinstance(outcome, BaseException):
+                    raise outcome
+            results.extend(outcomes)
 
-        # Sort by priority (highest first)
-        matched.sort(key=lambda h: h.priority, reverse=True)
+        return results
 
-        return matched
+    @staticmethod
+    def _execution_groups(handlers: List[NamedHandler]) -> List[List[NamedHandler]]:
+        """Split priority-ordered handlers into groups that run together."""
+        groups: List[List[NamedHandler]] = []
+        tier_priority = None
+        shared: Optional[List[NamedHandler]] = None
+
+        for name, handler in handlers:
+            if handler.priority != tier_priority:
+                tier_priority = handler.priority
+                shared = None
+
+            if handler.exclusive:
+                groups.append([(name, handler)])
+                shared = None
+            elif shared is None:
+                shared = [(name, handler)]
+                groups.append(shared)
+            else:
+                shared.append((name, handler))
 
-    def _matches_conditions(
-        self, payload: Dict[str, Any], match: HandlerMatch
-    ) -> bool:
-        """Check if payload matches handler conditions."""
-        # Tool name matching
-        if match.tool is not None:
-            tool_name = payload.get("tool_name")
-            if isinstance(match.tool, list):
-                if tool_name not in match.tool:
-                    return False
-            elif tool_name != match.tool:
-                return False
-
-        # File pattern matching
-        if match.file_pattern is not None:
-            # Extract file path from tool_input
-            tool_input = payload.get("tool_input", {})
-            file_path = tool_input.get("file_path", "")
-            if not file_path:
-                return False
-
-            if not Path(file_path).match(match.file_pattern):
-                return False
+        return groups
 
-        return True
+    async def _execute_limited(
+        self,
+        handler: Handler,
+        handler_name: str,
+        context: EventContext,
+        session_id: str,
+        coalesced: int = 1,
+        deadline: Optional[float] = None,
+    ) -> Dict[str, Any]:
+        """Execute a handler once a process-wide slot is free."""
+        async with handler_slots.semaphore():
+            return await self.execute_handler(
+                handler, handler_name, context, session_id, coalesced, deadline
+            )
 
     async def execute_handler(
-        self, handler: Handler, handler_name: str, context: EventContext, session_id: str
+        self,
+        handler: Handler,
+        handler_name: str,
+        context: EventContext,
+        session_id: str,
+        coalesced: int = 1,
+        deadline: Optional[float] = None,
     ) -> Dict[str, Any]:
-        """Execute a handler's action chain."""
+        """Execute a handler's action chain.
+
+        Args:
+            coalesced: Number of debounced events this execution stands for
+            deadline: Event loop time by which all actions must be done
+        """
         start_time = time.time()
 
         # Log handler start
+        start_data = {"priority": handler.priority, "action_count": len(handler.actions)}
+        if handler.debounce is not None:
+            start_data["coalesced"] = coalesced
         log_handler_start(
             handler_name=handler_name,
             session_id=session_id,
-            data={"priority": handler.priority, "action_count": len(handler.actions)}
+            data=start_data,
         )
 
         results = []
@@ -392,7 +835,9 @@ class HandlerEngine:
                     session_id=session_id
                 )
 
-                result = await self._execute_action(action_config, context)
+                result = await self._execute_action(
+                    action_config, context, handler_name, session_id, deadline
+                )
                 action_duration_ms = (time.time() - action_start_time) * 1000
 
                 # Log action result
@@ -412,7 +857,7 @@ class HandlerEngine:
 
                 # Log action error
                 get_logger().log(
-                    level="ACTION_ERROR",
+                    level=LogLevel.ACTION_ERROR,
                     message=f"Action failed",
                     action_type=action_config.action,
                     handler_name=handler_name,
@@ -430,29 +875,167 @@ class HandlerEngine:
         handler_duration_ms = (time.time() - start_time) * 1000
 
         # Log handler complete
+        complete_data = {
+            "actions_executed": len(results),
+            "success": all(r["status"] == "success" for r in results),
+        }
+        if handler.debounce is not None:
+            complete_data["coalesced"] = coalesced
         log_handler_complete(
             handler_name=handler_name,
             session_id=session_id,
             duration_ms=handler_duration_ms,
-            data={"actions_executed": len(results), "success": all(r["status"] == "success" for r in results)}
+            data=complete_data,
         )
 
         return {"actions_executed": len(results), "results": results}
 
     async def _execute_action(
-        self, action: HandlerAction, context: EventContext
+        self,
+        action: HandlerAction,
+        context: EventContext,
+        handler_name: str,
+        session_id: str,
+        deadline: Optional[float] = None,
     ) -> Dict[str, Any]:
         """Execute a single action."""
-        # This is where we'd implement different action types
+        options = action.model_extra or {}
+        log_context = {
+            "action_type": action.action,
+            "handler_name": handler_name,
+            "session_id": session_id,
+        }
+
+        if action.action == "command":
+            return await self._execute_command(options, context, log_context, deadline)
+        if action.action == "validate":
+            return await self._execute_validate(options, context, log_context, deadline)
+
+        # This is where we'd implement the remaining action types
         # For now, return a stub
         return {"type": action.action, "executed": True}
 
+    async def _run_shell(
+        self,
+        command: str,
+        options: Dict[str, Any],
+        context: EventContext,
+        log_context: Dict[str, str],
+        deadline: Optional[float],
+    ) -> ProcessResult:
+        """Run a shell command in the event's working directory.
+
+        With a "cache" option the result is looked up in, and stored to, the
+        result cache, keyed by the command and its input files. Cache I/O
+        (SQLite and input hashing) runs in a worker thread. The timeout
+        never extends past the event's deadline.
+        """
+        cwd = context.get("cwd")
+
+        cache_key = None
+        if options.get("cache") and self.cache is not None:
+            inputs = [context.render(path) for path in cache_inputs(options["cache"])]
+            cache_key, stored = await asyncio.to_thread(
+                self.cache.lookup, command, cwd, inputs
+            )
+            if stored is not None:
+                return ProcessResult(**stored, cached=True)
+
+        timeout = options.get("timeout", self.config.execution.command_timeout)
+        if deadline is not None:
+            remaining = max(0.0, deadline - asyncio.get_running_loop().time())
+            timeout = remaining if timeout is None else min(timeout, remaining)
+
+        max_output_kb = options.get("max_output_kb")
+        result = await self.runner.run(
+            command,
+            timeout=timeout,
+            cwd=cwd,
+            max_output_bytes=max_output_kb * 1024 if max_output_kb else None,
+            log_context=log_context,
+        )
+
+        if cache_key is not None and not result.timed_out:
+            await asyncio.to_thread(
+                self.cache.put, cache_key, result.model_dump(exclude={"cached"})
+            )
+
+        return result
+
+    async def _execute_command(
+        self,
+        options: Dict[str, Any],
+        context: EventContext,
+        log_context: Dict[str, str],
+        deadline: Optional[float],
+    ) -> Dict[str, Any]:
+        """Run a command action's script."""
+        command = context.render(options.get("script", ""))
+        result = await self._run_shell(command, options, context, log_context, deadline)
+
+        # Capture output to state if requested
+        if "capture" in options:
+            context.set_state(options["capture"], result.stdout.strip())
+
+        return {"type": "command", **result.model_dump()}
+
+    async def _execute_validate(
+        self,
+        options: Dict[str, Any],
+        context: EventContext,
+        log_context: Dict[str, str],
+        deadline: Optional[float],
+    ) -> Dict[str, Any]:
+        """Run a validate action's checks."""
+        cwd = context.get("cwd") or ""
+        checks = []
+
+        for check in options.get("checks", []):
+            check_type = check.get("type")
+
+            if check_type == "file_exists":
+                path = context.render(check.get("path", ""))
+                passed = os.path.exists(os.path.join(cwd, path))
+                checks.append({"type": check_type, "path": path, "passed": passed})
+
+            elif check_type == "command_succeeds":
+                command = context.render(check.get("command", ""))
+                result = await self._run_shell(
+                    command, {**options, **check}, context, log_context, deadline
+                )
+                checks.append(
+                    {
+                        "type": check_type,
+                        "command": command,
+                        "passed": result.exit_code == 0,
+                        "exit_code": result.exit_code,
+                        "timed_out": result.timed_out,
+                    }
+                )
+
+        return {
+            "type": "validate",
+            "passed": all(check["passed"] for check in checks),
+            "checks": checks,
+        }
+
 
 # ============================================================================
 # Scheduled Event Manager
 # ============================================================================
 
 
+# Due events started per scheduler wakeup; the rest follow on the next
+# loop iteration, so a large backlog never stalls the event loop
+SCHEDULER_BATCH_SIZE = 1000
+
+# Cancelled heap entries tolerated before the heap is compacted
+SCHEDULER_COMPACT_MIN = 1024
+
+# Seconds before writing scheduled events is retried after a failure
+SCHEDULER_FLUSH_RETRY = 5.0
+
+
 class ScheduledEvent(BaseModel):
     """Scheduled event for timer-based actions."""
 
@@ -462,31 +1045,141 @@ class ScheduledEvent(BaseModel):
     payload: Dict[str, Any]
 
 
+# Heap entry: [monotonic deadline, sequence number, event or None if cancelled];
+# recovered events hold their TimerRow until they are first needed
+_TimerEntry = List[Any]
+
+
+def _entry_event(entry: _TimerEntry) -> ScheduledEvent:
+    """Get the event of a live heap entry, building it from a stored row if needed."""
+    event = entry[2]
+    if isinstance(event, tuple):
+        event_id, scheduled_time, action, payload = event
+        event = ScheduledEvent(
+            event_id=event_id,
+            scheduled_time=datetime.fromtimestamp(scheduled_time),
+            action=action,
+            payload=json.loads(payload),
+        )
+        entry[2] = event
+    return event
+
+
 class EventScheduler:
-    """Manages timer-based event scheduling."""
+    """Manages timer-based event scheduling.
+
+    Pending events are kept in a heap ordered by deadline, with an index by
+    event_id. Scheduling is O(log n); cancelling marks the heap entry dead
+    in O(1) and dead entries are skipped when they reach the top, so
+    rescheduling is O(log n) as well. A single event loop timer is armed
+    for the earliest deadline, so the scheduler sleeps until the next event
+    is due instead of polling. Due events run as tasks on the event loop.
+
+    With a persistent SchedulerConfig, every change is also queued for the
+    TimerStore and flushed in batches; an event leaves the store when it
+    starts running.
+    """
 
     def __init__(self):
-        self.scheduled_events: List[ScheduledEvent] = []
+        self._heap: List[_TimerEntry] = []
+        self._entries: Dict[str, _TimerEntry] = {}
+        self._sequence = itertools.count()
+        self._cancelled = 0
         self._running = False
-        self._task: Optional[asyncio.Task] = None
-
-    async def start(self):
-        """Start the event scheduler."""
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._timer: Optional[asyncio.Handle] = None
+        self._timer_deadline: Optional[float] = None
+        self._tasks: Set[asyncio.Task] = set()
+        self._store: Optional[TimerStore] = None
+        self._flush_interval = 0.0
+        self._flush_handle: Optional[asyncio.TimerHandle] = None
+
+    @property
+    def scheduled_events(self) -> List[ScheduledEvent]:
+        """Pending events, earliest first."""
+        pending = sorted(self._entries.values(), key=lambda entry: entry[:2])
+        return [_entry_event(entry) for entry in pending]
+
+    def __len__(self) -> int:
+        return len(self._entries)
+
+    async def start(self, config: Optional[SchedulerConfig] = None):
+        """Start the event scheduler.
+
+        With config.persist, timers stored by a previous run are recovered
+        first and overdue ones are handled by config.catch_up.
+        """
         if self._running:
             return
 
         self._running = True
-        self._task = asyncio.create_task(self._run())
+        self._loop = asyncio.get_running_loop()
+        if config is not None and config.persist and self._store is None:
+            self._store = TimerStore(config.path)
+            self._flush_interval = config.flush_interval_ms / 1000
+            self._recover(config.catch_up)
+        self._arm()
+        self._schedule_flush()
 
     async def stop(self):
-        """Stop the event scheduler."""
+        """Stop the event scheduler; pending events stay scheduled."""
         self._running = False
-        if self._task:
-            self._task.cancel()
-            try:
-                await self._task
-            except asyncio.CancelledError:
-                pass
+        self._disarm()
+        if self._flush_handle is not None:
+            self._flush_handle.cancel()
+            self._flush_handle = None
+        if self._store is not None:
+            self._flush()
+
+    def _recover(self, catch_up: CatchUpPolicy):
+        """Load stored timers into the heap, applying the catch-up policy."""
+        rows = self._store.load()
+        now = time.time()
+        overdue = [row for row in rows if row[1] <= now]
+
+        if catch_up == CatchUpPolicy.DROP:
+            kept_overdue = []
+        elif catch_up == CatchUpPolicy.LATEST:
+            latest: Dict[str, Any] = {}
+            for row in overdue:
+                current = latest.get(row[2])
+                if current is None or row[1] > current[1]:
+                    latest[row[2]] = row
+            kept_overdue = list(latest.values())
+        else:
+            kept_overdue = overdue
+
+        kept_ids = {row[0] for row in kept_overdue}
+        for row in overdue:
+            if row[0] not in kept_ids:
+                self._store.delete(row[0])
+
+        # Events scheduled before start() win over stored ones and get stored
+        for entry in self._entries.values():
+            self._save(entry[2])
+
+        # Rows become ScheduledEvents only when they fire or are inspected,
+        # which keeps recovering a large backlog cheap
+        monotonic_now = time.monotonic()
+        recovered = 0
+        for row in kept_overdue + [row for row in rows if row[1] > now]:
+            if row[0] in self._entries:
+                continue
+            entry = [monotonic_now + row[1] - now, next(self._sequence), row]
+            self._entries[row[0]] = entry
+            self._heap.append(entry)
+            recovered += 1
+        heapq.heapify(self._heap)
+
+        log_info(
+            "Recovered scheduled events",
+            data={
+                "recovered": recovered,
+                "overdue": len(overdue),
+                "dropped": len(overdue) - len(kept_overdue),
+                "catch_up": catch_up.value,
+            },
+        )
 
     def schedule_event(
         self,
@@ -494,28 +1187,177 @@ class EventScheduler:
         delay_seconds: float,
         action: str,
         payload: Dict[str, Any],
-    ):
-        """Schedule an event to execute after a delay."""
-        scheduled_time = datetime.now() + timedelta(seconds=delay_seconds)
+    ) -> ScheduledEvent:
+        """Schedule an event to execute after a delay.
+
+        An event already pending under event_id is replaced.
+        """
+        delay_seconds = max(0.0, delay_seconds)
         event = ScheduledEvent(
             event_id=event_id,
-            scheduled_time=scheduled_time,
+            scheduled_time=datetime.now() + timedelta(seconds=delay_seconds),
             action=action,
             payload=payload,
         )
-        self.scheduled_events.append(event)
+        self._push(event, time.monotonic() + delay_seconds)
+        return event
+
+    def cancel_event(self, event_id: str) -> bool:
+        """Cancel a pending event.
+
+        Returns:
+            True if the event was pending
+        """
+        if not self._discard(event_id):
+            return False
+        self._arm()
+        return True
+
+    def reschedule_event(self, event_id: str, delay_seconds: float) -> Optional[ScheduledEvent]:
+        """Move a pending event to a new delay from now.
+
+        Returns:
+            The updated event, or None if no event is pending under event_id
+        """
+        entry = self._entries.get(event_id)
+        if entry is None:
+            return None
+
+        delay_seconds = max(0.0, delay_seconds)
+        event = _entry_event(entry).model_copy(
+            update={"scheduled_time": datetime.now() + timedelta(seconds=delay_seconds)}
+        )
+        self._push(event, time.monotonic() + delay_seconds)
+        return event
+
+    def _push(self, event: ScheduledEvent, deadline: float):
+        """Add an event to the heap, replacing a pending one with the same id."""
+        self._discard(event.event_id)
+        entry = [deadline, next(self._sequence), event]
+        self._entries[event.event_id] = entry
+        heapq.heappush(self._heap, entry)
+        self._save(event)
+        self._arm()
+
+    def _discard(self, event_id: str) -> bool:
+        """Mark an event's heap entry dead, compacting once most entries are dead."""
+        entry = self._entries.pop(event_id, None)
+        if entry is None:
+            return False
+
+        entry[2] = None
+        self._cancelled += 1
+        if self._store is not None:
+            self._store.delete(event_id)
+            self._schedule_flush()
+        if self._cancelled > SCHEDULER_COMPACT_MIN and self._cancelled * 2 > len(self._heap):
+            self._heap = [entry for entry in self._heap if entry[2] is not None]
+            heapq.heapify(self._heap)
+            self._cancelled = 0
+        return True
+
+    def _arm(self):
+        """Make sure the loop timer fires at the earliest pending deadline."""
+        if not self._running:
+            return
+
+        heap = self._heap
+        while heap and heap[0][2] is None:
+            heapq.heappop(heap)
+            self._cancelled -= 1
+        if not heap:
+            self._disarm()
+            return
 
-    async def _run(self):
-        """Run the scheduler loop."""
-        while self._running:
-            await asyncio.sleep(1)  # Check every second
+        deadline = heap[0][0]
+        if self._timer is not None and self._timer_deadline <= deadline:
+            return
 
-            now = datetime.now()
-            due_events = [e for e in self.scheduled_events if e.scheduled_time <= now]
+        self._disarm()
+        loop = self._loop
+        delay = max(0.0, deadline - time.monotonic())
+        self._timer = loop.call_at(loop.time() + delay, self._fire)
+        self._timer_deadline = deadline
+
+    def _disarm(self):
+        """Cancel the loop timer."""
+        if self._timer is not None:
+            self._timer.cancel()
+            self._timer = None
+            self._timer_deadline = None
+
+    def _fire(self):
+        """Start the due events and re-arm for the next deadline."""
+        self._timer = None
+        self._timer_deadline = None
+        if not self._running:
+            return
 
-            for event in due_events:
-                await self._execute_scheduled_event(event)
-                self.scheduled_events.remove(event)
+        heap = self._heap
+        now = time.monotonic()
+        started = 0
+        while heap and started < SCHEDULER_BATCH_SIZE:
+            entry = heap[0]
+            if entry[2] is None:
+                heapq.heappop(heap)
+                self._cancelled -= 1
+                continue
+            if entry[0] > now:
+                break
+
+            heapq.heappop(heap)
+            event = _entry_event(entry)
+            del self._entries[event.event_id]
+            if self._store is not None:
+                self._store.delete(event.event_id)
+            task = self._loop.create_task(self._execute_scheduled_event(event))
+            self._tasks.add(task)
+            task.add_done_callback(self._finished)
+            started += 1
+
+        if heap and started == SCHEDULER_BATCH_SIZE and heap[0][0] <= now:
+            # More events are due; let other callbacks run first
+            self._timer = self._loop.call_soon(self._fire)
+            self._timer_deadline = now
+        else:
+            self._arm()
+        self._schedule_flush()
+
+    def _save(self, event: ScheduledEvent):
+        """Queue an event for the store."""
+        if self._store is None:
+            return
+        self._store.save(
+            event.event_id, event.scheduled_time.timestamp(), event.action, event.payload
+        )
+        self._schedule_flush()
+
+    def _schedule_flush(self):
+        """Flush queued store writes after the flush interval."""
+        if (
+            self._store is None
+            or not self._running
+            or self._flush_handle is not None
+            or not self._store.dirty
+        ):
+            return
+        self._flush_handle = self._loop.call_later(self._flush_interval, self._flush)
+
+    def _flush(self):
+        """Write a batch of queued changes to the store, retrying on failure."""
+        self._flush_handle = None
+        try:
+            self._store.flush()
+        except sqlite3.Error as e:
+            log_error("Failed to persist scheduled events", error=str(e))
+            if self._running:
+                self._flush_handle = self._loop.call_later(SCHEDULER_FLUSH_RETRY, self._flush)
+
+    def _finished(self, task: asyncio.Task):
+        """Forget a finished event execution and report its failure."""
+        self._tasks.discard(task)
+        if not task.cancelled() and task.exception() is not None:
+            log_error("Scheduled event failed", error=str(task.exception()))
 
     async def _execute_scheduled_event(self, event: ScheduledEvent):
         """Execute a scheduled event."""
@@ -529,12 +1371,100 @@ class EventScheduler:
 # ============================================================================
 
 
+# File name of a project-level config
+PROJECT_CONFIG_NAME = "promptctl.yaml"
+
+# Number of project configs the config registry keeps compiled
+CONFIG_REGISTRY_SIZE = 16
+
+# Stat signatures of a manager's config files, base file first
+ConfigSignature = Tuple[FileSignature, ...]
+
+
+def user_config_path() -> Path:
+    """Get the user-level config path."""
+    return Path.home() / ".promptctl" / PROJECT_CONFIG_NAME
+
+
+def generated_hooks_path() -> Path:
+    """Get the path the hook daemon writes the generated hooks.json to."""
+    return Path.home() / ".promptctl" / "hooks.json"
+
+
+def find_project_config(cwd: str) -> Optional[Path]:
+    """Find the nearest promptctl.yaml in cwd or one of its parents."""
+    directory = Path(cwd)
+    if not directory.is_absolute():
+        return None
+
+    for candidate_dir in (directory, *directory.parents):
+        candidate = candidate_dir / PROJECT_CONFIG_NAME
+        if candidate.is_file():
+            return candidate
+    return None
+
+
+def merge_config_data(base: Dict[str, Any], override: Dict[str, Any]) -> Dict[str, Any]:
+    """Merge two config dicts; nested dicts merge, other values are replaced."""
+    merged = dict(base)
+    for key, value in override.items():
+        if isinstance(value, dict) and isinstance(merged.get(key), dict):
+            merged[key] = merge_config_data(merged[key], value)
+        else:
+            merged[key] = value
+    return merged
+
+
 class ConfigManager:
-    """Manages promptctl.yaml configuration."""
+    """Manages promptctl.yaml configuration.
 
-    def __init__(self, config_path: Optional[Path] = None):
-        self.config_path = config_path or self._default_config_path()
+    A manager may have a base config that config_path is merged over, as a
+    project's promptctl.yaml is merged over ~/.promptctl/promptctl.yaml.
+    Project managers (process_settings=False) reject PROCESS_SETTINGS in
+    config_path, since only the default config's apply.
+    """
+
+    def __init__(
+        self,
+        config_path: Optional[Path] = None,
+        base_path: Optional[Path] = None,
+        process_settings: bool = True,
+    ):
+        if config_path is None:
+            config_path = self._default_config_path()
+            base_path = user_config_path()
+        self.config_path = config_path
+        self.base_path = base_path if base_path != config_path else None
+        self.process_settings = process_settings
+        self._compiled: Dict[Path, CompiledConfigCache] = {}
         self._config: Optional[PromptCtlConfig] = None
+        self._engine: Optional[HandlerEngine] = None
+        self._signature: ConfigSignature = ()
+        self._listeners: List[Callable[[PromptCtlConfig], None]] = []
+
+    @property
+    def source_paths(self) -> List[Path]:
+        """Config files merged into this manager's config, base first."""
+        if self.base_path is None:
+            return [self.config_path]
+        return [self.base_path, self.config_path]
+
+    @property
+    def loaded(self) -> bool:
+        """Whether a config has been loaded."""
+        return self._config is not None
+
+    def add_listener(self, callback: Callable[[PromptCtlConfig], None]):
+        """Register a callback invoked with each newly loaded config."""
+        self._listeners.append(callback)
+
+    def _notify_listeners(self, config: PromptCtlConfig):
+        """Tell listeners about a newly loaded config."""
+        for callback in self._listeners:
+            try:
+                callback(config)
+            except Exception as e:
+                log_error("Config listener failed", error=str(e))
 
     def _default_config_path(self) -> Path:
         """Get default config path."""
@@ -543,20 +1473,155 @@ class ConfigManager:
         if local_config.exists():
             return local_config
 
-        home_config = Path.home() / ".promptctl" / "promptctl.yaml"
-        return home_config
+        return user_config_path()
 
     def load_config(self) -> PromptCtlConfig:
         """Load configuration from YAML file."""
-        if not self.config_path.exists():
-            # Return default empty config
-            return PromptCtlConfig()
+        config, self._signature = self._read_config()
+        self._config = config
+        self._notify_listeners(config)
+        return config
 
-        with open(self.config_path, "r") as f:
-            data = yaml.safe_load(f)
+    def _read_config(self) -> Tuple[PromptCtlConfig, ConfigSignature]:
+        """Parse, merge and validate the config files.
 
-        self._config = PromptCtlConfig(**data)
-        return self._config
+        Validation runs on the merged data, so a project config may hold
+        partial overrides such as `enabled: false` for a user handler.
+
+        Raises:
+            ValueError: If a project config sets one of PROCESS_SETTINGS
+
+        Returns:
+            Tuple of (config, stat signatures of the files read; the
+            default config is used if none of them exist)
+        """
+        # Taken before reading: a write in between triggers another reload
+        signature = self._current_signature()
+
+        data: Dict[str, Any] = {}
+        for path, file_sig in zip(self.source_paths, signature):
+            if file_sig is not None:
+                source = self._read_source(path)
+                if path == self.config_path and not self.process_settings:
+                    self._check_project_source(path, source)
+                data = merge_config_data(data, source)
+
+        return PromptCtlConfig(**data), signature
+
+    @staticmethod
+    def _check_project_source(path: Path, source: Dict[str, Any]):
+        """Reject settings a project config can't change."""
+        unsupported = []
+        for key in PROCESS_SETTINGS:
+            *sections, name = key.split(".")
+            section = source
+            for section_name in sections:
+                section = section.get(section_name)
+                if not isinstance(section, dict):
+                    break
+            else:
+                if name in section:
+                    unsupported.append(key)
+        if unsupported:
+            raise ValueError(
+                f"{path}: {', '.join(unsupported)} can only be set in "
+                f"{user_config_path()}, not in a project config"
+            )
+
+    def _read_source(self, path: Path) -> Dict[str, Any]:
+        """Get the parsed YAML of one config file, from the compiled cache if possible."""
+        with open(path, "rb") as f:
+            source = f.read()
+
+        compiled = self._compiled.get(path)
+        if compiled is None:
+            compiled = CompiledConfigCache(path, CONFIG_SCHEMA_VERSION)
+            self._compiled[path] = compiled
+
+        cached = compiled.load(source)
+        if cached is not None:
+            return cached
+
+        data = yaml.load(source, Loader=YAML_LOADER) or {}
+        if not isinstance(data, dict):
+            raise ValueError(f"{path}: expected a mapping at the top level")
+        compiled.store(source, data)
+        return data
+
+    def _current_signature(self) -> ConfigSignature:
+        """Stat the config files."""
+        return tuple(file_signature(path) for path in self.source_paths)
+
+    def config_changed(self) -> bool:
+        """Check whether the config files differ from the loaded ones (stat only)."""
+        return self._current_signature() != self._signature
+
+    def _compile_if_changed(
+        self,
+    ) -> Optional[Tuple[PromptCtlConfig, HandlerEngine, ConfigSignature]]:
+        """Parse, validate and compile the config if the file changed.
+
+        Safe to run outside the event loop thread. An invalid config is
+        logged and skipped until the file changes again. Nothing is done
+        before the first load; get_config() loads lazily.
+        """
+        if self._config is None or not self.config_changed():
+            return None
+
+        try:
+            config, signature = self._read_config()
+            engine = HandlerEngine(config)
+        except Exception as e:
+            self._signature = self._current_signature()
+            log_error(
+                "Invalid config - keeping the previous one",
+                data={"path": str(self.config_path)},
+                error=str(e),
+            )
+            return None
+
+        return config, engine, signature
+
+    def _swap(self, compiled: Tuple[PromptCtlConfig, HandlerEngine, ConfigSignature]):
+        """Publish a newly compiled config and engine."""
+        config, engine, signature = compiled
+        # Events in flight keep the engine they started with
+        self._replace_engine(engine)
+        self._config = config
+        self._signature = signature
+
+        log_info(
+            "Config reloaded",
+            data={"path": str(self.config_path), "handlers": len(config.handlers)},
+        )
+        self._notify_listeners(config)
+
+    def reload_if_changed(self) -> bool:
+        """Reload the config if the file changed since it was loaded.
+
+        Returns:
+            True if a new config was swapped in
+        """
+        compiled = self._compile_if_changed()
+        if compiled is None:
+            return False
+        self._swap(compiled)
+        return True
+
+    async def reload_if_changed_async(self) -> bool:
+        """Like reload_if_changed, but parses in a worker thread.
+
+        Only the swap runs on the event loop, so events keep being served
+        by the previous engine while the new config is validated.
+        """
+        if self._config is None or not self.config_changed():
+            return False
+
+        compiled = await asyncio.to_thread(self._compile_if_changed)
+        if compiled is None:
+            return False
+        self._swap(compiled)
+        return True
 
     def save_config(self, config: PromptCtlConfig):
         """Save configuration to YAML file."""
@@ -576,33 +1641,184 @@ class ConfigManager:
             self._config = self.load_config()
         return self._config
 
+    def get_engine(self) -> HandlerEngine:
+        """Get the compiled engine for the current config.
+
+        The engine is rebuilt only when the config object changes and is
+        published with a single assignment, so concurrent events always see
+        a complete engine.
+        """
+        config = self.get_config()
+        engine = self._engine
+        if engine is None or engine.config is not config:
+            engine = HandlerEngine(config)
+            self._replace_engine(engine)
+        return engine
+
+    def _replace_engine(self, engine: HandlerEngine):
+        """Publish engine, handing the previous engine's debounced work to it."""
+        previous = self._engine
+        self._engine = engine
+        if previous is not None and not previous.debouncer.idle:
+            previous.debouncer.hand_over(engine.debouncer)
+
+    def retire(self, successor: "ConfigManager"):
+        """Hand this manager's debounced work to successor's engine.
+
+        Called when the manager is dropped, so bursts it collected still run.
+        """
+        if self._engine is not None and not self._engine.debouncer.idle:
+            self._engine.debouncer.hand_over(successor.get_engine().debouncer)
+
+
+class ConfigRegistry:
+    """Compiled engines per project, looked up by the cwd of each event.
+
+    An event is handled with the nearest promptctl.yaml at or above its cwd,
+    merged over the user config; without one, the user config alone. The
+    default manager is used for events without a cwd and for its own config
+    file. Other managers are kept in an LRU of max_projects entries, and
+    each lookup re-stats their files so an edited config is recompiled. An
+    evicted manager hands its pending debounced bursts to the default one.
+    Project configs are opt-in: unless the default config sets
+    `project_configs: true`, every event uses the default manager.
+    """
+
+    def __init__(self, default: ConfigManager, max_projects: int = CONFIG_REGISTRY_SIZE):
+        self.default = default
+        self.max_projects = max_projects
+        self._managers: "OrderedDict[Path, ConfigManager]" = OrderedDict()
+
+    def manager_for(self, cwd: Optional[str]) -> ConfigManager:
+        """Get the config manager for events from cwd."""
+        if not cwd:
+            return self.default
+
+        if not self.default.get_config().project_configs:
+            return self.default
+
+        config_path = find_project_config(cwd) or user_config_path()
+        if config_path == self.default.config_path:
+            return self.default
+
+        manager = self._managers.get(config_path)
+        if manager is None:
+            manager = ConfigManager(
+                config_path, base_path=user_config_path(), process_settings=False
+            )
+            self._managers[config_path] = manager
+            while len(self._managers) > self.max_projects:
+                _, evicted = self._managers.popitem(last=False)
+                evicted.retire(self.default)
+        else:
+            self._managers.move_to_end(config_path)
+        return manager
+
+    async def get_engine(self, cwd: Optional[str]) -> HandlerEngine:
+        """Get the compiled engine for events from cwd.
+
+        Project configs are parsed and compiled in a worker thread. The
+        default manager loads inline, since its listeners reconfigure
+        logging (and in the hook daemon, hooks.json).
+        """
+        manager = self.manager_for(cwd)
+        if not manager.loaded:
+            if manager is self.default:
+                return manager.get_engine()
+            return await asyncio.to_thread(manager.get_engine)
+
+        await manager.reload_if_changed_async()
+        return manager.get_engine()
+
+    def engines(self) -> List[HandlerEngine]:
+        """Get the engines of all loaded configs."""
+        managers = [self.default, *self._managers.values()]
+        return [manager.get_engine() for manager in managers if manager.loaded]
+
+    def flush_caches(self):
+        """Write the buffered result cache lookups of all loaded engines."""
+        for engine in self.engines():
+            if engine.cache is not None:
+                engine.cache.flush()
+
 
 class HooksConfigWriter:
     """Writes hooks.json configuration for Claude Code."""
 
+    ALL_EVENTS = [
+        "PreToolUse",
+        "PostToolUse",
+        "Notification",
+        "UserPromptSubmit",
+        "SessionStart",
+        "SessionEnd",
+        "Stop",
+        "SubagentStop",
+        "PreCompact"
+    ]
+
+    @staticmethod
+    def event_matchers(config: PromptCtlConfig) -> Dict[str, str]:
+        """Derive the hook events (and matchers) that enabled handlers need.
+
+        Tool events get a matcher listing only the tools that handlers match
+        on, unless one of their handlers accepts any tool. With
+        `project_configs: true`, any project may handle any event, so every
+        event is registered with "*".
+        """
+        if config.project_configs:
+            return {event_name: "*" for event_name in HooksConfigWriter.ALL_EVENTS}
+
+        wildcard_events = set()
+        tools_by_event: Dict[HookEventName, set] = {}
+
+        for handler in config.handlers.values():
+            if not handler.enabled:
+                continue
+
+            tool = handler.match.tool if handler.match else None
+            if handler.hook in TOOL_HOOK_EVENTS and tool is not None:
+                tools = tools_by_event.setdefault(handler.hook, set())
+                tools.update([tool] if isinstance(tool, str) else tool)
+            else:
+                wildcard_events.add(handler.hook)
+
+        matchers = {}
+        for event_name in HooksConfigWriter.ALL_EVENTS:
+            event = HookEventName(event_name)
+            if event in wildcard_events:
+                matchers[event_name] = "*"
+            elif tools_by_event.get(event):
+                matchers[event_name] = "|".join(
+                    re.escape(tool) for tool in sorted(tools_by_event[event])
+                )
+
+        return matchers
+
     @staticmethod
     def generate_hooks_config(
-        dispatch_script: str, events: Optional[List[str]] = None
+        dispatch_script: str,
+        events: Optional[List[str]] = None,
+        config: Optional[PromptCtlConfig] = None,
     ) -> Dict[str, Any]:
-        """Generate hooks.json configuration."""
-        if events is None:
-            events = [
-                "PreToolUse",
-                "PostToolUse",
-                "Notification",
-                "UserPromptSubmit",
-                "SessionStart",
-                "SessionEnd",
-                "Stop",
-                "SubagentStop",
-                "PreCompact"
-            ]
+        """Generate hooks.json configuration.
+
+        With a config, only events that have enabled handlers are emitted, so
+        Claude Code never spawns dispatch for events nobody handles.
+        """
+        if config is not None:
+            matchers = HooksConfigWriter.event_matchers(config)
+        else:
+            matchers = {
+                event_name: "*"
+                for event_name in (events or HooksConfigWriter.ALL_EVENTS)
+            }
 
         hooks = {}
-        for event_name in events:
+        for event_name, matcher in matchers.items():
             hooks[event_name] = [
                 {
-                    "matcher": "*",
+                    "matcher": matcher,
                     "hooks": [{"type": "command", "command": dispatch_script}],
                 }
             ]
@@ -610,28 +1826,131 @@ class HooksConfigWriter:
         return {"hooks": hooks}
 
     @staticmethod
-    def write_hooks_config(output_path: Path, dispatch_script: str):
-        """Write hooks.json to file."""
-        config = HooksConfigWriter.generate_hooks_config(dispatch_script)
+    def write_hooks_config(
+        output_path: Path,
+        dispatch_script: str,
+        config: Optional[PromptCtlConfig] = None,
+    ) -> bool:
+        """Write hooks.json to file.
+
+        Returns:
+            True if the file content changed
+        """
+        hooks_config = HooksConfigWriter.generate_hooks_config(
+            dispatch_script, config=config
+        )
+        content = json.dumps(hooks_config, indent=2)
+
+        if output_path.exists() and output_path.read_text() == content:
+            return False
 
         output_path.parent.mkdir(parents=True, exist_ok=True)
-        with open(output_path, "w") as f:
-            json.dump(config, f, indent=2)
+        tmp_path = output_path.with_suffix(".json.tmp")
+        tmp_path.write_text(content)
+        tmp_path.replace(output_path)
+        return True
 
 
 # ============================================================================
 # MCP Server
 # ============================================================================
 
-# Initialize FastMCP server
-mcp = FastMCP("promptctl")
+@asynccontextmanager
+async def server_lifespan(server: "FastMCP"):
+    """Run the event scheduler on the loop that serves MCP requests."""
+    # Start event scheduler, recovering persisted timers if configured
+    await event_scheduler.start(config_manager.get_config().scheduler)
+    try:
+        yield {}
+    finally:
+        await event_scheduler.stop()
+
+
+# MCP tools and prompts, registered when the FastMCP server is created
+_mcp_tools: List[Callable[..., Any]] = []
+_mcp_prompts: List[Callable[..., Any]] = []
+_mcp: Optional["FastMCP"] = None
+
+
+def mcp_tool(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Register func as an MCP tool."""
+    _mcp_tools.append(func)
+    return func
+
+
+def mcp_prompt(func: Callable[..., Any]) -> Callable[..., Any]:
+    """Register func as an MCP prompt."""
+    _mcp_prompts.append(func)
+    return func
+
+
+def get_mcp() -> "FastMCP":
+    """Get the FastMCP server, creating it on first use."""
+    global _mcp
+    if _mcp is None:
+        from fastmcp import FastMCP
+
+        server = FastMCP("promptctl", lifespan=server_lifespan)
+        for func in _mcp_tools:
+            server.tool()(func)
+        for func in _mcp_prompts:
+            server.prompt()(func)
+        _mcp = server
+    return _mcp
+
+
+def __getattr__(name: str) -> Any:
+    """Create the FastMCP server on access to server.mcp (fastmcp run)."""
+    if name == "mcp":
+        return get_mcp()
+    raise AttributeError(f"module {__name__!r} has no attribute {name!r}")
+
 
 # Global state
 config_manager = ConfigManager()
+config_registry = ConfigRegistry(config_manager)
 event_scheduler = EventScheduler()
 
+# Hook command of the generated hooks configuration
+DISPATCH_COMMAND = "\"${CLAUDE_PLUGIN_ROOT}\"/bin/dispatch.sh"
+
 
-@mcp.tool()
+def regenerate_hooks_config(config: PromptCtlConfig, output_path: Optional[Path] = None):
+    """Keep a generated hooks.json in sync with a newly loaded config.
+
+    Only the hook daemon registers this listener. It writes to
+    ~/.promptctl/hooks.json unless given another output_path; the plugin
+    directory is a git checkout that may be read-only or shared by
+    concurrent sessions, so it is only written by write_hooks_config.py.
+    """
+    output_path = output_path or generated_hooks_path()
+    if HooksConfigWriter.write_hooks_config(output_path, DISPATCH_COMMAND, config=config):
+        log_info(
+            "Regenerated hooks.json",
+            data={
+                "path": str(output_path),
+                "events": HooksConfigWriter.event_matchers(config),
+            },
+        )
+
+
+def apply_logging_config(config: PromptCtlConfig):
+    """Reconfigure logging only when the config's logging section changed."""
+    logging_config = config.logging or LoggingConfig()
+    if logging_config != get_logger().config:
+        configure_logging(logging_config)
+
+
+def apply_execution_limits(config: PromptCtlConfig):
+    """Take the process-wide handler limit from the default config."""
+    handler_slots.limit = config.execution.max_concurrent_handlers
+
+
+config_manager.add_listener(apply_logging_config)
+config_manager.add_listener(apply_execution_limits)
+
+
+@mcp_tool
 def promptctl(action: str = "status") -> str:
     """
     PromptCtl tool for managing hook-based automation.
@@ -643,11 +1962,22 @@ def promptctl(action: str = "status") -> str:
         Result message
     """
     if action == "status":
+        config_manager.reload_if_changed()
         config = config_manager.get_config()
         enabled_handlers = sum(
             1 for h in config.handlers.values() if h.enabled
         )
-        return f"PromptCtl active with {enabled_handlers} enabled handlers"
+        status = f"PromptCtl active with {enabled_handlers} enabled handlers"
+
+        cache = config_manager.get_engine().cache
+        if cache is not None:
+            stats = cache.stats()
+            status += (
+                f"\nResult cache: {stats['hit_rate']:.0%} hit rate "
+                f"({stats['hits']} hits, {stats['misses']} misses), "
+                f"{stats['entries']} entries, {stats['size_bytes'] / 1024:.0f} KB"
+            )
+        return status
 
     elif action == "config":
         config_path = config_manager.config_path
@@ -667,25 +1997,47 @@ Configure handlers in promptctl.yaml to automate workflows."""
         return f"Unknown action: {action}. Use 'help' for available actions."
 
 
-@mcp.tool()
+@mcp_tool
 def logs(
     filter_type: str = "all",
     limit: int = 20,
     days: int = 1,
+    session_id: Optional[str] = None,
+    handler: Optional[str] = None,
+    cursor: Optional[str] = None,
 ) -> str:
     """
-    Query PromptCtl logs.
+    Query PromptCtl logs, newest first.
 
     Args:
         filter_type: Filter type (all, hooks, errors, slow, recent)
         limit: Maximum number of entries to return
         days: Number of days to query
+        session_id: Only entries of this session
+        handler: Only entries of this handler
+        cursor: Continue with the entries before this cursor, as returned
+            by a previous query that hit the limit
 
     Returns:
         Formatted log entries
     """
     from pathlib import Path
     from logflow import LogEntry, LogLevel, ConsoleFormatter
+    from logstore import (
+        SLOW_MS,
+        find_segment,
+        format_cursor,
+        list_segments,
+        parse_cursor,
+        query_segment,
+        segment_key,
+    )
+
+    position = None
+    if cursor is not None:
+        position = parse_cursor(cursor)
+        if position is None:
+            return f"Invalid cursor: {cursor}"
 
     log_dir = Path.home() / ".promptctl" / "logs"
 
@@ -698,9 +2050,20 @@ def logs(
     cutoff_date = datetime.now() - timedelta(days=days)
     log_files = []
 
-    for file_path in sorted(log_dir.glob("*.jsonl"), reverse=True):
+    # Plain and compressed segments, newest first
+    segments = list(reversed(list_segments(log_dir)))
+    cursor_segment = None
+    if position is not None:
+        # Found by identity, since the segment may have been sealed under
+        # a new name since the previous page; newer ones were on earlier pages
+        cursor_segment = find_segment(segments, position[0])
+        if cursor_segment is None:
+            return f"Invalid cursor: {cursor} (its log segment no longer exists)"
+        segments = segments[segments.index(cursor_segment):]
+
+    for file_path in segments:
         try:
-            date_str = file_path.stem
+            date_str = segment_key(file_path)[0]
             file_date = datetime.strptime(date_str, "%Y-%m-%d")
             if file_date >= cutoff_date:
                 log_files.append(file_path)
@@ -710,32 +2073,57 @@ def logs(
     if not log_files:
         return f"No log files found in {log_dir}"
 
-    # Read entries
+    # Index lookups for the filter; the index only narrows down the
+    # candidates, each entry is still checked below
+    query = {
+        "hooks": {"levels": {level.value for level in LogLevel if level.value.startswith("HOOK")}},
+        "errors": {"levels": {LogLevel.ERROR.value}, "flags": {"error"}},
+        "slow": {"flags": {"slow"}},
+    }.get(filter_type, {})
+
+    # Read entries, each segment backwards from its end (or the cursor)
     entries = []
+    last = None
     for file_path in log_files:
-        with open(file_path, "r", encoding="utf-8") as f:
-            for line in f:
-                try:
-                    entry = LogEntry.from_jsonl(line.strip())
-
-                    # Apply filters
-                    if filter_type == "hooks" and not entry.level.value.startswith("HOOK"):
-                        continue
-                    elif filter_type == "errors" and entry.level != LogLevel.ERROR and not entry.error:
-                        continue
-                    elif filter_type == "slow" and (entry.duration_ms is None or entry.duration_ms < 1000):
-                        continue
-
-                    entries.append(entry)
-
-                    if len(entries) >= limit:
-                        break
-                except Exception:
-                    continue
+        before = position[1] if file_path == cursor_segment else None
+        candidates = query_segment(
+            file_path,
+            session_id=session_id,
+            handler_name=handler,
+            since=cutoff_date.timestamp(),
+            reverse=True,
+            before=before,
+            **query,
+        )
+        for offset, line in candidates:
+            try:
+                entry = LogEntry.from_jsonl(line)
+            except Exception:
+                continue
+
+            # Apply filters
+            if entry.timestamp < cutoff_date:
+                continue
+            elif session_id is not None and entry.session_id != session_id:
+                continue
+            elif handler is not None and entry.handler_name != handler:
+                continue
+            elif filter_type == "hooks" and not entry.level.value.startswith("HOOK"):
+                continue
+            elif filter_type == "errors" and entry.level != LogLevel.ERROR and not entry.error:
+                continue
+            elif filter_type == "slow" and (entry.duration_ms is None or entry.duration_ms < SLOW_MS):
+                continue
+
+            entries.append(entry)
+            last = (file_path, offset)
 
             if len(entries) >= limit:
                 break
 
+        if len(entries) >= limit:
+            break
+
     if not entries:
         return f"No matching log entries found (filter: {filter_type})"
 
@@ -749,11 +2137,39 @@ def logs(
 
     result = "\n".join(result_lines)
     result += f"\n\n{len(entries)} entries (filter: {filter_type}, days: {days})"
+    if len(entries) >= limit:
+        result += f"\nOlder entries: cursor={format_cursor(*last)}"
 
     return result
 
 
-@mcp.prompt()
+@mcp_tool
+def log_drops() -> str:
+    """
+    Show log entries dropped by the buffer overflow policy, the rate limiter
+    and the full ERROR-class lane.
+
+    Returns:
+        Dropped entry counts per reason and level, and buffer usage
+    """
+    stats = get_logger().drop_stats()
+
+    lines = [
+        f"Buffer: {stats['buffered']}/{stats['buffer_size']} entries "
+        f"(overflow: {stats['overflow_policy']})",
+        f"Reserved (ERROR-class): {stats['reserved']}/{stats['reserved_size']} entries",
+    ]
+    for reason, by_level in stats["dropped"].items():
+        total = sum(by_level.values())
+        counts = ", ".join(f"{level}={count}" for level, count in sorted(by_level.items()))
+        lines.append(f"Dropped ({reason}): {total}" + (f" [{counts}]" if counts else ""))
+    if stats["writer_errors"]:
+        lines.append(f"Writer errors: {stats['writer_errors']}")
+
+    return "\n".join(lines)
+
+
+@mcp_prompt
 def setup_promptctl() -> str:
     """
     Setup prompt to help users configure PromptCtl.
@@ -824,13 +2240,32 @@ I can help you:
 Let me know what you'd like to automate!"""
 
 
+def deadline_fallback_output(hook_event_name: str, error: DeadlineExceeded) -> HookOutput:
+    """Response for an event whose handlers overran the deadline.
+
+    It is the same whatever the cancelled handlers had done so far: the tool
+    call or prompt goes ahead and the user is told which handlers were cut off.
+    """
+    return HookOutput(
+        systemMessage=(
+            f"promptctl: {hook_event_name} handlers exceeded the "
+            f"{error.deadline_ms} ms deadline and were cancelled: "
+            f"{', '.join(error.handler_names) or 'none'}"
+        )
+    )
+
+
 # Hook event handler - called by dispatch.py
-async def handle_hook_event(event_data: Dict[str, Any]) -> HookOutput:
+async def handle_hook_event(
+    event_data: Dict[str, Any], debounce: bool = False
+) -> HookOutput:
     """
     Process a hook event from Claude Code.
 
     Args:
         event_data: Hook event payload
+        debounce: Coalesce bursts for debounced handlers; only for processes
+            whose event loop outlives the event (the shared hook daemon)
 
     Returns:
         Hook output response
@@ -850,51 +2285,49 @@ async def handle_hook_event(event_data: Dict[str, Any]) -> HookOutput:
         }
     )
 
-    # Load configuration and match handlers
-    config = config_manager.get_config()
-
-    # Configure logging if specified in config
-    if config.logging:
-        configure_logging(config.logging)
-
-    engine = HandlerEngine(config)
+    # Load configuration and match handlers; logging is reconfigured by
+    # apply_logging_config when a loaded config changes it
+    engine = await config_registry.get_engine(event_data.get("cwd"))
+    config = engine.config
 
     matched_handlers = engine.match_handlers(hook_event_name, event_data)
 
     # Log matched handlers
-    for handler in matched_handlers:
-        # Find handler name
-        handler_name = None
-        for name, h in config.handlers.items():
-            if h == handler:
-                handler_name = name
-                break
-
-        if handler_name:
-            log_hook_matched(
-                hook_name=hook_event_name,
-                handler_name=handler_name,
-                session_id=session_id,
-                data={
-                    "priority": handler.priority,
-                    "actions": len(handler.actions)
-                }
-            )
+    for handler_name, handler in matched_handlers:
+        log_hook_matched(
+            hook_name=hook_event_name,
+            handler_name=handler_name,
+            session_id=session_id,
+            data={
+                "priority": handler.priority,
+                "actions": len(handler.actions)
+            }
+        )
 
     # Create execution context
     context = EventContext(event_data)
 
-    # Execute matched handlers
-    for handler in matched_handlers:
-        # Find handler name again
-        handler_name = None
-        for name, h in config.handlers.items():
-            if h == handler:
-                handler_name = name
-                break
-
-        if handler_name:
-            await engine.execute_handler(handler, handler_name, context, session_id)
+    # Execute matched handlers, concurrently within each priority tier
+    deadline_ms = config.execution.hook_deadlines_ms.get(hook_event_name)
+    try:
+        await engine.run_handlers(
+            matched_handlers,
+            context,
+            session_id,
+            debounce=debounce,
+            deadline_ms=deadline_ms,
+        )
+    except DeadlineExceeded as e:
+        get_logger().log(
+            LogLevel.SLOW_OPERATION,
+            "Hook deadline exceeded",
+            session_id=session_id,
+            hook_name=hook_event_name,
+            handler_name=e.handler_names[0] if e.handler_names else None,
+            duration_ms=float(e.deadline_ms),
+            data={"deadline_ms": e.deadline_ms, "cancelled_handlers": e.handler_names},
+        )
+        return deadline_fallback_output(hook_event_name, e)
 
     # Return default success response
     hook_output = HookOutput()
@@ -915,24 +2348,17 @@ async def handle_hook_event(event_data: Dict[str, Any]) -> HookOutput:
 
 def main():
     """Main entry point for the MCP server."""
-    # Start logger
-    import asyncio
-    loop = asyncio.get_event_loop()
-    loop.create_task(get_logger().start())
-
-    # Start event scheduler
-    loop.create_task(event_scheduler.start())
-
-    # Log server start
+    # Log server start (the writer thread starts on first use)
     log_info("PromptCtl MCP server starting")
+    start_segment_compressor()
 
     try:
-        # Run MCP server
-        mcp.run()
+        # Run MCP server; its lifespan runs the event scheduler
+        get_mcp().run()
     finally:
-        # Stop logger on shutdown
-        loop.run_until_complete(get_logger().stop())
         log_info("PromptCtl MCP server stopped")
+        # Stop logger on shutdown
+        get_logger().close()
 
 
 if __name__ == "__main__":
@@ -0,0 +1,93 @@
+#!/usr/bin/env python3
+"""
+Template rendering for PromptCtl actions.
+
+Templates such as "pytest {tool_input.file_path}" are parsed once into
+literal and placeholder segments and cached by template string. Rendering
+looks up only the placeholders a template references, so its cost depends
+on the template and not on the size of the hook payload.
+
+Placeholder semantics:
+- "{a.b.c}" is resolved by walking nested dicts one key at a time
+- Resolved values are rendered with str()
+- A placeholder that doesn't resolve, or resolves to a dict, is left in the
+  output unchanged: "{missing}" renders as "{missing}"
+- Braces around anything other than a dotted name ("{ echo; }", "{}") are
+  plain text
+- Rendered values are never expanded again
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+# Number of distinct templates kept compiled
+TEMPLATE_CACHE_SIZE = 1024
+
+PLACEHOLDER_PATTERN = re.compile(r"\{([\w-]+(?:\.[\w-]+)*)\}")
+
+# Returned by resolvers for placeholders without a value
+MISSING = object()
+
+Resolver = Callable[[Tuple[str, ...]], Any]
+
+
+class Template:
+    """A template split into literal text and placeholder segments."""
+
+    __slots__ = ("source", "_literals", "_placeholders")
+
+    def __init__(self, source: str):
+        self.source = source
+
+        literals: List[str] = []
+        placeholders: List[Tuple[Tuple[str, ...], str]] = []
+        position = 0
+        for found in PLACEHOLDER_PATTERN.finditer(source):
+            literals.append(source[position:found.start()])
+            placeholders.append((tuple(found.group(1).split(".")), found.group(0)))
+            position = found.end()
+        literals.append(source[position:])
+
+        # literals[i] precedes placeholders[i]; literals[-1] ends the template
+        self._literals = tuple(literals)
+        self._placeholders = tuple(placeholders)
+
+    def render(self, resolve: Resolver) -> str:
+        """Render the template, resolving each placeholder path on demand."""
+        if not self._placeholders:
+            return self.source
+
+        literals = self._literals
+        parts = [literals[0]]
+        for index, (path, text) in enumerate(self._placeholders, 1):
+            value = resolve(path)
+            parts.append(text if value is MISSING else str(value))
+            parts.append(literals[index])
+
+        return "".join(parts)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    """Parse a template, reusing the compiled form for repeated strings."""
+    return Template(source)
+
+
+def lookup_path(data: Dict[str, Any], path: Sequence[str]) -> Any:
+    """Walk nested dicts along path.
+
+    Returns:
+        The leaf value, or MISSING if a key is absent or the value is a dict
+    """
+    current: Any = data
+    for key in path:
+        if not isinstance(current, dict):
+            return MISSING
+        current = current.get(key, MISSING)
+        if current is MISSING:
+            return MISSING
+
+    if isinstance(current, dict):
+        return MISSING
+    return current
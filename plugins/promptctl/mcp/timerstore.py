@@ -0,0 +1,128 @@
+#!/usr/bin/env python3
+"""
+Durable store for scheduled events.
+
+With scheduler.persist enabled, pending timers are kept in a SQLite
+database (~/.promptctl/scheduler.db by default, WAL mode), so a restart
+doesn't lose them. Writes are buffered and flushed in one transaction per
+batch: a timer scheduled and fired within one flush interval never touches
+the disk. On startup all pending rows are read back with one query and
+overdue events are handled according to the catch-up policy.
+"""
+
+import json
+import os
+import sqlite3
+from enum import Enum
+from pathlib import Path
+from typing import Any, Dict, List, Optional, Set, Tuple
+
+from pydantic import BaseModel, Field
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS timers (
+    event_id TEXT PRIMARY KEY,
+    scheduled_time REAL NOT NULL,
+    action TEXT NOT NULL,
+    payload TEXT NOT NULL
+);
+"""
+
+# (event_id, scheduled time as a Unix timestamp, action, payload as JSON)
+TimerRow = Tuple[str, float, str, str]
+
+
+class CatchUpPolicy(str, Enum):
+    """What to do with events that became due while the server was down."""
+
+    ALL = "all"  # run every overdue event
+    LATEST = "latest"  # run only the most recent overdue event per action
+    DROP = "drop"  # discard overdue events
+
+
+class SchedulerConfig(BaseModel):
+    """Timer scheduler configuration."""
+
+    persist: bool = Field(default=False)
+    path: str = Field(default="~/.promptctl/scheduler.db")
+    catch_up: CatchUpPolicy = Field(default=CatchUpPolicy.ALL)
+    flush_interval_ms: int = Field(default=100, ge=0)
+
+
+class TimerStore:
+    """SQLite table of pending timers with batched writes."""
+
+    def __init__(self, path: str):
+        self.path = Path(path).expanduser()
+        self._conn: Optional[sqlite3.Connection] = None
+        self._pid: Optional[int] = None
+        self._upserts: Dict[str, TimerRow] = {}
+        self._deletes: Set[str] = set()
+
+    def _connect(self) -> sqlite3.Connection:
+        """Open the database, once per process (connections don't survive fork)."""
+        if self._conn is not None and self._pid == os.getpid():
+            return self._conn
+
+        self.path.parent.mkdir(parents=True, exist_ok=True)
+        conn = sqlite3.connect(str(self.path), timeout=5.0)
+        conn.execute("PRAGMA journal_mode=WAL")
+        conn.execute("PRAGMA synchronous=NORMAL")
+        conn.executescript(SCHEMA)
+
+        self._conn = conn
+        self._pid = os.getpid()
+        return conn
+
+    @property
+    def dirty(self) -> bool:
+        """Whether writes are waiting for a flush."""
+        return bool(self._upserts or self._deletes)
+
+    def load(self) -> List[TimerRow]:
+        """Read every stored timer; payloads are left encoded for the caller."""
+        return self._connect().execute(
+            "SELECT event_id, scheduled_time, action, payload FROM timers"
+        ).fetchall()
+
+    def save(self, event_id: str, scheduled_time: float, action: str, payload: Dict[str, Any]):
+        """Queue an insert or update of a timer."""
+        self._deletes.discard(event_id)
+        self._upserts[event_id] = (event_id, scheduled_time, action, json.dumps(payload))
+
+    def delete(self, event_id: str):
+        """Queue the removal of a timer."""
+        self._upserts.pop(event_id, None)
+        self._deletes.add(event_id)
+
+    def flush(self):
+        """Write queued changes in one transaction.
+
+        The queues are only cleared once the transaction committed, so
+        changes that failed to write are retried by the next flush.
+
+        Raises:
+            sqlite3.Error: If the changes couldn't be written
+        """
+        if not self.dirty:
+            return
+
+        upserts = list(self._upserts.values())
+        deletes = [(event_id,) for event_id in self._deletes]
+
+        conn = self._connect()
+        with conn:
+            if deletes:
+                conn.executemany("DELETE FROM timers WHERE event_id = ?", deletes)
+            if upserts:
+                conn.executemany("INSERT OR REPLACE INTO timers VALUES (?, ?, ?, ?)", upserts)
+
+        self._upserts.clear()
+        self._deletes.clear()
+
+    def close(self):
+        """Flush queued changes and close the database."""
+        self.flush()
+        if self._conn is not None and self._pid == os.getpid():
+            self._conn.close()
+        self._conn = None
@@ -0,0 +1,123 @@
+#!/usr/bin/env python3
+"""
+File change detection for PromptCtl config reloading.
+
+ConfigWatcher reports whether a file changed since the last check. A change
+is a different (mtime, size, inode) stat signature, so rewrites, editor
+rename-saves, deletion and re-creation are all caught.
+
+On Linux the file's directory is watched with inotify (through libc, no extra
+dependency) and fileno() returns a descriptor that becomes readable on
+activity, for use with select() or loop.add_reader(). Elsewhere, or if the
+directory doesn't exist yet, fileno() is None and the caller polls changed()
+every POLL_INTERVAL seconds.
+"""
+
+import ctypes
+import ctypes.util
+import os
+import sys
+from pathlib import Path
+from typing import Optional, Tuple
+
+# Seconds between stat checks when inotify isn't available
+POLL_INTERVAL = 1.0
+
+# inotify constants from <sys/inotify.h>
+IN_MODIFY = 0x00000002
+IN_ATTRIB = 0x00000004
+IN_CLOSE_WRITE = 0x00000008
+IN_MOVED_FROM = 0x00000040
+IN_MOVED_TO = 0x00000080
+IN_CREATE = 0x00000100
+IN_DELETE = 0x00000200
+IN_NONBLOCK = os.O_NONBLOCK
+IN_CLOEXEC = getattr(os, "O_CLOEXEC", 0)
+
+WATCH_MASK = (
+    IN_MODIFY
+    | IN_ATTRIB
+    | IN_CLOSE_WRITE
+    | IN_MOVED_FROM
+    | IN_MOVED_TO
+    | IN_CREATE
+    | IN_DELETE
+)
+
+# (mtime_ns, size, inode), or None for a missing file
+FileSignature = Optional[Tuple[int, int, int]]
+
+
+def file_signature(path: Path) -> FileSignature:
+    """Stat signature of a file, None if it doesn't exist."""
+    try:
+        stat = os.stat(path)
+    except OSError:
+        return None
+    return (stat.st_mtime_ns, stat.st_size, stat.st_ino)
+
+
+def _inotify_watch(directory: Path) -> Optional[int]:
+    """Open a non-blocking inotify descriptor watching directory."""
+    if not sys.platform.startswith("linux") or not directory.is_dir():
+        return None
+
+    try:
+        libc = ctypes.CDLL(ctypes.util.find_library("c") or None, use_errno=True)
+        init = libc.inotify_init1
+        add_watch = libc.inotify_add_watch
+    except (OSError, AttributeError):
+        return None
+
+    fd = init(IN_NONBLOCK | IN_CLOEXEC)
+    if fd < 0:
+        return None
+
+    if add_watch(fd, os.fsencode(str(directory)), WATCH_MASK) < 0:
+        os.close(fd)
+        return None
+
+    return fd
+
+
+class ConfigWatcher:
+    """Reports changes to one file, via inotify or stat polling."""
+
+    def __init__(self, path: Path):
+        self.path = path
+        self._signature = file_signature(path)
+        self._fd = _inotify_watch(path.parent)
+
+    @property
+    def backend(self) -> str:
+        """Name of the change detection backend."""
+        return "inotify" if self._fd is not None else "poll"
+
+    def fileno(self) -> Optional[int]:
+        """Descriptor that becomes readable on directory activity, if any."""
+        return self._fd
+
+    def drain(self):
+        """Discard queued inotify events; stat signatures decide what changed."""
+        if self._fd is None:
+            return
+        try:
+            while os.read(self._fd, 65536):
+                pass
+        except BlockingIOError:
+            pass
+
+    def changed(self) -> bool:
+        """Check whether the file changed since the previous call."""
+        self.drain()
+        signature = file_signature(self.path)
+        if signature == self._signature:
+            return False
+        self._signature = signature
+        return True
+
+    def close(self):
+        """Release the inotify descriptor."""
+        if self._fd is not None:
+            os.close(self._fd)
+            self._fd = None
@@ -1,6 +1,8 @@
 """Context for hook execution with payload parsing and template rendering."""
 
-from typing import Any, Dict, Optional
+from typing import Any, Dict, Optional, Tuple
+
+from .template import MISSING, compile_template, lookup_path
 
 
 class Context:
@@ -44,66 +46,29 @@ class Context:
         - Nested: {tool.name}
         - State: {state.key}
 
+        Unresolved placeholders are left unchanged.
+
         Args:
             template: Template string with {variable} placeholders
 
         Returns:
             Rendered string
         """
-        result = template
-
-        # Replace payload variables
-        result = self._replace_variables(result, self._payload, prefix="")
-
-        # Replace state variables
-        result = self._replace_variables(result, self._state, prefix="state.")
-
-        return result
-
-    def _replace_variables(self, text: str, data: Dict[str, Any], prefix: str) -> str:
-        """Replace variables in text from data dict.
-
-        Args:
-            text: Text with {variable} placeholders
-            data: Data dictionary
-            prefix: Prefix for variable names (e.g., "state.")
-
-        Returns:
-            Text with variables replaced
-        """
-        result = text
-
-        # Flatten nested dict for replacement
-        flat = self._flatten_dict(data, parent_key=prefix.rstrip('.'))
-
-        for key, value in flat.items():
-            placeholder = f"{{{key}}}"
-            if placeholder in result:
-                result = result.replace(placeholder, str(value))
-
-        return result
+        return compile_template(template).render(self._resolve)
 
-    def _flatten_dict(self, data: Dict[str, Any], parent_key: str = '') -> Dict[str, Any]:
-        """Flatten nested dictionary with dot notation keys.
+    def _resolve(self, path: Tuple[str, ...]) -> Any:
+        """Resolve a placeholder path, payload first, then state.
 
         Args:
-            data: Nested dictionary
-            parent_key: Parent key prefix
+            path: Placeholder path split on dots
 
         Returns:
-            Flattened dictionary
+            Value at path or MISSING
         """
-        items = []
-
-        for key, value in data.items():
-            new_key = f"{parent_key}.{key}" if parent_key else key
-
-            if isinstance(value, dict):
-                items.extend(self._flatten_dict(value, new_key).items())
-            else:
-                items.append((new_key, value))
-
-        return dict(items)
+        value = lookup_path(self._payload, path)
+        if value is MISSING and path[0] == 'state' and len(path) > 1:
+            value = lookup_path(self._state, path[1:])
+        return value
 
     def set_state(self, key: str, value: Any) -> None:
         """Set state value.
@@ -0,0 +1,104 @@
+"""Compiled templates for context rendering.
+
+Templates are parsed once into literal and placeholder segments and cached by
+template string. Only the placeholders a template references are looked up,
+so rendering cost does not grow with the size of the hook payload.
+
+Unresolved placeholders, and placeholders that resolve to a dict, are left in
+the output unchanged. Braces around anything other than a dotted name are
+plain text.
+"""
+
+import re
+from functools import lru_cache
+from typing import Any, Callable, Dict, List, Sequence, Tuple
+
+TEMPLATE_CACHE_SIZE = 1024
+
+PLACEHOLDER_PATTERN = re.compile(r"\{([\w-]+(?:\.[\w-]+)*)\}")
+
+# Returned by resolvers for placeholders without a value
+MISSING = object()
+
+
+class Template:
+    """A template split into literal text and placeholder segments."""
+
+    __slots__ = ("source", "_literals", "_placeholders")
+
+    def __init__(self, source: str):
+        """Parse a template string.
+
+        Args:
+            source: Template string with {variable} placeholders
+        """
+        self.source = source
+
+        literals: List[str] = []
+        placeholders: List[Tuple[Tuple[str, ...], str]] = []
+        position = 0
+        for found in PLACEHOLDER_PATTERN.finditer(source):
+            literals.append(source[position:found.start()])
+            placeholders.append((tuple(found.group(1).split('.')), found.group(0)))
+            position = found.end()
+        literals.append(source[position:])
+
+        self._literals = tuple(literals)
+        self._placeholders = tuple(placeholders)
+
+    def render(self, resolve: Callable[[Tuple[str, ...]], Any]) -> str:
+        """Render the template.
+
+        Args:
+            resolve: Maps a placeholder path to its value or MISSING
+
+        Returns:
+            Rendered string
+        """
+        if not self._placeholders:
+            return self.source
+
+        literals = self._literals
+        parts = [literals[0]]
+        for index, (path, text) in enumerate(self._placeholders, 1):
+            value = resolve(path)
+            parts.append(text if value is MISSING else str(value))
+            parts.append(literals[index])
+
+        return ''.join(parts)
+
+
+@lru_cache(maxsize=TEMPLATE_CACHE_SIZE)
+def compile_template(source: str) -> Template:
+    """Parse a template, reusing the compiled form for repeated strings.
+
+    Args:
+        source: Template string
+
+    Returns:
+        Compiled template
+    """
+    return Template(source)
+
+
+def lookup_path(data: Dict[str, Any], path: Sequence[str]) -> Any:
+    """Walk nested dicts along path.
+
+    Args:
+        data: Nested dictionary
+        path: Keys to follow
+
+    Returns:
+        Leaf value, or MISSING if a key is absent or the value is a dict
+    """
+    current: Any = data
+    for key in path:
+        if not isinstance(current, dict):
+            return MISSING
+        current = current.get(key, MISSING)
+        if current is MISSING:
+            return MISSING
+
+    if isinstance(current, dict):
+        return MISSING
+    return current
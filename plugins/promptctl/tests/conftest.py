@@ -0,0 +1,19 @@
+"""
+Shared setup for the PromptCtl tests.
+
+The mcp/ modules import each other by name, as they do when daemon.py or
+server.py runs, so that directory goes on sys.path. HOME points at a
+scratch directory before anything is imported, so nothing a test does can
+touch ~/.promptctl.
+"""
+
+import os
+import sys
+import tempfile
+from pathlib import Path
+
+PLUGIN_ROOT = Path(__file__).resolve().parent.parent
+
+sys.path.insert(0, str(PLUGIN_ROOT / "mcp"))
+os.environ["HOME"] = tempfile.mkdtemp(prefix="promptctl-tests-")
+os.environ.pop("PROMPTCTL_SOCKET", None)
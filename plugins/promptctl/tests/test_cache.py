@@ -0,0 +1,126 @@
+"""ResultCache lookups, buffered stats and use from worker threads."""
+
+import asyncio
+import os
+import sqlite3
+
+import cache as cache_module
+from cache import CacheConfig, ResultCache
+
+
+def make_cache(tmp_path, **options):
+    return ResultCache(CacheConfig(path=str(tmp_path / "cache.db"), **options))
+
+
+def stored_stats(tmp_path):
+    """Counters as written to the database, bypassing the cache's buffer."""
+    conn = sqlite3.connect(str(tmp_path / "cache.db"))
+    try:
+        return dict(conn.execute("SELECT name, value FROM stats").fetchall())
+    finally:
+        conn.close()
+
+
+def test_lookup_round_trip(tmp_path):
+    (tmp_path / "input.txt").write_text("one")
+    cache = make_cache(tmp_path)
+
+    key, stored = cache.lookup("wc -l", str(tmp_path), ["input.txt"])
+    assert stored is None
+    cache.put(key, {"exit_code": 0, "stdout": "1"})
+
+    assert cache.lookup("wc -l", str(tmp_path), ["input.txt"]) == (
+        key,
+        {"exit_code": 0, "stdout": "1"},
+    )
+
+    # Changing an input changes the key
+    (tmp_path / "input.txt").write_text("two lines")
+    other, stored = cache.lookup("wc -l", str(tmp_path), ["input.txt"])
+    assert other != key and stored is None
+
+
+def test_lookups_are_buffered_until_batch(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "STATS_FLUSH_BATCH", 3)
+    monkeypatch.setattr(cache_module, "STATS_FLUSH_INTERVAL", 3600.0)
+    cache = make_cache(tmp_path)
+    cache.put("k", {"stdout": "x"})
+
+    cache.get("k")
+    cache.get("missing")
+    assert stored_stats(tmp_path).get("hits", 0) == 0
+
+    cache.get("k")
+    assert stored_stats(tmp_path) == {"hits": 2, "misses": 1}
+
+
+def test_stats_include_buffered_lookups(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "STATS_FLUSH_INTERVAL", 3600.0)
+    cache = make_cache(tmp_path)
+    cache.put("k", {"stdout": "x"})
+    cache.get("k")
+    cache.get("missing")
+
+    stats = cache.stats()
+    assert (stats["hits"], stats["misses"], stats["entries"]) == (1, 1, 1)
+    assert stats["hit_rate"] == 0.5
+
+
+def test_eviction_sees_buffered_last_used(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "STATS_FLUSH_INTERVAL", 3600.0)
+    cache = make_cache(tmp_path, max_entries=2)
+    cache.put("old", {"stdout": "1"})
+    cache.put("new", {"stdout": "2"})
+
+    # Only buffered so far; put writes it before evicting
+    assert cache.get("old") is not None
+    cache.put("third", {"stdout": "3"})
+
+    assert cache.get("old") is not None
+    assert cache.get("new") is None
+    assert cache.stats()["evictions"] == 1
+
+
+def test_flush_writes_pending_lookups(tmp_path, monkeypatch):
+    monkeypatch.setattr(cache_module, "STATS_FLUSH_INTERVAL", 3600.0)
+    cache = make_cache(tmp_path)
+    cache.get("missing")
+    cache.flush()
+    assert stored_stats(tmp_path) == {"misses": 1}
+
+
+def test_worker_threads_share_one_connection(tmp_path):
+    cache = make_cache(tmp_path)
+
+    async def run():
+        keys = [f"k{i}" for i in range(20)]
+        await asyncio.gather(
+            *(asyncio.to_thread(cache.put, key, {"stdout": key}) for key in keys)
+        )
+        return await asyncio.gather(*(asyncio.to_thread(cache.get, key) for key in keys))
+
+    results = asyncio.run(run())
+    assert [r["stdout"] for r in results] == [f"k{i}" for i in range(20)]
+    assert cache.stats()["hits"] == 20
+
+
+def test_file_digests_are_pruned(tmp_path):
+    cache = make_cache(tmp_path, max_file_digests=4)
+    paths = []
+    for n in range(6):
+        path = tmp_path / f"input{n}.txt"
+        path.write_text(str(n))
+        cache.file_digest(str(path))
+        paths.append(str(path))
+    os.unlink(paths[3])
+    os.unlink(paths[4])
+
+    # Over the limit, deleted files go first, then the oldest hashes down
+    # to 3 of 4
+    cache.put("k", {"stdout": "x"})
+    conn = sqlite3.connect(str(tmp_path / "cache.db"))
+    try:
+        stored = [row[0] for row in conn.execute("SELECT path FROM file_digests ORDER BY rowid")]
+    finally:
+        conn.close()
+    assert stored == [paths[1], paths[2], paths[5]]
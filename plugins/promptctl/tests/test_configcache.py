@@ -0,0 +1,107 @@
+"""Compiled config cache: hits, invalidation and damaged cache files."""
+
+import pytest
+
+import server
+from configcache import CompiledConfigCache, cache_directory
+from server import CONFIG_SCHEMA_VERSION, ConfigManager
+
+CONFIG = """\
+version: "1.0"
+handlers:
+  lint:
+    hook: PostToolUse
+    actions:
+      - action: log
+        message: "{message}"
+"""
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path / "home"))
+
+
+@pytest.fixture
+def yaml_parses(monkeypatch):
+    """Count YAML parses done by ConfigManager."""
+    parses = []
+    real_load = server.yaml.load
+
+    def load(*args, **kwargs):
+        parses.append(1)
+        return real_load(*args, **kwargs)
+
+    monkeypatch.setattr(server.yaml, "load", load)
+    return parses
+
+
+def write_config(tmp_path, message="one"):
+    path = tmp_path / "project" / "promptctl.yaml"
+    path.parent.mkdir(exist_ok=True)
+    path.write_text(CONFIG.format(message=message))
+    return path
+
+
+def load_message(path):
+    manager = ConfigManager(path, base_path=path)
+    return manager.load_config().handlers["lint"].actions[0].model_extra["message"]
+
+
+def test_second_load_skips_yaml(tmp_path, yaml_parses):
+    path = write_config(tmp_path)
+    assert load_message(path) == "one"
+    assert load_message(path) == "one"
+    assert len(yaml_parses) == 1
+
+
+def test_edit_invalidates(tmp_path, yaml_parses):
+    path = write_config(tmp_path, "one")
+    load_message(path)
+    # Same size, different content
+    path.write_text(CONFIG.format(message="two"))
+    assert load_message(path) == "two"
+    assert len(yaml_parses) == 2
+
+
+def test_cache_lives_outside_the_project(tmp_path):
+    path = write_config(tmp_path)
+    load_message(path)
+
+    assert [p.name for p in path.parent.iterdir()] == ["promptctl.yaml"]
+    cache = CompiledConfigCache(path, CONFIG_SCHEMA_VERSION)
+    assert cache.path.parent == cache_directory()
+    assert cache.path.exists()
+
+
+@pytest.mark.parametrize("damage", [b"", b"garbage", None])
+def test_damaged_cache_falls_back_to_parsing(tmp_path, yaml_parses, damage):
+    path = write_config(tmp_path)
+    load_message(path)
+    cache = CompiledConfigCache(path, CONFIG_SCHEMA_VERSION)
+    if damage is None:
+        # Right key, truncated body
+        key, _, body = cache.path.read_bytes().partition(b"\n")
+        damage = key + b"\n" + body[:5]
+    cache.path.write_bytes(damage)
+
+    assert load_message(path) == "one"
+    assert len(yaml_parses) == 2
+
+
+def test_schema_version_is_part_of_the_key(tmp_path):
+    source = b"handlers: {}\n"
+    path = tmp_path / "promptctl.yaml"
+    assert CompiledConfigCache(path, "1").store(source, {"handlers": {}})
+
+    assert CompiledConfigCache(path, "1").load(source) == {"handlers": {}}
+    assert CompiledConfigCache(path, "2").load(source) is None
+    assert CompiledConfigCache(path, "1").load(source + b"\n") is None
+
+
+def test_unwritable_cache_is_not_an_error(tmp_path):
+    blocked = tmp_path / "blocked"
+    blocked.write_text("a file, not a directory")
+    cache = CompiledConfigCache(tmp_path / "promptctl.yaml", "1", directory=blocked)
+    assert not cache.store(b"x", {"a": 1})
+    assert cache.load(b"x") is None
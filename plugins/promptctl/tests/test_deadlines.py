@@ -0,0 +1,72 @@
+"""Hook deadlines: handlers cancelled when an event overruns its budget."""
+
+import asyncio
+import time
+
+import pytest
+
+from server import (
+    DeadlineExceeded,
+    EventContext,
+    HandlerEngine,
+    PromptCtlConfig,
+    deadline_fallback_output,
+)
+
+
+def make_engine(**scripts):
+    return HandlerEngine(
+        PromptCtlConfig(
+            handlers={
+                name: {
+                    "hook": "PreToolUse",
+                    "actions": [{"action": "command", "script": script}],
+                }
+                for name, script in scripts.items()
+            }
+        )
+    )
+
+
+def run_handlers(engine, deadline_ms):
+    handlers = engine.match_handlers("PreToolUse", {"tool_name": "Bash"})
+    return asyncio.run(
+        engine.run_handlers(
+            handlers, EventContext({"cwd": "/"}), "s", deadline_ms=deadline_ms
+        )
+    )
+
+
+def test_handlers_within_deadline_return_results():
+    engine = make_engine(fast="echo fast")
+    results = run_handlers(engine, 5000)
+    assert [r["results"][0]["status"] for r in results] == ["success"]
+
+
+def test_overrunning_handlers_are_cancelled_and_named():
+    engine = make_engine(fast="true", slow="sleep 10")
+
+    started = time.monotonic()
+    with pytest.raises(DeadlineExceeded) as raised:
+        run_handlers(engine, 200)
+
+    assert time.monotonic() - started < 5
+    assert raised.value.deadline_ms == 200
+    assert raised.value.handler_names == ["slow"]
+
+
+def test_cancelled_commands_are_killed(tmp_path):
+    marker = tmp_path / "finished"
+    engine = make_engine(slow=f"sleep 0.5 && touch {marker}")
+
+    with pytest.raises(DeadlineExceeded):
+        run_handlers(engine, 100)
+
+    time.sleep(1)
+    assert not marker.exists()
+
+
+def test_fallback_output_names_cancelled_handlers():
+    output = deadline_fallback_output("PreToolUse", DeadlineExceeded(200, ["slow"]))
+    assert "200 ms deadline" in output.systemMessage
+    assert output.systemMessage.endswith("cancelled: slow")
@@ -0,0 +1,169 @@
+"""HandlerDebouncer bursts, and their handover when an engine is replaced."""
+
+import asyncio
+
+from server import (
+    ConfigManager,
+    ConfigRegistry,
+    EventContext,
+    Handler,
+    HandlerDebouncer,
+)
+
+CONFIG = """\
+version: "1.0"
+handlers:
+  lint:
+    hook: PostToolUse
+    debounce:
+      window_ms: {window_ms}
+    actions:
+      - action: command
+        script: "true"
+"""
+
+
+def handler(edge="trailing", window_ms=20):
+    return Handler(
+        hook="PostToolUse", debounce={"window_ms": window_ms, "edge": edge}
+    )
+
+
+def event(file_path, n=0):
+    return EventContext({"tool_input": {"file_path": file_path}, "n": n})
+
+
+class Recorder:
+    """Stands in for HandlerEngine._execute_limited."""
+
+    def __init__(self):
+        self.calls = []
+
+    async def __call__(self, handler, name, context, session_id, count):
+        self.calls.append((name, context.get("tool_input.file_path"), context.get("n"), count))
+
+
+def test_trailing_edge_runs_once_with_latest_event():
+    recorder = Recorder()
+    debouncer = HandlerDebouncer(recorder)
+
+    async def run():
+        lint = handler()
+        ran_now = [debouncer.submit("lint", lint, event("a.py", n), "s") for n in range(3)]
+        await asyncio.sleep(0.08)
+        await debouncer.flush()
+        return ran_now
+
+    assert asyncio.run(run()) == [False, False, False]
+    assert recorder.calls == [("lint", "a.py", 2, 3)]
+
+
+def test_leading_edge_runs_first_event_only():
+    recorder = Recorder()
+    debouncer = HandlerDebouncer(recorder)
+
+    async def run():
+        lint = handler(edge="leading")
+        ran_now = [debouncer.submit("lint", lint, event("a.py", n), "s") for n in range(3)]
+        await asyncio.sleep(0.08)
+        return ran_now
+
+    assert asyncio.run(run()) == [True, False, False]
+    assert recorder.calls == []
+    assert debouncer.idle
+
+
+def test_bursts_are_keyed():
+    recorder = Recorder()
+    debouncer = HandlerDebouncer(recorder)
+
+    async def run():
+        lint = handler()
+        for path in ("a.py", "b.py", "a.py"):
+            debouncer.submit("lint", lint, event(path), "s")
+        await debouncer.flush()
+
+    asyncio.run(run())
+    assert sorted(recorder.calls) == [("lint", "a.py", 0, 2), ("lint", "b.py", 0, 1)]
+
+
+def test_events_without_key_are_not_debounced():
+    recorder = Recorder()
+    debouncer = HandlerDebouncer(recorder)
+
+    async def run():
+        lint = handler()
+        ran_now = [debouncer.submit("lint", lint, EventContext({"n": n}), "s") for n in range(2)]
+        ran_now.append(debouncer.submit("lint", lint, event("a.py"), "s"))
+        await debouncer.flush()
+        return ran_now
+
+    assert asyncio.run(run()) == [True, True, False]
+    assert recorder.calls == [("lint", "a.py", 0, 1)]
+
+
+def test_hand_over_runs_pending_bursts_and_moves_executions():
+    old_recorder = Recorder()
+    old = HandlerDebouncer(old_recorder)
+    new = HandlerDebouncer(Recorder())
+
+    async def run():
+        old.submit("lint", handler(window_ms=60_000), event("a.py"), "s")
+        old.hand_over(new)
+        assert old.idle and not new.idle
+        await new.flush()
+
+    asyncio.run(run())
+    assert old_recorder.calls == [("lint", "a.py", 0, 1)]
+    assert new.idle
+
+
+def submit_pending(manager):
+    """Start a long burst on the manager's engine, recording its execution."""
+    engine = manager.get_engine()
+    recorder = Recorder()
+    engine.debouncer._execute = recorder
+    lint = engine.config.handlers["lint"]
+    engine.debouncer.submit("lint", lint, event("a.py"), "s")
+    return engine, recorder
+
+
+def test_config_swap_hands_over_pending_bursts(tmp_path):
+    config_path = tmp_path / "promptctl.yaml"
+    config_path.write_text(CONFIG.format(window_ms=60_000))
+    manager = ConfigManager(config_path, base_path=tmp_path / "missing.yaml")
+
+    async def run():
+        old_engine, recorder = submit_pending(manager)
+        config_path.write_text(CONFIG.format(window_ms=50_000) + "\n")
+        assert manager.reload_if_changed()
+        new_engine = manager.get_engine()
+        assert new_engine is not old_engine
+        await new_engine.debouncer.flush()
+        return recorder
+
+    assert asyncio.run(run()).calls == [("lint", "a.py", 0, 1)]
+
+
+def test_registry_eviction_hands_over_pending_bursts(tmp_path):
+    default_path = tmp_path / "user.yaml"
+    default_path.write_text(CONFIG.format(window_ms=60_000) + "project_configs: true\n")
+    default = ConfigManager(default_path, base_path=default_path)
+    registry = ConfigRegistry(default, max_projects=1)
+
+    projects = []
+    for name in ("one", "two"):
+        project = tmp_path / name
+        project.mkdir()
+        (project / "promptctl.yaml").write_text(CONFIG.format(window_ms=60_000))
+        projects.append(project)
+
+    async def run():
+        first = registry.manager_for(str(projects[0]))
+        assert first is not default
+        _, recorder = submit_pending(first)
+        registry.manager_for(str(projects[1]))
+        await default.get_engine().debouncer.flush()
+        return recorder
+
+    assert asyncio.run(run()).calls == [("lint", "a.py", 0, 1)]
@@ -0,0 +1,84 @@
+"""bin/dispatch.py handling an event in-process, as it does without a daemon."""
+
+import json
+import os
+import subprocess
+import sys
+
+from conftest import PLUGIN_ROOT
+
+DISPATCH = PLUGIN_ROOT / "bin" / "dispatch.py"
+HOOKS_JSON = PLUGIN_ROOT / "hooks" / "hooks.json"
+
+CONFIG = """\
+version: "1.0"
+handlers:
+  only-bash:
+    hook: PreToolUse
+    match:
+      tool: Bash
+    actions:
+      - action: command
+        script: "true"
+"""
+
+EVENT = {
+    "hook_event_name": "PostToolUse",
+    "session_id": "session-1",
+    "cwd": "/",
+    "tool_name": "Write",
+    "tool_input": {"file_path": "/tmp/notes.txt", "content": "file body SECRET"},
+}
+
+
+def dispatch(home, event, **env):
+    """Run dispatch.py in-process mode with a scratch HOME."""
+    config_dir = home / ".promptctl"
+    config_dir.mkdir(exist_ok=True)
+    (config_dir / "promptctl.yaml").write_text(CONFIG)
+    return subprocess.run(
+        [sys.executable, str(DISPATCH)],
+        input=json.dumps(event).encode(),
+        capture_output=True,
+        cwd=str(home),
+        env=dict(os.environ, HOME=str(home), PROMPTCTL_NO_DAEMON="1", **env),
+        timeout=60,
+    )
+
+
+def test_in_process_dispatch_answers_quietly(tmp_path):
+    hooks_before = HOOKS_JSON.read_bytes()
+
+    result = dispatch(tmp_path, EVENT)
+
+    assert result.returncode == 0, result.stderr
+    assert json.loads(result.stdout)["continue"] is True
+    # Console logging would end up in the hook's stderr
+    assert result.stderr == b""
+    # Loading the config must not rewrite the plugin's hooks.json
+    assert HOOKS_JSON.read_bytes() == hooks_before
+
+
+def test_dispatch_log_leaves_out_payloads(tmp_path):
+    dispatch(tmp_path, EVENT)
+    log = (tmp_path / ".promptctl" / "logs" / "dispatch.log").read_text()
+    assert "SECRET" not in log
+    records = [json.loads(line) for line in log.splitlines()]
+    triggered = next(r for r in records if r["message"] == "Hook triggered")
+    assert triggered["tool_name"] == "Write"
+
+    dispatch(tmp_path, EVENT, PROMPTCTL_LOG_EVENTS="1")
+    log = (tmp_path / ".promptctl" / "logs" / "dispatch.log").read_text()
+    assert "SECRET" in log
+
+
+def test_hook_pipeline_does_not_import_fastmcp():
+    code = "import sys, daemon; print('fastmcp' in sys.modules)"
+    result = subprocess.run(
+        [sys.executable, "-c", code],
+        cwd=str(PLUGIN_ROOT / "mcp"),
+        capture_output=True,
+        text=True,
+        timeout=60,
+    )
+    assert result.stdout.strip() == "False", result.stderr
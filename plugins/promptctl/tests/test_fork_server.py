@@ -0,0 +1,132 @@
+"""The hook daemon in fork mode, run as a subprocess with a scratch HOME."""
+
+import json
+import os
+import signal
+import socket
+import subprocess
+import sys
+import time
+
+import pytest
+
+from conftest import PLUGIN_ROOT
+
+USER_CONFIG = """\
+version: "1.0"
+project_configs: true
+handlers:
+  on-stop:
+    hook: Stop
+    actions:
+      - action: log
+        message: "stop"
+"""
+
+PROJECT_CONFIG = """\
+handlers:
+  mark:
+    hook: Stop
+    actions:
+      - action: command
+        script: "echo {session_id} >> marks"
+"""
+
+
+@pytest.fixture
+def fork_server(tmp_path):
+    """Start daemon.py --mode fork; yields its socket path."""
+    config_dir = tmp_path / ".promptctl"
+    config_dir.mkdir()
+    (config_dir / "promptctl.yaml").write_text(USER_CONFIG)
+    socket_path = tmp_path / "daemon.sock"
+
+    process = subprocess.Popen(
+        [sys.executable, "daemon.py", "--mode", "fork", "--socket", str(socket_path)],
+        cwd=str(PLUGIN_ROOT / "mcp"),
+        env=dict(os.environ, HOME=str(tmp_path)),
+        stdout=subprocess.DEVNULL,
+        stderr=subprocess.DEVNULL,
+    )
+    try:
+        deadline = time.monotonic() + 30
+        while not socket_path.exists():
+            assert process.poll() is None, "fork server exited"
+            assert time.monotonic() < deadline, "fork server didn't start"
+            time.sleep(0.05)
+        yield socket_path
+    finally:
+        process.send_signal(signal.SIGTERM)
+        process.wait(timeout=10)
+
+
+def connect(socket_path):
+    client = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    client.settimeout(10)
+    client.connect(str(socket_path))
+    return client
+
+
+def send(socket_path, event):
+    """Send one event the way dispatch.py does and return the reply."""
+    client = connect(socket_path)
+    try:
+        payload = event if isinstance(event, bytes) else json.dumps(event).encode()
+        client.sendall(payload)
+        client.shutdown(socket.SHUT_WR)
+        chunks = []
+        while True:
+            chunk = client.recv(65536)
+            if not chunk:
+                break
+            chunks.append(chunk)
+        return json.loads(b"".join(chunks))
+    finally:
+        client.close()
+
+
+def stop_event(cwd, session_id="s1"):
+    return {"hook_event_name": "Stop", "session_id": session_id, "cwd": str(cwd)}
+
+
+def test_events_are_handled_in_forked_children(fork_server, tmp_path):
+    first = send(fork_server, stop_event(tmp_path))
+    second = send(fork_server, stop_event(tmp_path))
+
+    assert first["output"]["continue"] is True
+    assert first["timing"]["mode"] == "fork"
+    assert second["timing"]["mode"] == "fork"
+
+
+def test_invalid_event_gets_an_error(fork_server):
+    assert send(fork_server, b"not json")["error"].startswith("Invalid JSON")
+    assert send(fork_server, b"[1, 2]")["error"] == "Invalid event: expected a JSON object"
+
+
+def test_slow_client_does_not_block_others(fork_server, tmp_path):
+    # Connected, but never sends its event
+    idle = connect(fork_server)
+    try:
+        started = time.monotonic()
+        reply = send(fork_server, stop_event(tmp_path))
+        assert reply["output"]["continue"] is True
+        assert time.monotonic() - started < 3
+    finally:
+        idle.close()
+
+
+def test_project_configs_are_used_and_warmed(fork_server, tmp_path):
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "promptctl.yaml").write_text(PROJECT_CONFIG)
+
+    for n in range(3):
+        assert "output" in send(fork_server, stop_event(project, f"s{n}"))
+        time.sleep(0.1)
+
+    marks = project / "marks"
+    deadline = time.monotonic() + 10
+    while not marks.exists() or len(marks.read_text().split()) < 3:
+        assert time.monotonic() < deadline
+        time.sleep(0.05)
+    assert marks.read_text().split() == ["s0", "s1", "s2"]
@@ -0,0 +1,113 @@
+"""Priority tiers, exclusive handlers and the process-wide handler limit."""
+
+import asyncio
+
+import server
+from server import EventContext, HandlerEngine, HandlerSlots, PromptCtlConfig
+
+
+class Timeline:
+    """Stands in for HandlerEngine.execute_handler, recording starts and ends."""
+
+    def __init__(self, duration=0.02):
+        self.duration = duration
+        self.events = []
+        self.running = 0
+        self.max_running = 0
+
+    async def __call__(self, handler, name, context, session_id, coalesced, deadline):
+        self.events.append(("start", name))
+        self.running += 1
+        self.max_running = max(self.max_running, self.running)
+        await asyncio.sleep(self.duration)
+        self.running -= 1
+        self.events.append(("end", name))
+        return {"actions_executed": 0, "results": []}
+
+
+def make_engine(timeline, **handlers):
+    engine = HandlerEngine(
+        PromptCtlConfig(
+            handlers={
+                name: {"hook": "Stop", **options} for name, options in handlers.items()
+            }
+        )
+    )
+    engine.execute_handler = timeline
+    return engine
+
+
+def run(engine):
+    handlers = engine.match_handlers("Stop", {})
+    return asyncio.run(engine.run_handlers(handlers, EventContext({}), "s"))
+
+
+def test_tiers_run_in_priority_order():
+    timeline = Timeline()
+    engine = make_engine(
+        timeline,
+        low={"priority": 1},
+        high_a={"priority": 5},
+        high_b={"priority": 5},
+    )
+    assert len(run(engine)) == 3
+
+    # Both high handlers run together; the low tier waits for them
+    assert set(timeline.events[:2]) == {("start", "high_a"), ("start", "high_b")}
+    assert timeline.events[4:] == [("start", "low"), ("end", "low")]
+
+
+def test_exclusive_handler_runs_alone():
+    timeline = Timeline()
+    engine = make_engine(
+        timeline,
+        before={},
+        alone={"exclusive": True},
+        after_a={},
+        after_b={},
+    )
+    run(engine)
+
+    assert timeline.events[:4] == [
+        ("start", "before"),
+        ("end", "before"),
+        ("start", "alone"),
+        ("end", "alone"),
+    ]
+    assert set(timeline.events[4:6]) == {("start", "after_a"), ("start", "after_b")}
+
+
+def test_limit_is_shared_by_all_engines(monkeypatch):
+    monkeypatch.setattr(server, "handler_slots", HandlerSlots(2))
+    timeline = Timeline()
+    engines = [
+        make_engine(timeline, **{f"{project}_{n}": {} for n in range(3)})
+        for project in ("one", "two")
+    ]
+
+    async def main():
+        await asyncio.gather(
+            *(
+                engine.run_handlers(engine.match_handlers("Stop", {}), EventContext({}), "s")
+                for engine in engines
+            )
+        )
+
+    asyncio.run(main())
+    assert len(timeline.events) == 12
+    assert timeline.max_running == 2
+
+
+def test_limit_follows_the_default_config(monkeypatch):
+    slots = HandlerSlots(8)
+    monkeypatch.setattr(server, "handler_slots", slots)
+    server.apply_execution_limits(
+        PromptCtlConfig(execution={"max_concurrent_handlers": 3})
+    )
+    assert slots.limit == 3
+
+    async def main():
+        return slots.semaphore(), slots.semaphore()
+
+    first, second = asyncio.run(main())
+    assert first is second
@@ -0,0 +1,73 @@
+"""hooks.json generated from the handlers of a config."""
+
+import json
+
+from conftest import PLUGIN_ROOT
+from server import (
+    DISPATCH_COMMAND,
+    HooksConfigWriter,
+    PromptCtlConfig,
+    regenerate_hooks_config,
+)
+
+
+def matchers(**handlers):
+    return HooksConfigWriter.event_matchers(PromptCtlConfig(handlers=handlers))
+
+
+def test_only_events_with_enabled_handlers_are_registered():
+    assert matchers() == {}
+    assert matchers(
+        on_stop={"hook": "Stop"},
+        off={"hook": "SessionStart", "enabled": False},
+    ) == {"Stop": "*"}
+
+
+def test_tool_events_match_the_handlers_tools():
+    assert matchers(
+        bash={"hook": "PreToolUse", "match": {"tool": "Bash"}},
+        edits={"hook": "PreToolUse", "match": {"tool": ["Write", "Edit"]}},
+        mcp={"hook": "PostToolUse", "match": {"tool": "mcp__x.y"}},
+        unused={"hook": "PostToolUse", "match": {"tool": "Read"}, "enabled": False},
+    ) == {"PreToolUse": "Bash|Edit|Write", "PostToolUse": r"mcp__x\.y"}
+
+
+def test_handler_without_tool_registers_every_tool():
+    assert matchers(
+        bash={"hook": "PreToolUse", "match": {"tool": "Bash"}},
+        python={"hook": "PreToolUse", "match": {"file_pattern": "*.py"}},
+    ) == {"PreToolUse": "*"}
+
+
+def test_tool_match_on_non_tool_event_is_ignored():
+    assert matchers(prompt={"hook": "UserPromptSubmit", "match": {"tool": "Bash"}}) == {
+        "UserPromptSubmit": "*"
+    }
+
+
+def test_generated_file(tmp_path):
+    config = PromptCtlConfig(
+        handlers={"bash": {"hook": "PreToolUse", "match": {"tool": "Bash"}}}
+    )
+    output = tmp_path / "hooks.json"
+    assert HooksConfigWriter.write_hooks_config(output, DISPATCH_COMMAND, config=config)
+    assert not HooksConfigWriter.write_hooks_config(output, DISPATCH_COMMAND, config=config)
+
+    hooks = json.loads(output.read_text())["hooks"]
+    assert hooks == {
+        "PreToolUse": [
+            {"matcher": "Bash", "hooks": [{"type": "command", "command": DISPATCH_COMMAND}]}
+        ]
+    }
+
+
+def test_regenerated_outside_the_plugin(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    plugin_hooks = PLUGIN_ROOT / "hooks" / "hooks.json"
+    before = plugin_hooks.read_bytes()
+
+    regenerate_hooks_config(PromptCtlConfig(handlers={"on-stop": {"hook": "Stop"}}))
+
+    written = json.loads((tmp_path / ".promptctl" / "hooks.json").read_text())
+    assert list(written["hooks"]) == ["Stop"]
+    assert plugin_hooks.read_bytes() == before
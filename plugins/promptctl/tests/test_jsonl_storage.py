@@ -0,0 +1,123 @@
+"""JSONL storage: batched writes, fsync policies and size rotation."""
+
+import json
+import time
+
+import pytest
+
+import logflow
+from logflow import JsonlOutputConfig, JsonlStorage, LogFlow, LoggingConfig, LogLevel, LogRecord
+from logstore import index_complete, list_segments, load_index
+
+
+def make_storage(tmp_path, **options):
+    return JsonlStorage(
+        JsonlOutputConfig(path=str(tmp_path / "{date}.jsonl"), compress="none", **options)
+    )
+
+
+def records(start, count):
+    return [LogRecord(level=LogLevel.INFO, message=f"entry {n:03d}") for n in range(start, start + count)]
+
+
+@pytest.fixture
+def fsyncs(monkeypatch):
+    """Count fsync calls instead of syncing."""
+    calls = []
+    monkeypatch.setattr(logflow.os, "fsync", calls.append)
+    return calls
+
+
+class CountingHandle:
+    """File handle wrapper recording each write."""
+
+    def __init__(self, handle):
+        self.handle = handle
+        self.writes = []
+
+    def write(self, data):
+        self.writes.append(data)
+        return self.handle.write(data)
+
+    def __getattr__(self, name):
+        return getattr(self.handle, name)
+
+
+def test_each_batch_is_one_write(tmp_path):
+    storage = make_storage(tmp_path)
+    storage.write_batch(records(0, 1))
+    handle = storage.current_handle = CountingHandle(storage.current_handle)
+
+    storage.write_batch(records(1, 5))
+    storage.write_batch(records(6, 3))
+    path = storage.current_file
+    storage.close()
+
+    assert [data.count(b"\n") for data in handle.writes] == [5, 3]
+    # One index record per batch, covering the whole segment
+    assert [sum(map(len, record["l"].values())) for record in load_index(path)] == [1, 5, 3]
+    assert index_complete(path)
+
+
+@pytest.mark.parametrize("mode, synced", [("none", 0), ("batch", 3)])
+def test_fsync_policy(tmp_path, fsyncs, mode, synced):
+    storage = make_storage(tmp_path, fsync=mode)
+    for start in range(3):
+        storage.write_batch(records(start, 1))
+    assert len(fsyncs) == synced
+    storage.close()
+
+
+def test_interval_fsync_syncs_at_most_once_per_interval(tmp_path, fsyncs):
+    storage = make_storage(tmp_path, fsync="interval", fsync_interval_ms=100)
+    storage.write_batch(records(0, 1))
+    storage.write_batch(records(1, 1))
+    assert fsyncs == []
+
+    # Due without another write; synced data isn't synced again
+    time.sleep(0.15)
+    storage.sync_if_due()
+    storage.sync_if_due()
+    assert len(fsyncs) == 1
+    storage.close()
+
+
+def test_interval_fsync_runs_when_writer_is_idle(tmp_path, fsyncs):
+    config = LoggingConfig(
+        console={"enabled": False},
+        jsonl={
+            "path": str(tmp_path / "{date}.jsonl"),
+            "compress": "none",
+            "fsync": "interval",
+            "fsync_interval_ms": 200,
+        },
+    )
+    logger = LogFlow(config)
+    logger.log(LogLevel.INFO, "last entry before a quiet period")
+
+    deadline = time.monotonic() + 5.0
+    while not fsyncs:
+        assert time.monotonic() < deadline, "interval fsync never ran"
+        time.sleep(0.01)
+    logger.close()
+
+
+def test_size_rotation_splits_batch_at_line_boundary(tmp_path):
+    storage = make_storage(tmp_path, rotation="size")
+    storage._max_bytes = 600
+    storage.write_batch(records(0, 20))
+    storage.close()
+
+    segments = list_segments(tmp_path)
+    assert len(segments) > 2
+
+    messages = []
+    for segment in segments:
+        data = segment.read_bytes()
+        lines = data.splitlines(keepends=True)
+        messages.extend(json.loads(line)["message"] for line in lines)
+        if segment != segments[-1]:
+            # Sealed once full, and not a line later
+            assert len(data) >= 600 > len(data) - len(lines[-1])
+        assert index_complete(segment)
+    assert messages == [f"entry {n:03d}" for n in range(20)]
@@ -0,0 +1,203 @@
+"""LogFlow buffering, overflow policies, rate limits and the writer thread."""
+
+import json
+import time
+from collections import deque
+
+import pytest
+
+from logflow import LogFlow, LoggingConfig, LogLevel, RateLimiter, TokenBucket
+from logstore import index_complete, load_index
+
+
+def make_logger(tmp_path, **options):
+    config = LoggingConfig(
+        console={"enabled": False},
+        jsonl={"path": str(tmp_path / "{date}.jsonl"), "compress": "none"},
+        **options,
+    )
+    return LogFlow(config)
+
+
+def written(tmp_path):
+    lines = []
+    for path in sorted(tmp_path.glob("*.jsonl")):
+        lines.extend(json.loads(line) for line in path.read_text().splitlines())
+    return lines
+
+
+def wait_for(condition, timeout=5.0):
+    deadline = time.monotonic() + timeout
+    while not condition():
+        assert time.monotonic() < deadline, "timed out"
+        time.sleep(0.01)
+
+
+def test_entries_are_written_in_order(tmp_path):
+    logger = make_logger(tmp_path)
+    for n in range(50):
+        logger.log(LogLevel.INFO, f"entry {n}")
+    logger.log(LogLevel.ERROR, "failure")
+    logger.close()
+
+    messages = [entry["message"] for entry in written(tmp_path)]
+    assert messages == [f"entry {n}" for n in range(50)] + ["failure"]
+
+
+def test_levels_given_by_name_are_written_and_indexed(tmp_path):
+    logger = make_logger(tmp_path)
+    logger.log(LogLevel.INFO, "before")
+    logger.log("ACTION_ERROR", "failed", error="boom")
+    logger.log(LogLevel.INFO, "after")
+    with pytest.raises(ValueError):
+        logger.log("LOUD", "unknown level")
+    logger.close()
+
+    assert [(entry["level"], entry["message"]) for entry in written(tmp_path)] == [
+        ("INFO", "before"),
+        ("ACTION_ERROR", "failed"),
+        ("INFO", "after"),
+    ]
+    assert logger.writer_errors == 0
+    [segment] = tmp_path.glob("*.jsonl")
+    levels = [level for record in load_index(segment) for level in record["l"]]
+    assert sorted(set(levels)) == ["ACTION_ERROR", "INFO"]
+    assert index_complete(segment)
+
+
+class ShrinkingDeque(deque):
+    """Reports one entry more than it holds, as if another thread popped one."""
+
+    def __len__(self):
+        return super().__len__() + 1
+
+
+def test_take_batch_tolerates_concurrent_pops(tmp_path):
+    logger = make_logger(tmp_path)
+    logger.buffer = ShrinkingDeque()
+    for n in range(3):
+        logger.log(LogLevel.INFO, f"entry {n}")
+
+    assert [entry.message for entry in logger._take_batch()] == [
+        "entry 0",
+        "entry 1",
+        "entry 2",
+    ]
+    logger.close()
+
+
+def test_writer_thread_survives_failures(tmp_path, monkeypatch):
+    logger = make_logger(tmp_path)
+    logger.open()
+
+    def broken_report(force=False):
+        raise RuntimeError("report failed")
+
+    monkeypatch.setattr(logger, "_report_drops", broken_report)
+    wait_for(lambda: logger.writer_errors > 0)
+    assert logger._writer.is_alive()
+    monkeypatch.undo()
+
+    def broken_write(batch):
+        raise RuntimeError("sink failed")
+
+    monkeypatch.setattr(logger, "_write", broken_write)
+    logger.log(LogLevel.INFO, "lost")
+    wait_for(lambda: logger.drop_stats()["dropped"].get("write_error"))
+    assert logger._writer.is_alive()
+    monkeypatch.undo()
+
+    logger.log(LogLevel.INFO, "kept")
+    logger.close()
+    messages = [entry["message"] for entry in written(tmp_path)]
+    assert "kept" in messages and "lost" not in messages
+
+
+@pytest.mark.parametrize(
+    "policy, kept",
+    [
+        ("drop_oldest", ["entry 7", "entry 8", "entry 9"]),
+        ("drop_newest", ["entry 0", "entry 1", "entry 2"]),
+    ],
+)
+def test_overflow_policies(tmp_path, policy, kept):
+    logger = make_logger(tmp_path, buffer_size=3, overflow=policy, rate_limit=0)
+    # Keep the writer thread from draining the buffer mid-test
+    logger._writer = object()
+    for n in range(10):
+        logger.log(LogLevel.INFO, f"entry {n}")
+
+    assert [entry.message for entry in logger.buffer] == kept
+    assert logger.drop_stats()["dropped"]["overflow"] == {"INFO": 7}
+    logger._writer = None
+    logger.close()
+
+
+def test_sample_policy_keeps_one_in_n(tmp_path):
+    logger = make_logger(
+        tmp_path, buffer_size=2, overflow="sample", sample_rate=4, rate_limit=0
+    )
+    logger._writer = object()
+    for n in range(10):
+        logger.log(LogLevel.INFO, f"entry {n}")
+
+    assert [entry.message for entry in logger.buffer] == ["entry 5", "entry 9"]
+    logger._writer = None
+    logger.close()
+
+
+def test_reserved_lane_is_bounded(tmp_path):
+    logger = make_logger(tmp_path, buffer_size=2, reserved_size=3)
+    logger._writer = object()
+    for n in range(5):
+        logger.log(LogLevel.ERROR, f"error {n}")
+
+    assert [entry.message for entry in logger._reserved] == ["error 0", "error 1", "error 2"]
+    stats = logger.drop_stats()
+    assert stats["dropped"]["reserved_full"] == {"ERROR": 2}
+    assert (stats["reserved"], stats["reserved_size"]) == (3, 3)
+
+    # The drop report is admitted past the limit
+    logger._report_drops(force=True)
+    assert logger._reserved[-1].message == "Dropped log entries"
+    assert logger._reserved[-1].data["dropped"]["reserved_full"] == {"ERROR": 2}
+
+    logger._writer = None
+    logger.close()
+    assert len(written(tmp_path)) == 4
+
+
+def test_token_bucket_refills_at_rate():
+    bucket = TokenBucket(rate=10, burst=0.5)
+    now = bucket.updated_ns
+    assert [bucket.take(now) for _ in range(6)] == [True] * 5 + [False]
+
+    # 10 tokens/s: one more after 100 ms, never more than the burst
+    assert bucket.take(now + 100_000_000)
+    assert not bucket.take(now + 100_000_000)
+    assert bucket.refill(now + 60 * 1_000_000_000) == 5
+
+
+def test_rate_limiter_classes_and_sessions():
+    limiter = RateLimiter(
+        LoggingConfig(
+            rate_limit=2, rate_limits={"debug": 0}, rate_burst=1, rate_limit_per_session=True
+        )
+    )
+    assert [limiter.allow("info", "a") for _ in range(3)] == [True, True, False]
+    # Each session has its own budget; unlimited classes always pass
+    assert limiter.allow("info", "b")
+    assert all(limiter.allow("debug", "a") for _ in range(10))
+    assert all(limiter.allow("error", "a") for _ in range(10))
+
+
+def test_rate_limited_entries_are_counted(tmp_path):
+    logger = make_logger(tmp_path, rate_limit=1, rate_burst=3)
+    for n in range(10):
+        logger.log(LogLevel.INFO, f"entry {n}", session_id="s")
+    logger.log(LogLevel.ERROR, "failure", session_id="s")
+
+    assert logger.drop_stats()["dropped"]["rate_limit"] == {"INFO": 7}
+    logger.close()
+    messages = [entry["message"] for entry in written(tmp_path)]
+    assert messages[:4] == ["entry 0", "entry 1", "entry 2", "failure"]
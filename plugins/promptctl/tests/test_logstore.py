@@ -0,0 +1,272 @@
+"""Log segments: compression sweeps, indexes, queries and cursors."""
+
+import os
+import re
+import time
+
+import pytest
+
+import logstore
+from logflow import JsonlOutputConfig, JsonlStorage, LogLevel, LogRecord
+from logstore import (
+    SegmentCompressor,
+    compress_segment,
+    format_cursor,
+    index_complete,
+    list_segments,
+    load_index,
+    load_seek_table,
+    open_segment,
+    parse_cursor,
+    query_segment,
+    read_range,
+    rebuild_index,
+    seal_segment,
+)
+from server import logs
+
+
+def write_segment(path, count, start=0, age=None):
+    """Write count JSONL entries; age backdates the file past SEAL_GRACE."""
+    with open(path, "a") as f:
+        for n in range(start, start + count):
+            f.write(
+                f'{{"timestamp": "2025-11-03T10:00:{n % 60:02d}", '
+                f'"level": "INFO", "message": "entry {n}"}}\n'
+            )
+    if age is not None:
+        past = time.time() - age
+        os.utime(path, (past, past))
+
+
+@pytest.mark.parametrize("codec", ["gzip", "zstd"])
+def test_compressed_segment_seeks_by_block(tmp_path, codec):
+    if codec == "zstd":
+        pytest.importorskip("zstandard")
+    plain = tmp_path / "2025-11-03.001.jsonl"
+    write_segment(plain, 200)
+    content = plain.read_bytes()
+
+    compressed = compress_segment(plain, codec, block_size=1000)
+    assert not plain.exists()
+    blocks = load_seek_table(compressed)
+    assert len(blocks) > 5
+    # Blocks start on line boundaries
+    assert all(content[start - 1 : start] == b"\n" for start, _ in blocks[1:])
+
+    for offset in (0, blocks[3][0], blocks[3][0] + 17, len(content) - 10):
+        with open_segment(compressed, offset) as stream:
+            assert stream.read() == content[offset:]
+
+    line_start = blocks[4][0]
+    entries = list(read_range(compressed, line_start, line_start + 1))
+    assert entries[0] == (line_start, content[line_start:].split(b"\n")[0] + b"\n")
+
+
+def test_open_segment_without_seek_table(tmp_path):
+    plain = tmp_path / "2025-11-03.001.jsonl"
+    write_segment(plain, 50)
+    content = plain.read_bytes()
+    compressed = compress_segment(plain, "gzip", block_size=500)
+    os.unlink(str(compressed) + logstore.SEEK_SUFFIX)
+
+    assert load_seek_table(compressed) is None
+    with open_segment(compressed, 700) as stream:
+        assert stream.read() == content[700:]
+
+
+def test_compressor_skips_failing_segment_until_it_changes(tmp_path, monkeypatch):
+    active = tmp_path / "2025-11-03.jsonl"
+    bad = tmp_path / "2025-11-03.001.jsonl"
+    good = tmp_path / "2025-11-03.002.jsonl"
+    write_segment(active, 1)
+    write_segment(bad, 3, age=600)
+    write_segment(good, 3, age=600)
+
+    real_compress = logstore.compress_segment
+    attempts = []
+
+    def compress(path, codec, **kwargs):
+        attempts.append(path.name)
+        if path == bad:
+            raise ValueError("corrupt segment")
+        return real_compress(path, codec, **kwargs)
+
+    monkeypatch.setattr(logstore, "compress_segment", compress)
+    errors = []
+    compressor = SegmentCompressor(
+        lambda: (active, "gzip"), on_error=lambda path, e: errors.append((path, str(e)))
+    )
+
+    assert compressor.sweep() == [tmp_path / "2025-11-03.002.jsonl.gz"]
+    assert errors == [(bad, "corrupt segment")]
+
+    # Skipped while unchanged, retried once it changes
+    assert compressor.sweep() == []
+    assert attempts.count(bad.name) == 1
+    write_segment(bad, 1, age=600)
+    compressor.sweep()
+    assert attempts.count(bad.name) == 2
+    assert len(errors) == 2
+    assert bad in list_segments(tmp_path)
+
+
+def test_compressor_thread_survives_failing_sweep():
+    calls = []
+
+    def target():
+        calls.append(1)
+        raise RuntimeError("config unavailable")
+
+    errors = []
+    compressor = SegmentCompressor(target, on_error=lambda path, e: errors.append(path))
+    compressor.start()
+    deadline = time.monotonic() + 5
+    while len(calls) < 2:
+        assert time.monotonic() < deadline
+        compressor.wake()
+        time.sleep(0.01)
+
+    assert compressor._thread.is_alive()
+    assert errors[:2] == [None, None]
+
+
+def test_compressor_run_stops_when_not_alive(tmp_path, monkeypatch):
+    monkeypatch.setattr(logstore, "SWEEP_INTERVAL", 0.01)
+    active = tmp_path / "2025-11-03.jsonl"
+    write_segment(active, 1)
+    write_segment(tmp_path / "2025-11-03.001.jsonl", 3, age=600)
+    checks = iter([True, False])
+
+    SegmentCompressor(lambda: (active, "gzip")).run(lambda: next(checks))
+    assert (tmp_path / "2025-11-03.001.jsonl.gz").exists()
+
+
+def log_dir(home):
+    return home / ".promptctl" / "logs"
+
+
+def write_entries(directory, messages, batch=5, level=LogLevel.INFO):
+    """Write entries through JsonlStorage, batch entries per index record."""
+    storage = JsonlStorage(
+        JsonlOutputConfig(path=str(directory / "{date}.jsonl"), compress="none")
+    )
+    for start in range(0, len(messages), batch):
+        storage.write_batch(
+            [LogRecord(level=level, message=m) for m in messages[start : start + batch]]
+        )
+    storage.close()
+    return storage.current_file or sorted(directory.glob("*.jsonl"))[-1]
+
+
+def messages_of(lines):
+    return [re.search(rb'"message": ?"([^"]*)"', line).group(1).decode() for _, line in lines]
+
+
+def test_query_round_trip_both_directions(tmp_path):
+    names = [f"entry {n:02d}" for n in range(23)]
+    segment = write_entries(tmp_path, names)
+
+    forward = list(query_segment(segment))
+    assert messages_of(forward) == names
+    assert list(query_segment(segment, reverse=True)) == forward[::-1]
+
+
+def test_query_scans_index_gaps(tmp_path):
+    segment = write_entries(tmp_path, [f"indexed {n}" for n in range(5)])
+    # Entries the index doesn't cover, and a torn index line
+    write_segment(segment, 2)
+    with open(logstore.index_path(segment), "ab") as f:
+        f.write(b'{"o":')
+    (tmp_path / "more").mkdir()
+    more = write_entries(tmp_path / "more", [f"later {n}" for n in range(3)])
+    with open(segment, "ab") as f:
+        f.write(more.read_bytes())
+
+    expected = [f"indexed {n}" for n in range(5)] + ["entry 0", "entry 1"]
+    expected += [f"later {n}" for n in range(3)]
+    assert messages_of(query_segment(segment)) == expected
+    assert messages_of(query_segment(segment, reverse=True)) == expected[::-1]
+    before = list(query_segment(segment, reverse=True))[3][0]
+    assert messages_of(query_segment(segment, reverse=True, before=before)) == expected[:6][::-1]
+
+
+def test_reverse_query_parses_only_the_newest_records(tmp_path, monkeypatch):
+    segment = write_entries(tmp_path, [f"entry {n}" for n in range(500)], batch=5)
+    parsed = []
+    real_parse = logstore._parse_record
+
+    def parse(line):
+        parsed.append(line)
+        return real_parse(line)
+
+    monkeypatch.setattr(logstore, "_parse_record", parse)
+    newest = list(zip(range(7), query_segment(segment, reverse=True)))
+    assert messages_of(line for _, line in newest) == [f"entry {n}" for n in range(499, 492, -1)]
+    assert len(parsed) <= 3
+
+
+def test_rebuild_index_covers_segment(tmp_path):
+    segment = write_entries(tmp_path, [f"entry {n}" for n in range(12)])
+    write_segment(segment, 3)
+    with open(segment, "ab") as f:
+        f.write(b"not json\n")
+    assert not index_complete(segment)
+
+    assert rebuild_index(segment, block_entries=4) == 15
+    assert index_complete(segment)
+    assert len(load_index(segment)) == 4
+
+    expected = [f"entry {n}" for n in range(12)] + ["entry 0", "entry 1", "entry 2"]
+    assert messages_of(query_segment(segment)) == expected
+
+
+def test_rebuild_index_of_compressed_segment(tmp_path):
+    plain = tmp_path / "2025-11-03.001.jsonl"
+    write_segment(plain, 40)
+    compressed = compress_segment(plain, "gzip", block_size=500)
+
+    assert rebuild_index(compressed, block_entries=10) == 40
+    assert index_complete(compressed)
+    assert len(list(query_segment(compressed, reverse=True))) == 40
+
+
+def test_cursor_round_trip(tmp_path):
+    segment = write_entries(tmp_path, ["first", "second"])
+    cursor = format_cursor(segment, 42)
+    identity, offset = parse_cursor(cursor)
+    assert offset == 42
+    assert logstore.find_segment(list_segments(tmp_path), identity) == segment
+
+    for bad in ("2025-11-03.jsonl:42", "nonsense", cursor + "x"):
+        assert parse_cursor(bad) is None
+
+
+def page(cursor=None, limit=10):
+    output = logs(limit=limit, cursor=cursor)
+    found = re.findall(r"entry \d\d", output)
+    next_cursor = re.search(r"cursor=(\S+)", output)
+    return found, next_cursor.group(1) if next_cursor else None
+
+
+def test_cursor_paging_survives_sealing_and_compression(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+    directory = log_dir(tmp_path)
+    directory.mkdir(parents=True)
+    active = write_entries(directory, [f"entry {n:02d}" for n in range(30)])
+
+    first, cursor = page()
+    assert first == [f"entry {n:02d}" for n in range(29, 19, -1)]
+
+    # The active segment is sealed and a new one started between pages
+    sealed = seal_segment(active)
+    write_entries(directory, [f"entry {n:02d}" for n in range(30, 35)])
+    second, cursor = page(cursor)
+    assert second == [f"entry {n:02d}" for n in range(19, 9, -1)]
+
+    # ... and compressed before the next one
+    compress_segment(sealed, "gzip")
+    third, cursor = page(cursor)
+    assert third == [f"entry {n:02d}" for n in range(9, -1, -1)]
+
+    assert "no longer exists" in logs(cursor="2025-11-03@00000000:10")
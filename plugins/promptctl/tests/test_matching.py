@@ -0,0 +1,74 @@
+"""HandlerEngine.match_handlers must agree with a linear scan of the config."""
+
+import random
+from pathlib import PurePosixPath
+
+from server import HandlerEngine, PromptCtlConfig
+
+HOOKS = ["PreToolUse", "PostToolUse", "Stop"]
+TOOLS = ["Bash", "Edit", "Write", "Read"]
+PATTERNS = ["*.py", "src/*", "*.md", "tests/*_test.py", "Makefile"]
+PATHS = ["app.py", "src/app.py", "README.md", "tests/a_test.py", "Makefile", "x/y.txt"]
+
+
+def random_handler(rng):
+    match = {}
+    if rng.random() < 0.6:
+        match["tool"] = rng.choice([rng.choice(TOOLS), rng.sample(TOOLS, 2)])
+    if rng.random() < 0.4:
+        match["file_pattern"] = rng.choice(PATTERNS)
+    return {
+        "hook": rng.choice(HOOKS),
+        "match": match or None,
+        "priority": rng.randint(0, 3),
+        "enabled": rng.random() < 0.9,
+    }
+
+
+def linear_match(config, hook_name, payload):
+    """The obvious matcher: check every handler, then sort by priority."""
+    file_path = payload.get("tool_input", {}).get("file_path", "")
+    matched = []
+    for name, handler in config.handlers.items():
+        if not handler.enabled or handler.hook.value != hook_name:
+            continue
+        match = handler.match
+        if match and match.tool is not None:
+            tools = [match.tool] if isinstance(match.tool, str) else match.tool
+            if payload.get("tool_name") not in tools:
+                continue
+        if match and match.file_pattern is not None:
+            if not PurePosixPath(file_path).match(match.file_pattern):
+                continue
+        matched.append(name)
+    return sorted(matched, key=lambda name: -config.handlers[name].priority)
+
+
+def test_indexed_matching_agrees_with_linear_scan():
+    rng = random.Random(1234)
+    for _ in range(50):
+        config = PromptCtlConfig(
+            handlers={f"h{n}": random_handler(rng) for n in range(rng.randint(0, 12))}
+        )
+        engine = HandlerEngine(config)
+        for hook_name in HOOKS:
+            for tool_name in TOOLS + [None]:
+                for file_path in PATHS:
+                    payload = {"tool_input": {"file_path": file_path}}
+                    if tool_name is not None:
+                        payload["tool_name"] = tool_name
+                    found = [name for name, _ in engine.match_handlers(hook_name, payload)]
+                    assert found == linear_match(config, hook_name, payload), (
+                        hook_name,
+                        payload,
+                    )
+
+
+def test_matching_without_file_path():
+    config = PromptCtlConfig(
+        handlers={
+            "any": {"hook": "Stop"},
+            "python": {"hook": "Stop", "match": {"file_pattern": "*.py"}},
+        }
+    )
+    assert [name for name, _ in HandlerEngine(config).match_handlers("Stop", {})] == ["any"]
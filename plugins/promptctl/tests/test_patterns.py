@@ -0,0 +1,179 @@
+"""FilePatternSet must match exactly like PurePosixPath.match."""
+
+import itertools
+import random
+from pathlib import PurePosixPath
+
+import pytest
+
+from patterns import FilePatternSet
+
+PATTERNS = [
+    "*",
+    "*.py",
+    "*_test.go",
+    "Makefile",
+    "src/*.py",
+    "src/*",
+    "*/src/*.py",
+    "/etc/*.conf",
+    "/src/app.py",
+    "//net/*",
+    "/",
+    "a/b.py",
+    "?/a/b.py",
+    "*/a/b.py",
+    "[ab]*.py",
+    "[!a]*.py",
+    "[a-c]/*.py",
+    "[!]].py",
+    "[z-a].py",
+    "[--0].py",
+    "[[].py",
+    "[^x].py",
+    "[.py",
+    "**",
+    "**/*.py",
+    "src/**",
+    "src/**/*.ts",
+    "a/**/b.py",
+    "./x.py",
+    "src/",
+    "test_*.py",
+    ".*",
+    "..",
+    "../*.py",
+    "file.py.*",
+    "*.[ch]",
+    "a&&b",
+]
+
+PATHS = [
+    "app.py",
+    "src/app.py",
+    "src/ui/forms/a.py",
+    "src/a.ts",
+    "src/ui/a.ts",
+    "/src/app.py",
+    "/etc/hosts.conf",
+    "/etc/nginx/site.conf",
+    "//net/share",
+    "///net/share",
+    "/",
+    "a/b.py",
+    "/a/b.py",
+    "x/a/b.py",
+    "a/x/b.py",
+    "a/x/y/b.py",
+    "b.py",
+    "c.py",
+    "].py",
+    "^.py",
+    "-.py",
+    "[.py",
+    "Makefile",
+    "build/Makefile",
+    "x_test.go",
+    "src/",
+    "src",
+    "./x.py",
+    "x.py",
+    "a//b.py",
+    "a/./b.py",
+    ".hidden",
+    "dir/.env",
+    "..",
+    "../up.py",
+    "file.py.orig",
+    "main.c",
+    "main.h",
+    "a&&b",
+    "src/pkg/test_api.py",
+]
+
+
+@pytest.mark.parametrize("pattern", PATTERNS)
+def test_single_pattern_matches_like_pathlib(pattern):
+    patterns = FilePatternSet({"handler": pattern})
+    for path in PATHS:
+        expected = PurePosixPath(path).match(pattern)
+        assert bool(patterns.match(path)) == expected, (pattern, path)
+
+
+def test_combined_set_matches_like_pathlib():
+    patterns = FilePatternSet({f"h{i}": pattern for i, pattern in enumerate(PATTERNS)})
+    for path in PATHS:
+        expected = {
+            f"h{i}" for i, pattern in enumerate(PATTERNS) if PurePosixPath(path).match(pattern)
+        }
+        assert patterns.match(path) == expected, path
+
+
+def test_shared_pattern_reports_every_handler():
+    patterns = FilePatternSet({"lint": "*.py", "test": "*.py", "docs": "*.md"})
+    assert patterns.match("src/app.py") == {"lint", "test"}
+    assert patterns.match("README.md") == {"docs"}
+
+
+def test_double_star_is_not_recursive():
+    patterns = FilePatternSet({"ts": "src/**/*.ts", "all": "src/**"})
+    assert patterns.match("src/ui/a.ts") == {"ts"}
+    assert patterns.match("src/a.ts") == {"all"}
+    assert not patterns.match("src/ui/forms/a.ts")
+    assert patterns.match("src/a") == {"all"}
+
+
+def test_empty_path_and_set():
+    assert not FilePatternSet({})
+    assert FilePatternSet({"h": "*"}).match("") == frozenset()
+    assert FilePatternSet({"h": "*"}).match(".") == frozenset()
+
+
+def test_nul_falls_back_to_pathlib():
+    patterns = FilePatternSet({"nul": "a\0*", "py": "*.py"})
+    for path in ["a\0b", "a\0b.py", "x.py"]:
+        expected = {
+            name
+            for name, pattern in [("nul", "a\0*"), ("py", "*.py")]
+            if PurePosixPath(path).match(pattern)
+        }
+        assert patterns.match(path) == expected, path
+
+
+def test_empty_pattern_is_rejected():
+    with pytest.raises(ValueError):
+        FilePatternSet({"h": "a/**/x.py", "bad": "."})
+
+
+def test_every_pair_of_paths_and_patterns_is_consistent():
+    # Same check through the basename and suffix buckets with two patterns
+    for first, second in itertools.combinations(["*.py", "src/*.py", "b.py", "**/b.py"], 2):
+        patterns = FilePatternSet({"first": first, "second": second})
+        for path in PATHS:
+            expected = {
+                name
+                for name, pattern in [("first", first), ("second", second)]
+                if PurePosixPath(path).match(pattern)
+            }
+            assert patterns.match(path) == expected, (first, second, path)
+
+
+def test_random_patterns_match_like_pathlib():
+    rng = random.Random(6)
+    pattern_atoms = ["a", "b", ".", "*", "**", "?", "[ab]", "[!a]", "[a-b]", "[", "]", "-", "!"]
+    path_atoms = ["a", "b", "ab", ".a", "ba.", "[", "]", "-", "!", "a-b"]
+    for _ in range(2000):
+        components = [
+            "".join(rng.choice(pattern_atoms) for _ in range(rng.randint(1, 3)))
+            for _ in range(rng.randint(1, 3))
+        ]
+        pattern = ("/" if rng.random() < 0.2 else "") + "/".join(components)
+        path = ("/" if rng.random() < 0.2 else "") + "/".join(
+            rng.choice(path_atoms) for _ in range(rng.randint(1, 4))
+        )
+        if not PurePosixPath(pattern).parts:
+            with pytest.raises(ValueError):
+                FilePatternSet({"h": pattern})
+            continue
+        expected = PurePosixPath(path).match(pattern)
+        assert bool(FilePatternSet({"h": pattern}).match(path)) == expected, (pattern, path)
@@ -0,0 +1,96 @@
+"""Project configs: registry lookup, process-wide settings and hooks.json."""
+
+import pytest
+
+from server import (
+    ConfigManager,
+    ConfigRegistry,
+    HooksConfigWriter,
+    PromptCtlConfig,
+)
+
+USER_CONFIG = """\
+version: "1.0"
+project_configs: true
+handlers:
+  bash-guard:
+    hook: PreToolUse
+    match:
+      tool: Bash
+    actions:
+      - action: log
+        message: "bash"
+"""
+
+PROJECT_CONFIG = """\
+handlers:
+  on-stop:
+    hook: Stop
+    actions:
+      - action: log
+        message: "stop"
+"""
+
+
+@pytest.fixture(autouse=True)
+def home(tmp_path, monkeypatch):
+    monkeypatch.setenv("HOME", str(tmp_path))
+
+
+def make_registry(tmp_path, user_config=USER_CONFIG):
+    user_path = tmp_path / ".promptctl" / "promptctl.yaml"
+    user_path.parent.mkdir()
+    user_path.write_text(user_config)
+    project = tmp_path / "project"
+    project.mkdir()
+    (project / "promptctl.yaml").write_text(PROJECT_CONFIG)
+    return ConfigRegistry(ConfigManager(user_path)), project
+
+
+def test_project_config_is_merged_over_user_config(tmp_path):
+    registry, project = make_registry(tmp_path)
+    manager = registry.manager_for(str(project / "src"))
+
+    assert manager is not registry.default
+    assert set(manager.get_config().handlers) == {"bash-guard", "on-stop"}
+
+
+@pytest.mark.parametrize(
+    "section",
+    [
+        "logging:\n  level: DEBUG\n",
+        "project_configs: false\n",
+        "execution:\n  max_concurrent_handlers: 64\n",
+    ],
+)
+def test_project_config_rejects_process_settings(tmp_path, section):
+    registry, project = make_registry(tmp_path)
+    (project / "promptctl.yaml").write_text(PROJECT_CONFIG + section)
+
+    with pytest.raises(ValueError, match="project config"):
+        registry.manager_for(str(project)).get_config()
+
+
+def test_project_config_may_set_other_execution_settings(tmp_path):
+    registry, project = make_registry(tmp_path)
+    (project / "promptctl.yaml").write_text(PROJECT_CONFIG + "execution:\n  max_processes: 2\n")
+    assert registry.manager_for(str(project)).get_config().execution.max_processes == 2
+
+
+def test_project_configs_are_opt_in(tmp_path):
+    user_config = USER_CONFIG.replace("project_configs: true\n", "")
+    registry, project = make_registry(tmp_path, user_config)
+    assert registry.manager_for(str(project)) is registry.default
+
+
+def test_hooks_json_registers_every_event_for_project_configs():
+    config = PromptCtlConfig(
+        handlers={"bash-guard": {"hook": "PreToolUse", "match": {"tool": "Bash"}}},
+        project_configs=True,
+    )
+    matchers = HooksConfigWriter.event_matchers(config)
+    assert set(matchers) == set(HooksConfigWriter.ALL_EVENTS)
+    assert set(matchers.values()) == {"*"}
+
+    config.project_configs = False
+    assert HooksConfigWriter.event_matchers(config) == {"PreToolUse": "Bash"}
@@ -0,0 +1,101 @@
+"""ProcessRunner timeouts, bounded output capture, process cap and streaming."""
+
+import asyncio
+import signal
+import time
+
+import runner
+from logflow import LogFlow, LoggingConfig, LogLevel
+from runner import OutputBuffer, ProcessRunner
+
+
+def run(command, **options):
+    timeout = options.pop("timeout", 10)
+    runner_options = {
+        key: options.pop(key)
+        for key in ("max_processes", "kill_grace_seconds")
+        if key in options
+    }
+    return asyncio.run(ProcessRunner(**runner_options).run(command, timeout, **options))
+
+
+def test_output_and_exit_code(tmp_path):
+    result = run("pwd; echo oops >&2; exit 3", cwd=str(tmp_path))
+    assert (result.exit_code, result.stdout, result.stderr) == (3, f"{tmp_path}\n", "oops\n")
+    assert not result.timed_out
+
+
+def test_timeout_sends_sigterm():
+    result = run("sleep 10", timeout=0.2)
+    assert result.timed_out
+    assert result.exit_code == -signal.SIGTERM
+
+
+def test_sigkill_after_grace_period():
+    started = time.monotonic()
+    # Ignored signals are inherited, so sleep ignores SIGTERM too
+    result = run("trap '' TERM; sleep 10", timeout=0.2, kill_grace_seconds=0.3)
+    assert result.timed_out
+    assert result.exit_code == -signal.SIGKILL
+    assert 0.5 <= time.monotonic() - started < 5
+
+
+def test_output_keeps_the_last_bytes():
+    result = run("head -c 10000 /dev/zero | tr '\\0' a; printf END", max_output_bytes=100)
+    assert result.stdout == "a" * 97 + "END"
+    assert result.stdout_dropped == 10003 - 100
+    assert result.stderr_dropped == 0
+
+
+def test_output_buffer():
+    buffer = OutputBuffer(4)
+    buffer.write(b"ab")
+    buffer.write(b"cdef")
+    assert (buffer.text(), buffer.dropped) == ("cdef", 2)
+
+
+def test_process_cap(tmp_path):
+    log = tmp_path / "log"
+    process_runner = ProcessRunner(max_processes=2)
+
+    async def main():
+        await asyncio.gather(
+            *(
+                process_runner.run(f"echo +{n} >> {log}; sleep 0.1; echo -{n} >> {log}", 10)
+                for n in range(5)
+            )
+        )
+
+    asyncio.run(main())
+    running = max_running = 0
+    for line in log.read_text().split():
+        running += 1 if line.startswith("+") else -1
+        max_running = max(max_running, running)
+    assert max_running == 2
+
+
+def test_output_lines_are_streamed(monkeypatch):
+    lines = []
+    monkeypatch.setattr(
+        runner, "log_action_output", lambda line, stream, **context: lines.append((stream, line))
+    )
+    run("printf 'a\\nb\\n'; printf 'err\\n' >&2; printf partial", log_context={"handler_name": "h"})
+
+    assert [line for line in lines if line[0] == "stdout"] == [
+        ("stdout", "a"),
+        ("stdout", "b"),
+        ("stdout", "partial"),
+    ]
+    assert ("stderr", "err") in lines
+
+
+def test_action_output_is_logged_at_default_level(tmp_path):
+    logger = LogFlow(
+        LoggingConfig(
+            console={"enabled": False},
+            jsonl={"path": str(tmp_path / "{date}.jsonl"), "compress": "none"},
+        )
+    )
+    logger.log(LogLevel.ACTION_OUTPUT, "line of output")
+    logger.close()
+    assert "line of output" in next(tmp_path.glob("*.jsonl")).read_text()
@@ -0,0 +1,157 @@
+"""EventScheduler heap ordering, and TimerStore persistence and recovery."""
+
+import asyncio
+import sqlite3
+import time
+
+import pytest
+
+import server
+from server import EventScheduler
+from timerstore import SchedulerConfig, TimerStore
+
+
+class RecordingScheduler(EventScheduler):
+    """Records the events it executes instead of running them."""
+
+    def __init__(self):
+        super().__init__()
+        self.fired = []
+
+    async def _execute_scheduled_event(self, event):
+        self.fired.append(event.event_id)
+
+
+def run(scheduler, schedule, wait=0.1, config=None):
+    async def main():
+        await scheduler.start(config)
+        schedule(scheduler)
+        await asyncio.sleep(wait)
+        await scheduler.stop()
+
+    asyncio.run(main())
+    return scheduler.fired
+
+
+def test_events_fire_in_deadline_order():
+    def schedule(scheduler):
+        for event_id, delay in (("c", 0.03), ("a", 0.01), ("b", 0.02)):
+            scheduler.schedule_event(event_id, delay, "remind", {})
+
+    assert run(RecordingScheduler(), schedule) == ["a", "b", "c"]
+
+
+def test_cancel_and_reschedule():
+    def schedule(scheduler):
+        for event_id, delay in (("x", 0.01), ("y", 0.02), ("z", 0.03)):
+            scheduler.schedule_event(event_id, delay, "remind", {"id": event_id})
+        assert scheduler.cancel_event("x")
+        assert not scheduler.cancel_event("x")
+        assert scheduler.reschedule_event("y", 0.05).payload == {"id": "y"}
+        assert scheduler.reschedule_event("missing", 0.01) is None
+        assert [e.event_id for e in scheduler.scheduled_events] == ["z", "y"]
+
+    assert run(RecordingScheduler(), schedule) == ["z", "y"]
+
+
+def test_scheduling_an_id_again_replaces_it():
+    def schedule(scheduler):
+        scheduler.schedule_event("e", 0.01, "remind", {"n": 1})
+        scheduler.schedule_event("e", 0.02, "remind", {"n": 2})
+        assert len(scheduler) == 1
+
+    assert run(RecordingScheduler(), schedule) == ["e"]
+
+
+def test_cancelled_entries_are_compacted(monkeypatch):
+    monkeypatch.setattr(server, "SCHEDULER_COMPACT_MIN", 2)
+    scheduler = RecordingScheduler()
+    for n in range(10):
+        scheduler.schedule_event(f"e{n}", 60, "remind", {})
+    for n in range(8):
+        scheduler.cancel_event(f"e{n}")
+
+    assert len(scheduler) == 2
+    assert len(scheduler._heap) < 10
+
+
+def test_timer_store_batches_writes(tmp_path):
+    path = str(tmp_path / "timers.db")
+    store = TimerStore(path)
+    store.save("kept", 100.0, "remind", {"a": 1})
+    store.save("gone", 200.0, "remind", {})
+    store.delete("gone")
+    assert store.dirty
+    assert TimerStore(path).load() == []
+
+    store.flush()
+    assert not store.dirty
+    assert TimerStore(path).load() == [("kept", 100.0, "remind", '{"a": 1}')]
+    store.close()
+
+
+def test_timer_store_keeps_changes_when_flush_fails(tmp_path):
+    path = str(tmp_path / "timers.db")
+    store = TimerStore(path)
+    store.save("old", 100.0, "remind", {})
+    store.flush()
+    store.save("new", 200.0, "remind", {})
+    store.delete("old")
+
+    # Make the transaction fail until the table is back
+    other = sqlite3.connect(path)
+    with other:
+        other.execute("ALTER TABLE timers RENAME TO moved")
+    with pytest.raises(sqlite3.Error):
+        store.flush()
+    assert store.dirty
+
+    with other:
+        other.execute("ALTER TABLE moved RENAME TO timers")
+    other.close()
+    store.flush()
+    assert not store.dirty
+    assert TimerStore(path).load() == [("new", 200.0, "remind", "{}")]
+    store.close()
+
+
+@pytest.mark.parametrize(
+    "catch_up, fired",
+    [
+        ("all", {"r1", "r2", "c1"}),
+        ("latest", {"r2", "c1"}),
+        ("drop", set()),
+    ],
+)
+def test_recovery_applies_catch_up_policy(tmp_path, catch_up, fired):
+    path = str(tmp_path / "timers.db")
+    now = time.time()
+    store = TimerStore(path)
+    store.save("r1", now - 30, "remind", {})
+    store.save("r2", now - 10, "remind", {})
+    store.save("c1", now - 20, "check", {})
+    store.save("future", now + 3600, "remind", {"later": True})
+    store.close()
+
+    config = SchedulerConfig(persist=True, path=path, catch_up=catch_up, flush_interval_ms=0)
+    scheduler = RecordingScheduler()
+    assert set(run(scheduler, lambda s: None, config=config)) == fired
+    assert [e.event_id for e in scheduler.scheduled_events] == ["future"]
+
+    # Fired and dropped events left the store; the pending one stays
+    rows = TimerStore(path).load()
+    assert [(row[0], row[3]) for row in rows] == [("future", '{"later": true}')]
+
+
+def test_scheduled_events_survive_restart(tmp_path):
+    config = SchedulerConfig(persist=True, path=str(tmp_path / "timers.db"))
+    run(
+        RecordingScheduler(),
+        lambda s: s.schedule_event("later", 0.3, "remind", {"n": 1}),
+        wait=0.01,
+        config=config,
+    )
+
+    scheduler = RecordingScheduler()
+    assert run(scheduler, lambda s: None, wait=0.5, config=config) == ["later"]
+    assert TimerStore(config.path).load() == []
@@ -0,0 +1,71 @@
+"""Compiled templates and EventContext placeholder resolution."""
+
+import pytest
+
+from server import EventContext
+from template import MISSING, Template, compile_template, lookup_path
+
+PAYLOAD = {
+    "cwd": "/repo",
+    "tool_input": {"file_path": "src/app.py", "limit": 0, "options": {"a": 1}},
+    "tool-name": "Edit",
+}
+
+
+@pytest.mark.parametrize(
+    "source, expected",
+    [
+        ("pytest {tool_input.file_path}", "pytest src/app.py"),
+        ("{cwd}/{tool_input.file_path}", "/repo/src/app.py"),
+        ("{tool-name} {tool_input.limit}", "Edit 0"),
+        ("no placeholders", "no placeholders"),
+        ("{missing} and {tool_input.missing}", "{missing} and {tool_input.missing}"),
+        # Dict values aren't rendered
+        ("{tool_input.options}", "{tool_input.options}"),
+        # Braces around anything but a dotted name are plain text
+        ("{ echo; } {} {a..b} {.x}", "{ echo; } {} {a..b} {.x}"),
+        ("{{cwd}}", "{/repo}"),
+    ],
+)
+def test_render(source, expected):
+    assert EventContext(PAYLOAD).render(source) == expected
+
+
+def test_rendered_values_are_not_expanded_again():
+    context = EventContext({"a": "{b}", "b": "nested"})
+    assert context.render("{a} {b}") == "{b} nested"
+
+
+def test_state_placeholders():
+    context = EventContext({"state": {"shadowed": "payload"}})
+    context.set_state("count", 3)
+    context.set_state("shadowed", "state")
+
+    assert context.render("{state.count} {state.shadowed} {state.none}") == (
+        "3 payload {state.none}"
+    )
+
+
+def test_render_resolves_only_referenced_paths():
+    resolved = []
+
+    def resolve(path):
+        resolved.append(path)
+        return "x" if path == ("a",) else MISSING
+
+    assert Template("{a}-{b.c}-{a}").render(resolve) == "x-{b.c}-x"
+    assert resolved == [("a",), ("b", "c"), ("a",)]
+    assert Template("plain").render(resolve) == "plain"
+    assert len(resolved) == 3
+
+
+def test_templates_are_compiled_once():
+    assert compile_template("echo {cwd}") is compile_template("echo {cwd}")
+
+
+def test_lookup_path():
+    data = {"a": {"b": {"c": None}}, "s": "text"}
+    assert lookup_path(data, ("a", "b", "c")) is None
+    assert lookup_path(data, ("a", "b")) is MISSING
+    assert lookup_path(data, ("s", "x")) is MISSING
+    assert lookup_path(data, ("missing",)) is MISSING
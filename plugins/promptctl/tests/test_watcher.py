@@ -0,0 +1,149 @@
+"""Config change detection and hot reload."""
+
+import asyncio
+import os
+import select
+import time
+
+import pytest
+
+import daemon
+from server import ConfigManager
+from watcher import ConfigWatcher
+
+CONFIG = """\
+version: "1.0"
+handlers:
+{handlers}
+"""
+
+HANDLER = """\
+  {name}:
+    hook: Stop
+    actions:
+      - action: log
+        message: "{name}"
+"""
+
+
+def config_text(*names):
+    return CONFIG.format(handlers="".join(HANDLER.format(name=name) for name in names))
+
+
+def bump_mtime(path):
+    """Make sure a rewrite changes the mtime even on coarse clocks."""
+    stat = os.stat(path)
+    os.utime(path, ns=(stat.st_atime_ns, stat.st_mtime_ns + 1_000_000_000))
+
+
+def make_manager(tmp_path, *names):
+    path = tmp_path / "promptctl.yaml"
+    path.write_text(config_text(*names))
+    manager = ConfigManager(path, base_path=tmp_path / "missing.yaml")
+    manager.get_engine()
+    return path, manager
+
+
+def test_watcher_reports_each_kind_of_change(tmp_path):
+    path = tmp_path / "promptctl.yaml"
+    path.write_text("a")
+    watcher = ConfigWatcher(path)
+    try:
+        assert not watcher.changed()
+
+        path.write_text("ab")
+        assert watcher.changed()
+        assert not watcher.changed()
+
+        # Editor-style save: write a new file and rename it over the old one
+        replacement = tmp_path / "promptctl.yaml.new"
+        replacement.write_text("ab")
+        os.replace(replacement, path)
+        assert watcher.changed()
+
+        path.unlink()
+        assert watcher.changed()
+        path.write_text("a")
+        assert watcher.changed()
+    finally:
+        watcher.close()
+
+
+def test_inotify_descriptor_becomes_readable(tmp_path):
+    path = tmp_path / "promptctl.yaml"
+    path.write_text("a")
+    watcher = ConfigWatcher(path)
+    if watcher.fileno() is None:
+        watcher.close()
+        pytest.skip("inotify not available")
+    try:
+        assert select.select([watcher.fileno()], [], [], 0)[0] == []
+        path.write_text("b")
+        assert select.select([watcher.fileno()], [], [], 5)[0] == [watcher.fileno()]
+        watcher.drain()
+        assert select.select([watcher.fileno()], [], [], 0)[0] == []
+    finally:
+        watcher.close()
+
+
+def test_reload_swaps_in_the_new_engine(tmp_path):
+    path, manager = make_manager(tmp_path, "first")
+    old_engine = manager.get_engine()
+    assert not manager.reload_if_changed()
+
+    path.write_text(config_text("first", "second"))
+    bump_mtime(path)
+    assert manager.reload_if_changed()
+    assert set(manager.get_config().handlers) == {"first", "second"}
+    assert manager.get_engine() is not old_engine
+    assert list(old_engine.config.handlers) == ["first"]
+
+
+def test_invalid_edit_keeps_the_previous_config(tmp_path):
+    path, manager = make_manager(tmp_path, "first")
+    engine = manager.get_engine()
+
+    path.write_text("handlers:\n  broken:\n    hook: NotAHook\n")
+    bump_mtime(path)
+    assert not manager.reload_if_changed()
+    assert manager.get_engine() is engine
+    # Not retried until the file changes again
+    assert not manager.config_changed()
+
+    path.write_text(config_text("fixed"))
+    bump_mtime(path)
+    assert manager.reload_if_changed()
+    assert list(manager.get_config().handlers) == ["fixed"]
+
+
+def test_async_reload_notifies_listeners(tmp_path):
+    path, manager = make_manager(tmp_path, "first")
+    loaded = []
+    manager.add_listener(lambda config: loaded.append(list(config.handlers)))
+
+    async def run():
+        path.write_text(config_text("second"))
+        bump_mtime(path)
+        return await manager.reload_if_changed_async()
+
+    assert asyncio.run(run())
+    assert loaded == [["second"]]
+
+
+def test_daemon_watch_task_reloads(tmp_path, monkeypatch):
+    path, manager = make_manager(tmp_path, "first")
+    monkeypatch.setattr(daemon, "config_manager", manager)
+    monkeypatch.setattr(daemon, "POLL_INTERVAL", 0.05)
+
+    async def run():
+        task = asyncio.create_task(daemon.watch_config())
+        await asyncio.sleep(0.1)
+        path.write_text(config_text("second"))
+        bump_mtime(path)
+        deadline = time.monotonic() + 5
+        while list(manager.get_config().handlers) != ["second"]:
+            assert time.monotonic() < deadline, "config wasn't reloaded"
+            await asyncio.sleep(0.02)
+        task.cancel()
+
+    asyncio.run(run())